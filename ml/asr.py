@@ -0,0 +1,287 @@
+# --- Стандартные библиотеки Python ---
+import importlib.util  # Проверка, установлен ли пакет vosk, без его импорта
+import json  # Разбор результатов распознавателя Vosk
+import os  # Путь к модели Vosk и число ядер процессора
+from functools import lru_cache  # Проверка модели Vosk и предупреждение о ней — один раз на процесс
+from concurrent.futures import ThreadPoolExecutor  # Параллельное распознавание окон аудио
+
+# --- Библиотеки для работы с данными ---
+import numpy as np  # Библиотека для работы с массивами (отсчеты аудио, 16-битный PCM)
+
+# --- Модули проекта ---
+from model_registry import register_model  # Реестр моделей: загрузка при первом использовании, одна на процесс
+
+# Распознаватель по умолчанию — онлайн Google, как раньше. Офлайн-модель Vosk (Kaldi, работает на CPU
+# без доступа к сети) включается явно: --asr-backend vosk или ASR_BACKEND=vosk, а ее веса скачиваются отдельно
+DEFAULT_ASR_BACKEND = os.environ.get("ASR_BACKEND", "google")
+
+# Распознаватели речи. 'offline' — работает ли без сети; 'word_timings' — отдает ли время каждого слова
+# (по нему повторы в перекрытии соседних окон убираются пословно, а не целыми сегментами)
+ASR_BACKENDS = {
+    "vosk": {"offline": True, "word_timings": True},
+    "google": {"offline": False, "word_timings": False}
+}
+
+# Модель Vosk для русского языка (https://alphacephei.com/vosk/models): малая модель быстрая и занимает
+# около 50 МБ, большая (vosk-model-ru-*) точнее, но требует нескольких ГБ памяти. Модель не входит
+# в репозиторий: архив распаковывается в эту папку (см. readme)
+VOSK_MODEL_PATH = os.environ.get("VOSK_MODEL_PATH", os.path.join("models", "vosk-model-small-ru-0.22"))
+
+# Частота дискретизации, с которой обучены модели Vosk: окна передискретизируются в нее перед распознаванием
+ASR_SAMPLE_RATE = 16000
+
+# Длина окна распознавания и перекрытие соседних окон, секунды. Слово на границе окна целиком попадает
+# хотя бы в одно из двух окон, если оно короче перекрытия
+ASR_WINDOW_SECONDS = 30.0
+ASR_OVERLAP_SECONDS = 2.0
+
+# Сколько отсчетов (16 кГц) подается распознавателю Vosk за один вызов
+VOSK_CHUNK_SAMPLES = 4000
+
+# Сколько окон распознается одновременно (None — по числу ядер). Воркеры пула процессов ограничивают его
+# своей долей ядер (см. set_asr_thread_budget)
+asr_thread_budget = None
+
+# Метки, которые возвращаются вместо текста, если речь не распознана или сервис распознавания недоступен
+# (см. scene_results.FAILED_TRANSCRIPTIONS)
+UNRECOGNIZED_TEXT = "[Не удалось распознать]"
+API_ERROR_TEXT = "[Ошибка API]"
+
+
+@register_model("vosk")
+def get_vosk_model(model_path=VOSK_MODEL_PATH):
+    """
+    Возвращает модель Vosk. Одна модель обслуживает распознаватели всех окон и всех потоков процесса.
+    """
+
+    if not os.path.isdir(model_path):
+        raise FileNotFoundError(
+            f"Нет модели Vosk: распакуйте модель (например, vosk-model-small-ru-0.22 с alphacephei.com/vosk/models) "
+            f"в {model_path} или укажите путь в VOSK_MODEL_PATH"
+        )
+
+    from vosk import Model, SetLogLevel  # Импорт здесь: Vosk нужен, только если выбран этот распознаватель
+
+    SetLogLevel(-1)  # Без отладочного вывода Kaldi на каждое окно
+    return Model(model_path)
+
+
+@lru_cache(maxsize=None)
+def _vosk_available(model_path=VOSK_MODEL_PATH):
+    """
+    Проверяет, что пакет vosk установлен, а модель распакована. Если нет, один раз на процесс печатает, что делать.
+    """
+
+    if importlib.util.find_spec("vosk") is None:
+        print("Пакет vosk не установлен (pip install vosk): речь распознается через google")
+        return False
+    if not os.path.isdir(model_path):
+        print(f"Нет модели Vosk в {model_path}: распакуйте vosk-model-small-ru-0.22 с alphacephei.com/vosk/models "
+              f"в эту папку или укажите путь в VOSK_MODEL_PATH. Пока речь распознается через google")
+        return False
+    return True
+
+
+def resolve_asr_backend(backend=DEFAULT_ASR_BACKEND):
+    """
+    Возвращает распознаватель, который будет работать на самом деле: 'vosk' без пакета или модели
+    заменяется на 'google', чтобы конвейер не падал на первом шоте.
+    """
+
+    if backend not in ASR_BACKENDS:
+        raise ValueError(f"Неизвестный распознаватель речи: {backend}. Доступны: {', '.join(ASR_BACKENDS)}")
+    if backend == "vosk" and not _vosk_available():
+        return "google"
+    return backend
+
+
+def load_asr_model(backend=DEFAULT_ASR_BACKEND):
+    """
+    Заранее загружает модель распознавателя backend (у онлайн-распознавателей модели нет).
+    """
+
+    if resolve_asr_backend(backend) == "vosk":
+        get_vosk_model()
+
+
+def set_asr_thread_budget(threads=None):
+    """
+    Задает, сколько окон распознается одновременно (по умолчанию None — по числу ядер).
+    В пуле процессов сюда передается доля ядер одного воркера, чтобы воркеры не занимали все ядра каждый.
+    """
+
+    global asr_thread_budget
+    asr_thread_budget = threads
+
+
+def _to_pcm16(samples, sample_rate, target_rate=None):
+    """
+    Переводит отсчеты float32 в байты 16-битного PCM, при необходимости передискретизируя их в target_rate.
+    """
+
+    if target_rate and target_rate != sample_rate:
+        from math import gcd  # Сокращение отношения частот для полифазной передискретизации
+        from scipy.signal import resample_poly  # Передискретизация окна (44.1 кГц -> 16 кГц)
+
+        divisor = gcd(target_rate, sample_rate)
+        samples = resample_poly(samples, target_rate // divisor, sample_rate // divisor)
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def _recognize_vosk(samples, sample_rate):
+    """
+    Распознает окно аудио моделью Vosk.
+
+    Возвращает:
+    Список сегментов {'text', 'start', 'end', 'words'} со временем от начала окна; 'words' — слова
+    с их временем [{'word', 'start', 'end'}]. Сегмент — фраза, которую Vosk отделил по паузе.
+    """
+
+    from vosk import KaldiRecognizer  # Импорт здесь: Vosk нужен, только если выбран этот распознаватель
+
+    recognizer = KaldiRecognizer(get_vosk_model(), ASR_SAMPLE_RATE)
+    recognizer.SetWords(True)
+
+    # Окно подается распознавателю частями, как поток: фразы отдаются по мере нахождения пауз
+    pcm = _to_pcm16(samples, sample_rate, ASR_SAMPLE_RATE)
+    chunk_bytes = VOSK_CHUNK_SAMPLES * 2
+    phrases = []
+    for offset in range(0, len(pcm), chunk_bytes):
+        if recognizer.AcceptWaveform(pcm[offset:offset + chunk_bytes]):
+            phrases.append(json.loads(recognizer.Result()))
+    phrases.append(json.loads(recognizer.FinalResult()))
+
+    segments = []
+    for phrase in phrases:
+        words = [{"word": item["word"], "start": item["start"], "end": item["end"]} for item in phrase.get("result", [])]
+        if words:
+            segments.append({"text": phrase["text"], "start": words[0]["start"], "end": words[-1]["end"], "words": words})
+    return segments
+
+
+def _recognize_google(samples, sample_rate):
+    """
+    Распознает окно аудио через Google Web Speech API (нужен доступ к сети).
+
+    Возвращает:
+    Список из одного сегмента на все окно (API не отдает время слов) или пустой список, если речь не распознана.
+    Если сервис недоступен, выбрасывается ConnectionError.
+    """
+
+    import speech_recognition as sr  # Импорт библиотеки для распознавания речи (только если выбран этот распознаватель)
+
+    audio_data = sr.AudioData(_to_pcm16(samples, sample_rate), sample_rate, 2)  # 2 байта на отсчет
+    try:
+        text = sr.Recognizer().recognize_google(audio_data, language="ru-RU")
+    except sr.UnknownValueError:
+        return []
+    except sr.RequestError as e:
+        raise ConnectionError(f"Ошибка API распознавания речи: {e}") from e
+    return [{"text": text, "start": 0.0, "end": len(samples) / sample_rate}]
+
+
+# Функции распознавания окна по имени распознавателя
+_RECOGNIZERS = {"vosk": _recognize_vosk, "google": _recognize_google}
+
+
+def asr_windows(duration, window_seconds=ASR_WINDOW_SECONDS, overlap_seconds=ASR_OVERLAP_SECONDS):
+    """
+    Делит аудио длительностью duration секунд на окна фиксированной длины с перекрытием.
+
+    Возвращает:
+    Список кортежей (начало окна, конец окна, начало своей части, конец своей части) в секундах.
+    Своя часть окна — середина его перекрытий с соседями: слово из перекрытия засчитывается
+    только тому окну, в чью свою часть попадает его середина.
+    """
+
+    step = window_seconds - overlap_seconds
+    if step <= 0:
+        raise ValueError("Перекрытие окон распознавания должно быть меньше длины окна")
+
+    windows = []
+    start = 0.0
+    while True:
+        end = min(start + window_seconds, duration)
+        last = end >= duration
+        windows.append((start, end, start + overlap_seconds / 2 if windows else 0.0,
+                        duration if last else end - overlap_seconds / 2))
+        if last:
+            return windows
+        start += step
+
+
+def _merge_window_segments(windows, window_segments):
+    """
+    Собирает сегменты всех окон в один список со временем от начала аудио, убирая повторы из перекрытий.
+    """
+
+    merged = []
+    for (window_start, _, own_start, own_end), segments in zip(windows, window_segments):
+        for segment in segments:
+            if "words" in segment:
+                words = [word for word in segment["words"]
+                         if own_start <= window_start + (word["start"] + word["end"]) / 2 < own_end]
+                if not words:
+                    continue
+                text, start, end = " ".join(word["word"] for word in words), words[0]["start"], words[-1]["end"]
+            else:
+                if not own_start <= window_start + (segment["start"] + segment["end"]) / 2 < own_end:
+                    continue
+                text, start, end = segment["text"], segment["start"], segment["end"]
+
+            start, end = round(window_start + start, 2), round(window_start + end, 2)
+            # 'timestamp' — начало сегмента в прежнем поле, которое читают суммаризация, тональность и метки
+            merged.append({"text": text, "start": start, "end": end, "timestamp": start})
+    return merged
+
+
+def transcribe(samples, sample_rate, backend=DEFAULT_ASR_BACKEND, window_seconds=ASR_WINDOW_SECONDS,
+               overlap_seconds=ASR_OVERLAP_SECONDS, workers=None):
+    """
+    Распознает речь во фрагменте аудио окнами фиксированной длины с перекрытием, параллельно.
+
+    Аргументы:
+    samples — отсчеты фрагмента (моно float32, значения от -1 до 1, см. audio_buffer.audio_slice).
+    sample_rate — частота дискретизации отсчетов.
+    backend — распознаватель из ASR_BACKENDS (по умолчанию DEFAULT_ASR_BACKEND).
+    window_seconds — длина окна, секунды (по умолчанию ASR_WINDOW_SECONDS).
+    overlap_seconds — перекрытие соседних окон, секунды (по умолчанию ASR_OVERLAP_SECONDS).
+    workers — сколько окон распознается одновременно (по умолчанию None — asr_thread_budget,
+              а если он не задан — по числу ядер).
+
+    Возвращает:
+    Список сегментов {'text', 'start', 'end', 'timestamp'} в порядке времени; время в секундах
+    от начала фрагмента, 'timestamp' равен 'start'. Если речи нет, возвращается один сегмент
+    на весь фрагмент с текстом UNRECOGNIZED_TEXT, если сервис распознавания недоступен — с API_ERROR_TEXT.
+
+    Описание:
+    Окна — срезы отсчетов без копирования, поэтому в памяти одновременно только передискретизированные
+    окна, которые распознаются сейчас, и время распознавания многочасового аудио делится на число потоков.
+    Распознаватель Vosk отпускает GIL на время вычислений, поэтому окна распознаются в потоках одного
+    процесса с одной общей моделью.
+    """
+
+    backend = resolve_asr_backend(backend)
+
+    duration = len(samples) / sample_rate
+    if not len(samples):
+        return [{"text": UNRECOGNIZED_TEXT, "start": 0.0, "end": 0.0, "timestamp": 0}]
+    windows = asr_windows(duration, window_seconds, overlap_seconds)
+    recognize = _RECOGNIZERS[backend]
+
+    def recognize_window(window):
+        start, end = round(window[0] * sample_rate), round(window[1] * sample_rate)
+        return recognize(samples[start:end], sample_rate)
+
+    try:
+        if len(windows) == 1:
+            window_segments = [recognize_window(windows[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(windows), workers or asr_thread_budget or os.cpu_count() or 1)) as executor:
+                window_segments = list(executor.map(recognize_window, windows))
+    except ConnectionError as e:
+        print(e)
+        return [{"text": API_ERROR_TEXT, "start": 0.0, "end": round(duration, 2), "timestamp": 0}]
+
+    segments = _merge_window_segments(windows, window_segments)
+    return segments or [{"text": UNRECOGNIZED_TEXT, "start": 0.0, "end": round(duration, 2), "timestamp": 0}]
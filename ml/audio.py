@@ -1,43 +1,51 @@
 import json  # Импорт модуля для работы с JSON-форматом
 import os  # Импорт модуля для работы с файловой системой и операциями с путями
 import numpy as np  # Импорт библиотеки для работы с числовыми массивами и математическими операциями
-import librosa  # Импорт библиотеки для обработки и анализа аудио
-from moviepy.editor import VideoFileClip  # Импорт класса для работы с видеоклипами из библиотеки MoviePy
-import speech_recognition as sr  # Импорт библиотеки для распознавания речи
-import soundfile as sf  # Импорт модуля для работы с аудиофайлами (запись/чтение)
-from transformers import pipeline  # Импорт метода для создания NLP-пайплайнов из библиотеки Transformers
-from msclap import CLAP  # Импорт модели CLAP для анализа типов звуков
 import argparse  # Импорт модуля для обработки аргументов командной строки
+import subprocess  # Ошибка ffmpeg при декодировании аудиодорожки
+import tempfile  # Импорт модуля для создания временных файлов
+from asr import ASR_BACKENDS, DEFAULT_ASR_BACKEND, load_asr_model, transcribe  # Распознавание речи окнами
+from audio_buffer import audio_slice, load_video_audio  # Аудиодорожка видео, декодированная один раз
+from checkpoints import write_json_atomic  # Импорт функции атомарной записи JSON
+from model_registry import register_model  # Реестр моделей: загрузка при первом использовании, одна на процесс
+from profiles import AUDIO_ANALYZERS, DEFAULT_PROFILE, load_profile  # Профиль анализа: какие анализаторы включены
+# Библиотеки распознавания речи (vosk, speech_recognition, см. asr), NLP-пайплайнов (transformers) и CLAP (msclap) импортируются
+# при первом использовании: анализаторы, выключенные профилем, не платят за их импорт.
+# librosa и soundfile тоже импортируются в функциях, так что импорт модуля и запуск с --help мгновенны.
+# Аудиодорожка видео декодируется один раз (см. audio_buffer), и анализаторы получают отсчеты фрагмента, а не файл
 
 
 
 # Функция для извлечения аудиодорожки из видеофайла и сохранения ее в формате .wav
-def extract_audio_from_video(video_path):
+def extract_audio_from_video(video_path, start_time=0, end_time=None, output_audio_path=None):
     """
     Извлекает аудиодорожку из указанного видеофайла и сохраняет ее как файл .wav.
 
     Аргументы:
     video_path — путь к видеофайлу, из которого нужно извлечь аудиодорожку.
+    start_time — начало извлекаемого фрагмента в секундах (по умолчанию: 0).
+    end_time — конец извлекаемого фрагмента в секундах (по умолчанию: None, то есть до конца видео).
+    output_audio_path — путь к выходному .wav файлу (по умолчанию: None — рядом с видео, с тем же именем).
 
     Возвращает:
     output_audio_path — путь к созданному аудиофайлу в формате .wav.
     Если происходит ошибка, возвращает None.
+
+    Описание:
+    Для анализа файл не нужен (см. analyze_audio); функция нужна, только чтобы сохранить фрагмент для прослушивания.
     """
 
     # Формируем путь к выходному аудиофайлу, используя имя видеофайла и меняя расширение на .wav
-    output_audio_path = os.path.splitext(video_path)[0] + ".wav"
+    if output_audio_path is None:
+        output_audio_path = os.path.splitext(video_path)[0] + ".wav"
 
-    try:
-        # --- Извлечение аудиодорожки из видео ---
-        
-        # Загружаем видеофайл с помощью VideoFileClip
-        video = VideoFileClip(video_path)
+    import soundfile as sf  # Импорт модуля для работы с аудиофайлами (запись/чтение)
 
-        # Извлекаем аудиодорожку из видео (объект audio связан с VideoFileClip)
-        audio = video.audio
+    try:
+        # --- Извлечение фрагмента из дорожки, декодированной один раз на видео ---
 
-        # Сохраняем аудиодорожку как отдельный .wav файл
-        audio.write_audiofile(output_audio_path)
+        track = load_video_audio(video_path)
+        sf.write(output_audio_path, audio_slice(track, start_time, end_time), track["sample_rate"])
 
         # Уведомление об успешном сохранении аудио
         print(f"Аудиодорожка успешно сохранена в {output_audio_path}")
@@ -52,6 +60,60 @@ def extract_audio_from_video(video_path):
         # Возвращаем None в случае ошибки
         return None
 
+# Функции для получения моделей: каждая модель загружается при первом обращении один раз на процесс
+# и затем переиспользуется (см. model_registry)
+@register_model("summarizer")
+def get_summarizer():
+    """
+    Возвращает пайплайн суммаризации на основе модели "cointegrated/rut5-base-absum".
+    Модель оптимизирована для выполнения абстрактной суммаризации текстов на русском языке.
+    """
+    from transformers import pipeline  # Импорт метода для создания NLP-пайплайнов из библиотеки Transformers
+
+    return pipeline("summarization", model="cointegrated/rut5-base-absum")
+
+
+@register_model("sentiment")
+def get_sentiment_analyzer():
+    """
+    Возвращает пайплайн анализа тональности на основе модели "blanchefort/rubert-base-cased-sentiment".
+    Модель обучена для классификации текста на POSITIVE, NEGATIVE, NEUTRAL.
+    """
+    from transformers import pipeline  # Импорт метода для создания NLP-пайплайнов из библиотеки Transformers
+
+    return pipeline("sentiment-analysis", model="blanchefort/rubert-base-cased-sentiment")
+
+
+@register_model("clap")
+def get_clap_model():
+    """
+    Возвращает модель CLAP для анализа типов звуков.
+    Параметр 'use_cuda=False' указывает на использование CPU вместо GPU.
+    """
+    from msclap import CLAP  # Импорт модели CLAP для анализа типов звуков
+
+    return CLAP(version='2022', use_cuda=False)
+
+
+def load_audio_models(analyzers=tuple(AUDIO_ANALYZERS), asr_backend=DEFAULT_ASR_BACKEND):
+    """
+    Заранее загружает аудиомодели включенных анализаторов в текущем процессе (например, при старте
+    параллельного воркера), чтобы первый шот не платил за загрузку весов.
+
+    Аргументы:
+    analyzers — включенные анализаторы аудио (по умолчанию все, см. profiles.AUDIO_ANALYZERS).
+    asr_backend — распознаватель речи (по умолчанию asr.DEFAULT_ASR_BACKEND, см. asr.ASR_BACKENDS).
+    """
+    if "transcription" in analyzers:
+        load_asr_model(asr_backend)
+    if "summary" in analyzers:
+        get_summarizer()
+    if "sentiment" in analyzers:
+        get_sentiment_analyzer()
+    if "clap" in analyzers:
+        get_clap_model()
+
+
 # Функция для очистки и нормализации текста
 def clean_text(text):
     """
@@ -105,9 +167,9 @@ def generate_summary_russian(transcriptions):
 
     # --- Инициализация модели суммаризации ---
     
-    # Создаем объект для суммаризации, используя предобученную модель "cointegrated/rut5-base-absum".
-    # Эта модель оптимизирована для выполнения абстрактной суммаризации текстов на русском языке.
-    summarizer = pipeline("summarization", model="cointegrated/rut5-base-absum")
+    # Получаем объект для суммаризации, используя предобученную модель "cointegrated/rut5-base-absum".
+    # Модель загружается один раз на процесс (см. get_summarizer).
+    summarizer = get_summarizer()
 
     # Инициализация пустого списка для хранения результатов суммаризации
     summary_results = []
@@ -136,62 +198,25 @@ def generate_summary_russian(transcriptions):
     # Возвращаем список с результатами суммаризации
     return summary_results
 
-# Функция для загрузки аудиофайла и его транскрипции
-def split_audio_and_transcribe(audio_path):
+# Функция для транскрипции фрагмента аудио
+def split_audio_and_transcribe(samples, sample_rate, backend=DEFAULT_ASR_BACKEND):
     """
-    Загружает аудиофайл, разделяет его на фрагменты (при необходимости) и выполняет распознавание речи.
+    Выполняет распознавание речи во фрагменте аудио: фрагмент делится на окна с перекрытием,
+    которые распознаются параллельно (см. asr.transcribe).
 
     Аргументы:
-    audio_path — путь к аудиофайлу, который нужно транскрибировать.
+    samples — отсчеты фрагмента (моно float32, значения от -1 до 1, см. audio_buffer.audio_slice).
+    sample_rate — частота дискретизации отсчетов.
+    backend — распознаватель речи (по умолчанию asr.DEFAULT_ASR_BACKEND — онлайн API Google; 'vosk' — офлайн-модель).
 
     Возвращает:
-    transcription_results — список словарей, каждый из которых содержит:
+    transcription_results — список сегментов речи в порядке времени, каждый из которых содержит:
         - 'text': распознанный текст (или сообщение об ошибке).
-        - 'timestamp': временная метка начала (для текущей реализации фиксированное значение 0).
+        - 'start', 'end': начало и конец сегмента в секундах от начала фрагмента.
+        - 'timestamp': то же, что 'start'.
     """
 
-    # --- Шаг 1: Загрузка аудиофайла с помощью библиотеки librosa ---
-    
-    # Загружаем аудиофайл и получаем аудиоданные (waveform) и частоту дискретизации (sample_rate)
-    audio, sample_rate = librosa.load(audio_path, sr=None)  # sr=None означает использование оригинальной частоты файла
-
-    # --- Шаг 2: Инициализация распознавателя и подготовка для работы с аудиофайлом ---
-    
-    recognizer = sr.Recognizer()  # Создаем объект распознавателя речи из библиотеки SpeechRecognition
-    
-    # Список для хранения результатов транскрипции
-    transcription_results = []
-
-    # --- Шаг 3: Чтение аудиофайла с помощью SpeechRecognition ---
-    
-    # Открываем аудиофайл с помощью `sr.AudioFile` для последующего распознавания
-    with sr.AudioFile(audio_path) as source:
-        
-        # Считываем весь аудиофайл целиком в объект `audio_data`
-        audio_data = recognizer.record(source)
-
-        # --- Шаг 4: Попытка распознавания речи ---
-        
-        try:
-            # Распознаем русский текст с помощью API Google
-            text = recognizer.recognize_google(audio_data, language="ru-RU")
-
-            # Сохраняем результат в список транскрипций с временной меткой 0
-            transcription_results = [{'text': text, 'timestamp': 0}]
-
-        # --- Обработка ошибок распознавания ---
-        
-        # Если речь не распознана (например, тишина или неразборчивый текст)
-        except sr.UnknownValueError:
-            transcription_results = [{'text': "[Не удалось распознать]", 'timestamp': 0}]
-        
-        # Если возникла ошибка при подключении или запросе к API Google
-        except sr.RequestError as e:
-            print(f"Ошибка API распознавания речи: {e}")
-            transcription_results = [{'text': "[Ошибка API]", 'timestamp': 0}]
-
-    # Возвращаем список результатов транскрипции
-    return transcription_results
+    return transcribe(samples, sample_rate, backend)
 
 # Функция для анализа тональности текста (позитивная, негативная, нейтральная)
 def analyze_sentiment(transcriptions):
@@ -213,9 +238,9 @@ def analyze_sentiment(transcriptions):
 
     # --- Инициализация модели анализа тональности ---
     
-    # Создаем объект анализа тональности (sentiment analyzer), используя предобученную модель на русском языке
-    # Модель "blanchefort/rubert-base-cased-sentiment" обучена для классификации текста на POSITIVE, NEGATIVE, NEUTRAL.
-    sentiment_analyzer = pipeline("sentiment-analysis", model="blanchefort/rubert-base-cased-sentiment")
+    # Получаем объект анализа тональности (sentiment analyzer), используя предобученную модель на русском языке
+    # Модель "blanchefort/rubert-base-cased-sentiment" загружается один раз на процесс (см. get_sentiment_analyzer).
+    sentiment_analyzer = get_sentiment_analyzer()
 
     # Инициализация пустого списка для хранения результатов анализа
     sentiment_results = []
@@ -390,12 +415,13 @@ def extract_key_events(transcriptions, keyword_library=None):
 
 
 # Функция для выполнения базового анализа звуковых характеристик аудиофайла
-def analyze_soundscape(audio_path):
+def analyze_soundscape(samples, sample_rate):
     """
-    Выполняет базовый анализ звуковых характеристик аудиофайла с помощью RMS и спектральных признаков.
+    Выполняет базовый анализ звуковых характеристик фрагмента аудио с помощью RMS и спектральных признаков.
     
     Аргументы:
-    audio_path — путь к аудиофайлу, который нужно проанализировать.
+    samples — отсчеты фрагмента (моно float32, см. audio_buffer.audio_slice).
+    sample_rate — частота дискретизации отсчетов.
     
     Возвращает:
     Словарь (dictionary), содержащий основные аудиометрики:
@@ -404,11 +430,11 @@ def analyze_soundscape(audio_path):
     - 'spectral_bandwidth': средняя спектральная ширина (Bandwidth).
     """
 
-    # --- Шаг 1: Загрузка аудиофайла и получение волновой формы и частоты дискретизации ---
-    
-    # Загружаем аудиофайл с помощью `librosa.load`, возвращая волновую форму (y) и частоту дискретизации (sr)
-    # `sr=None` означает, что будет использована оригинальная частота дискретизации файла
-    y, sr = librosa.load(audio_path, sr=None)
+    # --- Шаг 1: Волновая форма (y) и частота дискретизации (sr) — отсчеты уже декодированы ---
+
+    import librosa  # Импорт библиотеки для обработки и анализа аудио
+
+    y, sr = np.asarray(samples), sample_rate
 
     # --- Шаг 2: Вычисление базовых звуковых характеристик ---
 
@@ -435,12 +461,13 @@ def analyze_soundscape(audio_path):
 
 
 # Функция для анализа аудиофайла и определения типов звуков с помощью модели CLAP
-def analyze_clap(audio_path, num_top_classes=3, similarity_threshold=0.5):
+def analyze_clap(samples, sample_rate, num_top_classes=3, similarity_threshold=0.5):
     """
-    Выполняет анализ аудиофайла с использованием модели CLAP, чтобы определить типы звуков в записи.
+    Выполняет анализ фрагмента аудио с использованием модели CLAP, чтобы определить типы звуков в записи.
 
     Аргументы:
-    audio_path — путь к аудиофайлу, который нужно проанализировать.
+    samples — отсчеты фрагмента (моно float32, см. audio_buffer.audio_slice).
+    sample_rate — частота дискретизации отсчетов.
     num_top_classes — количество наиболее вероятных классов звуков, которые нужно вернуть (по умолчанию: 3).
     similarity_threshold — минимальный порог для значения похожести, чтобы класс считался значимым (по умолчанию: 0.5).
 
@@ -450,9 +477,8 @@ def analyze_clap(audio_path, num_top_classes=3, similarity_threshold=0.5):
 
     # --- Шаг 1: Инициализация модели CLAP ---
 
-    # Создаем объект модели CLAP для анализа звука
-    # Параметр 'use_cuda=False' указывает на использование CPU вместо GPU
-    clap_model = CLAP(version='2022', use_cuda=False)
+    # Получаем объект модели CLAP для анализа звука (загружается один раз на процесс, см. get_clap_model)
+    clap_model = get_clap_model()
 
     # --- Шаг 2: Определение списка целевых классов звуков ---
 
@@ -471,19 +497,23 @@ def analyze_clap(audio_path, num_top_classes=3, similarity_threshold=0.5):
     # Используем модель CLAP для получения эмбеддингов для каждого звукового класса из списка `class_labels`
     text_embeddings = clap_model.get_text_embeddings(class_labels)
 
-    # --- Шаг 4: Загрузка и подготовка аудиофайла ---
+    # --- Шаг 4: Подготовка аудиофайла ---
 
-    # Загружаем аудиофайл с помощью `librosa.load`, возвращая волновую форму (y) и частоту дискретизации (sr)
-    y, sr = librosa.load(audio_path, sr=None)
+    import soundfile as sf  # Импорт модуля для работы с аудиофайлами (запись/чтение)
 
-    # Сохраняем временный аудиофайл в формате WAV (так как CLAP требует wav-формат)
-    # `sf.write` записывает массив амплитуд `y` и частоту дискретизации `sr` в указанный файл 'temp_audio.wav'
-    sf.write('temp_audio.wav', y, sr)
+    # Сохраняем временный аудиофайл в формате WAV прямо из отсчетов (CLAP принимает только пути к файлам)
+    # Имя файла уникально для каждого вызова, чтобы параллельные процессы не перезаписывали файлы друг друга
+    with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
+        temp_audio_path = tmp.name
+    sf.write(temp_audio_path, samples, sample_rate)
 
     # --- Шаг 5: Получение аудиоэмбеддингов для загруженного аудиофайла ---
 
     # Используем модель CLAP для получения аудиоэмбеддингов для временного WAV файла
-    audio_embeddings = clap_model.get_audio_embeddings(['temp_audio.wav'])
+    try:
+        audio_embeddings = clap_model.get_audio_embeddings([temp_audio_path])
+    finally:
+        os.remove(temp_audio_path)
 
     # --- Шаг 6: Расчет похожести между аудио и текстовыми эмбеддингами ---
 
@@ -683,82 +713,137 @@ def save_results_to_json(video_name, transcriptions, summary_results, sentiment_
 
     # --- Шаг 4: Запись данных обратно в JSON файл ---
     
-    # Открываем файл для записи (перезаписываем существующие данные или создаем новый)
-    with open(output_file, "w", encoding="utf-8") as f:
-        # Записываем данные в JSON-файл с параметром `ensure_ascii=False` для корректной работы с кириллицей
-        json.dump(data, f, ensure_ascii=False, indent=4)  # Параметр `indent=4` задает красивое форматирование
+    # Записываем файл атомарно: при падении процесса во время записи на диске останется прежняя целая версия
+    # (файл результатов служит чекпоинтом для перезапуска конвейера)
+    write_json_atomic(data, output_file)
 
     # --- Сообщение об успешном сохранении ---
     
     print(f"Результаты для видео '{video_name}' успешно сохранены в {output_file}")
 
 
-# Основная функция для анализа аудио, извлеченного из видео, и сохранения результатов
-def process_video_to_audio_analysis(video_path, output_path, start_time=0, end_time=None):
+# Функция для анализа аудио, извлеченного из видео, без сохранения результатов
+def analyze_audio(video_path, start_time=0, end_time=None, audio_output_path=None, analyzers=tuple(AUDIO_ANALYZERS),
+                  audio_cache_dir=None, asr_backend=DEFAULT_ASR_BACKEND):
     """
-    Выполняет полный анализ аудиофайла, извлеченного из видео, и сохраняет результаты в JSON файл.
+    Выполняет полный анализ аудиодорожки видео (или ее фрагмента) и возвращает результаты.
 
     Аргументы:
     video_path — путь к видеофайлу, который нужно проанализировать.
-    output_path — путь к выходному JSON файлу для сохранения результатов.
     start_time — начальная точка анализа (в секундах) (по умолчанию: 0).
     end_time — конечная точка анализа (в секундах) (по умолчанию: None, то есть до конца видео).
+    audio_output_path — путь, куда дополнительно сохранить фрагмент в .wav (по умолчанию: None — файл не пишется,
+                        анализаторы получают отсчеты из памяти).
+    analyzers — включенные анализаторы (по умолчанию все, см. profiles.AUDIO_ANALYZERS).
+                Выключенные не запускаются, а их результаты равны None.
+    audio_cache_dir — папка аудиокэша на диске (по умолчанию: None — дорожка декодируется в память процесса,
+                      см. audio_buffer.load_video_audio).
+    asr_backend — распознаватель речи (по умолчанию asr.DEFAULT_ASR_BACKEND, см. asr.ASR_BACKENDS).
 
     Возвращает:
-    Ничего не возвращает. Сохраняет все результаты в указанный выходной файл JSON.
+    Словарь с результатами анализа, ключи которого совпадают с аргументами `save_results_to_json`:
+    'transcriptions', 'summary_results', 'sentiment_results', 'soundscape_results',
+    'clap_results', 'key_events', 'labeled_transcriptions'.
+    Если аудио извлечь не удалось, возвращает None.
     """
 
-    # --- Шаг 1: Получение имени видео без расширения ---
-    
-    # Извлекаем имя видеофайла (без расширения) для использования в структуре выходного файла
-    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    results = dict.fromkeys(("transcriptions", "summary_results", "sentiment_results", "soundscape_results",
+                             "clap_results", "key_events", "labeled_transcriptions"))
 
-    # Путь к выходному JSON файлу
-    json_output_file = output_path
+    # Если все аудиоанализаторы выключены, аудио даже не извлекается
+    if not analyzers:
+        return results
 
-    # --- Шаг 2: Извлечение аудио из видео ---
+    # --- Шаг 1: Аудиодорожка видео (декодируется один раз на видео, а не на каждый фрагмент) ---
 
-    # Используем функцию extract_audio_from_video, чтобы извлечь аудиодорожку из указанного видеофайла
-    extracted_audio_path = extract_audio_from_video(video_path)
+    try:
+        track = load_video_audio(video_path, audio_cache_dir)
+    except (OSError, subprocess.CalledProcessError) as e:
+        # Если аудио не было извлечено (нет файла, нет аудиодорожки, ошибка ffmpeg), выводим сообщение об ошибке
+        print(f"Ошибка декодирования аудио: {e}")
+        print("Аудио не было извлечено.")
+        return None
 
-    # --- Шаг 3: Проверка успешного извлечения аудиодорожки ---
+    # --- Шаг 2: Отсчеты фрагмента — срез дорожки без копирования ---
 
-    if extracted_audio_path:  # Если извлечение прошло успешно (путь к аудиофайлу не пустой)
-        
-        # --- Шаг 4: Анализ аудиофайла и его содержимого ---
+    samples, sample_rate = audio_slice(track, start_time, end_time), track["sample_rate"]
 
-        # 1. Распознавание речи и получение транскрипций
-        transcriptions = split_audio_and_transcribe(extracted_audio_path)
+    if audio_output_path:
+        import soundfile as sf  # Импорт модуля для работы с аудиофайлами (запись/чтение)
+        sf.write(audio_output_path, samples, sample_rate)
 
-        # 2. Генерация суммаризаций текста на основе транскрипций
-        summary_results = generate_summary_russian(transcriptions)
+    # --- Шаг 3: Анализ фрагмента аудио (только включенные анализаторы) ---
 
-        # 3. Анализ тональности (sentiment analysis) для каждого сегмента транскрипции
-        sentiment_results = analyze_sentiment(transcriptions)
+    # 1. Распознавание речи и получение транскрипций
+    if "transcription" in analyzers:
+        results["transcriptions"] = split_audio_and_transcribe(samples, sample_rate, asr_backend)
+    transcriptions = results["transcriptions"]
 
-        # 4. Выполнение базового анализа звуковых характеристик (RMS, спектральный центр и ширина)
-        soundscape_results = analyze_soundscape(extracted_audio_path)
+    # 2. Генерация суммаризаций текста на основе транскрипций
+    if "summary" in analyzers:
+        results["summary_results"] = generate_summary_russian(transcriptions)
 
-        # 5. Определение типов звуков с помощью модели CLAP (анализ шумов, речи и других типов звуков)
-        clap_results = analyze_clap(extracted_audio_path)
+    # 3. Анализ тональности (sentiment analysis) для каждого сегмента транскрипции
+    if "sentiment" in analyzers:
+        results["sentiment_results"] = analyze_sentiment(transcriptions)
 
-        # 6. Извлечение ключевых событий на основе совпадений с ключевыми словами из библиотеки
-        key_events = extract_key_events(transcriptions)
+    # 4. Выполнение базового анализа звуковых характеристик (RMS, спектральный центр и ширина)
+    if "soundscape" in analyzers:
+        results["soundscape_results"] = analyze_soundscape(samples, sample_rate)
 
-        # 7. Присвоение меток транскрипциям на основе содержания текста (категоризация)
-        labeled_transcriptions = label_text_based_on_content(transcriptions, build_label_dictionaries())
+    # 5. Определение типов звуков с помощью модели CLAP (анализ шумов, речи и других типов звуков)
+    if "clap" in analyzers:
+        results["clap_results"] = analyze_clap(samples, sample_rate)
 
-        # --- Шаг 5: Сохранение всех результатов анализа в выходной JSON файл ---
+    # 6. Извлечение ключевых событий на основе совпадений с ключевыми словами из библиотеки
+    if "key_events" in analyzers:
+        results["key_events"] = extract_key_events(transcriptions)
 
-        # Сохраняем результаты в указанный JSON файл
-        save_results_to_json(
-            video_name, transcriptions, summary_results, sentiment_results,
-            soundscape_results, clap_results, key_events, labeled_transcriptions, json_output_file
-        )
+    # 7. Присвоение меток транскрипциям на основе содержания текста (категоризация)
+    if "labels" in analyzers:
+        results["labeled_transcriptions"] = label_text_based_on_content(transcriptions, build_label_dictionaries())
 
-    else:
-        # Если аудио не было извлечено, выводим сообщение об ошибке
-        print("Аудио не было извлечено.")
+    return results
+
+
+# Основная функция для анализа аудио, извлеченного из видео, и сохранения результатов
+def process_video_to_audio_analysis(video_path, output_path, start_time=0, end_time=None,
+                                    video_name=None, audio_output_path=None, analyzers=tuple(AUDIO_ANALYZERS),
+                                    audio_cache_dir=None, asr_backend=DEFAULT_ASR_BACKEND):
+    """
+    Выполняет полный анализ аудиофайла, извлеченного из видео, и сохраняет результаты в JSON файл.
+
+    Аргументы:
+    video_path — путь к видеофайлу, который нужно проанализировать.
+    output_path — путь к выходному JSON файлу для сохранения результатов.
+    start_time — начальная точка анализа (в секундах) (по умолчанию: 0).
+    end_time — конечная точка анализа (в секундах) (по умолчанию: None, то есть до конца видео).
+    video_name — ключ для результатов в JSON (по умолчанию: None — имя видеофайла без расширения).
+    audio_output_path — путь, куда дополнительно сохранить фрагмент в .wav (по умолчанию: None — файл не пишется).
+    analyzers — включенные анализаторы (по умолчанию все, см. profiles.AUDIO_ANALYZERS).
+                Результаты выключенных анализаторов записываются в JSON как null.
+    audio_cache_dir — папка аудиокэша на диске (по умолчанию: None — дорожка декодируется в память процесса).
+    asr_backend — распознаватель речи (по умолчанию asr.DEFAULT_ASR_BACKEND, см. asr.ASR_BACKENDS).
+
+    Возвращает:
+    Ничего не возвращает. Сохраняет все результаты в указанный выходной файл JSON.
+    """
+
+    # --- Шаг 1: Получение имени видео без расширения ---
+    
+    # Извлекаем имя видеофайла (без расширения) для использования в структуре выходного файла
+    if video_name is None:
+        video_name = os.path.splitext(os.path.basename(video_path))[0]
+
+    # --- Шаг 2: Анализ аудиодорожки ---
+
+    results = analyze_audio(video_path, start_time, end_time, audio_output_path, analyzers, audio_cache_dir,
+                            asr_backend)
+
+    # --- Шаг 3: Сохранение всех результатов анализа в выходной JSON файл ---
+
+    if results is not None:
+        save_results_to_json(video_name, output_file=output_path, **results)
 
 # Основной блок кода, который запускается, когда скрипт выполняется напрямую (например, через консоль)
 if __name__ == "__main__":
@@ -779,6 +864,14 @@ if __name__ == "__main__":
     # 2. Имя выходного JSON файла для сохранения результатов (обязательный аргумент)
     parser.add_argument("output_file", type=str, help="Имя выходного файла JSON.")
 
+    # 3. Профиль анализа: имя готового профиля или путь к JSON файлу со списком анализаторов
+    parser.add_argument("--profile", type=str, default=DEFAULT_PROFILE,
+                        help="Профиль анализа: имя готового профиля (см. profiles.PROFILE_PRESETS) или путь к JSON файлу.")
+
+    # 4. Распознаватель речи
+    parser.add_argument("--asr-backend", choices=list(ASR_BACKENDS), default=DEFAULT_ASR_BACKEND,
+                        help="Распознаватель речи: онлайн google (по умолчанию) или офлайн vosk.")
+
     # --- Шаг 2: Парсинг аргументов и передача их в переменные ---
 
     # Разбираем аргументы, переданные через командную строку, и сохраняем их в объект `args`
@@ -787,4 +880,5 @@ if __name__ == "__main__":
     # --- Шаг 3: Вызов основной функции анализа видео ---
 
     # Передаем аргументы, полученные из командной строки, в функцию анализа видео
-    process_video_to_audio_analysis(args.video_path, args.output_file)
+    process_video_to_audio_analysis(args.video_path, args.output_file,
+                                    analyzers=load_profile(args.profile)["audio"], asr_backend=args.asr_backend)
@@ -0,0 +1,183 @@
+# --- Стандартные библиотеки Python ---
+import os  # Библиотека для работы с файловой системой (пути к файлам аудиокэша, атомарная замена)
+import re  # Поиск аудиопотока в выводе ffmpeg
+import subprocess  # Запуск ffmpeg с выводом PCM в канал
+from functools import lru_cache  # Аудиодорожка последнего видео хранится в памяти процесса
+
+# --- Библиотеки для работы с данными ---
+import numpy as np  # Библиотека для работы с массивами (отсчеты аудио, memmap)
+
+# --- Модули проекта ---
+from checkpoints import load_json_safe, video_fingerprint, write_json_atomic  # Индекс кэша и проверка видео
+from ffmpeg_utils import ffmpeg_binary  # Тот же ffmpeg, что у MoviePy
+
+# Частота дискретизации декодированной дорожки: та же, с которой MoviePy раньше писал .wav шотов
+AUDIO_SAMPLE_RATE = 44100
+
+# Дорожки длиннее этого (в секундах) декодируются в файл на диске и читаются через memmap,
+# а не держатся в памяти процесса: час моно-аудио float32 на 44.1 кГц — это около 635 МБ
+AUDIO_IN_MEMORY_MAX_SECONDS = 20 * 60
+
+# Размер блока чтения из канала ffmpeg при записи дорожки в файл
+PIPE_CHUNK_BYTES = 1 << 20
+
+
+def _ffmpeg_audio_args(video_path, sample_rate):
+    """
+    Возвращает аргументы ffmpeg, которые декодируют первую аудиодорожку видео в моно float32 и пишут ее в stdout.
+    """
+
+    return [ffmpeg_binary(), "-hide_banner", "-nostdin", "-loglevel", "error", "-i", video_path,
+            "-map", "0:a:0", "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "f32le", "pipe:1"]
+
+
+def has_audio_stream(video_path):
+    """
+    Проверяет, есть ли у видео аудиодорожка (по списку потоков, который ffmpeg печатает при открытии файла).
+
+    Возвращает:
+    True или False; None, если ffmpeg не смог прочитать файл (потоков не видно вовсе).
+    """
+
+    # Без выходного файла ffmpeg завершается с ошибкой, но успевает напечатать потоки входного файла
+    result = subprocess.run([ffmpeg_binary(), "-hide_banner", "-nostdin", "-i", video_path],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace")
+    if not re.search(r"Stream #\d+:\d+", result.stderr):
+        return None
+    return re.search(r"Stream #\d+:\d+\S*: Audio:", result.stderr) is not None
+
+
+def decode_audio(video_path, sample_rate=AUDIO_SAMPLE_RATE):
+    """
+    Декодирует аудиодорожку видео в память одним вызовом ffmpeg (без промежуточных файлов).
+
+    Аргументы:
+    video_path — путь к видеофайлу.
+    sample_rate — частота дискретизации (по умолчанию AUDIO_SAMPLE_RATE).
+
+    Возвращает:
+    Одномерный массив float32 (моно, значения от -1 до 1) только для чтения.
+    Если у видео нет аудиодорожки или ffmpeg завершился с ошибкой, выбрасывается subprocess.CalledProcessError.
+    """
+
+    result = subprocess.run(_ffmpeg_audio_args(video_path, sample_rate), stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, check=True)
+    # Массив смотрит прямо в байты, прочитанные из канала, без копирования
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def audio_cache_paths(video_path, cache_dir):
+    """
+    Возвращает пути к файлам аудиокэша видео: отсчетам (.f32) и индексу (.json).
+    """
+
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    base = os.path.join(cache_dir, f"{video_name}_audio")
+    return base + ".f32", base + ".json"
+
+
+def build_audio_cache(video_path, cache_dir, sample_rate=AUDIO_SAMPLE_RATE):
+    """
+    Декодирует аудиодорожку видео в файл отсчетов float32 на диске, читая канал ffmpeg блоками.
+
+    Аргументы:
+    video_path — путь к видеофайлу.
+    cache_dir — папка аудиокэша.
+    sample_rate — частота дискретизации (по умолчанию AUDIO_SAMPLE_RATE).
+
+    Возвращает:
+    Открытую дорожку (см. open_audio_cache).
+
+    Описание:
+    Дорожка целиком в памяти процесса не собирается, а индекс пишется последним: недописанный файл
+    никогда не будет принят за готовый кэш.
+    """
+
+    samples_path, index_path = audio_cache_paths(video_path, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{samples_path}.{os.getpid()}.tmp"  # Свой файл у каждого процесса, если кэш строят одновременно
+
+    with open(tmp_path, "wb") as f:
+        process = subprocess.Popen(_ffmpeg_audio_args(video_path, sample_rate), stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+        for chunk in iter(lambda: process.stdout.read(PIPE_CHUNK_BYTES), b""):
+            f.write(chunk)
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, process.args, stderr=stderr)
+
+    os.replace(tmp_path, samples_path)
+    sample_count = os.path.getsize(samples_path) // np.dtype(np.float32).itemsize
+    write_json_atomic({"video": video_fingerprint(video_path), "sample_rate": sample_rate,
+                       "sample_count": sample_count}, index_path)
+    print(f"Аудиодорожка сохранена в {samples_path}: {sample_count / sample_rate:.1f} с")
+
+    return open_audio_cache(video_path, cache_dir, sample_rate)
+
+
+def open_audio_cache(video_path, cache_dir, sample_rate=AUDIO_SAMPLE_RATE):
+    """
+    Открывает готовый аудиокэш видео без чтения его в память.
+
+    Возвращает:
+    Словарь {'samples': массив float32, открытый через memmap только на чтение, 'sample_rate': частота}
+    или None, если кэша нет, он построен для другой версии видеофайла или с другой частотой.
+    """
+
+    samples_path, index_path = audio_cache_paths(video_path, cache_dir)
+    index = load_json_safe(index_path)
+    if (not index or index.get("video") != video_fingerprint(video_path) or index.get("sample_rate") != sample_rate
+            or not os.path.exists(samples_path)):
+        return None
+
+    # memmap не открывает пустой файл: у видео с пустой дорожкой просто нет отсчетов
+    if index["sample_count"] == 0:
+        samples = np.zeros(0, dtype=np.float32)
+    else:
+        samples = np.memmap(samples_path, dtype=np.float32, mode="r", shape=(index["sample_count"],))
+    return {"samples": samples, "sample_rate": sample_rate}
+
+
+@lru_cache(maxsize=1)
+def _decoded_audio(video_path, size, mtime, sample_rate):
+    """
+    Декодирует дорожку в память один раз на процесс для данной версии видеофайла (size и mtime входят в ключ кэша).
+    """
+
+    return {"samples": decode_audio(video_path, sample_rate), "sample_rate": sample_rate}
+
+
+def load_video_audio(video_path, cache_dir=None, sample_rate=AUDIO_SAMPLE_RATE):
+    """
+    Возвращает аудиодорожку видео, декодированную один раз на видео.
+
+    Аргументы:
+    video_path — путь к видеофайлу.
+    cache_dir — папка аудиокэша (по умолчанию None — дорожка декодируется в память процесса и хранится в ней,
+                пока не понадобится дорожка другого видео). Если указана, дорожка декодируется в файл один раз
+                и открывается через memmap: так ее читают все воркеры и повторные запуски.
+    sample_rate — частота дискретизации (по умолчанию AUDIO_SAMPLE_RATE).
+
+    Возвращает:
+    Словарь {'samples': одномерный массив float32, 'sample_rate': частота}.
+    """
+
+    if cache_dir is None:
+        fingerprint = video_fingerprint(video_path)
+        return _decoded_audio(fingerprint["video_path"], fingerprint["size"], fingerprint["mtime"], sample_rate)
+
+    track = open_audio_cache(video_path, cache_dir, sample_rate)
+    if track is None:
+        track = build_audio_cache(video_path, cache_dir, sample_rate)
+    return track
+
+
+def audio_slice(track, start_time=0, end_time=None):
+    """
+    Возвращает отсчеты фрагмента дорожки от start_time до end_time (в секундах; None — до конца) без копирования.
+    """
+
+    sample_rate = track["sample_rate"]
+    start = max(0, round(start_time * sample_rate))
+    end = None if end_time is None else max(start, round(end_time * sample_rate))
+    return track["samples"][start:end]
@@ -0,0 +1,188 @@
+# --- Стандартные библиотеки Python ---
+import json  # Библиотека для работы с JSON файлами (чтение, запись, парсинг)
+import os  # Библиотека для работы с файловой системой (проверка файлов, время изменения, атомарная замена)
+
+# Ключи, которые обязательно должны присутствовать в результатах аудиоанализа шота (см. audio.save_results_to_json)
+AUDIO_RESULT_KEYS = (
+    "transcriptions", "summary", "sentiment_analysis", "soundscape_analysis",
+    "clap_analysis", "key_events", "labeled_transcriptions"
+)
+
+# Ключи, которые обязательно должны присутствовать в результатах анализа каждого кадра (см. video.analyze_video)
+VIDEO_FRAME_KEYS = ("frame", "detections", "events", "poi")
+
+# Поля кадра, которые лежат внутри 'poi'
+VIDEO_POI_KEYS = ("faces", "moving_objects", "salient_regions")
+
+# Поля кадра, которые заполняют анализаторы (выключенные профилем анализа равны null)
+VIDEO_RESULT_FIELDS = ("detections", "events") + VIDEO_POI_KEYS
+
+# Результат аудиоанализа шота видео без аудиодорожки. Это окончательный результат: такой шот при перезапуске
+# не пересчитывается (в отличие от None — аудио не удалось извлечь, например, из-за ошибки ffmpeg)
+NO_AUDIO_STREAM = {"no_audio_stream": True}
+
+
+def write_json_atomic(data, output_file):
+    """
+    Записывает данные в JSON файл атомарно: сначала во временный файл рядом, затем заменяет им целевой.
+
+    Аргументы:
+    data — сериализуемый объект (словарь или список).
+    output_file — путь к выходному JSON файлу.
+
+    Описание:
+    Если процесс упадет во время записи, на диске останется прежняя целая версия файла,
+    а не обрезанный JSON — иначе при перезапуске были бы потеряны результаты всех уже посчитанных шотов.
+    """
+
+    temp_file = f"{output_file}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+    os.replace(temp_file, output_file)  # Атомарная замена файла (в пределах одной файловой системы)
+
+
+def load_json_safe(file_path):
+    """
+    Загружает JSON файл, если он существует и читается.
+
+    Аргументы:
+    file_path — путь к JSON файлу.
+
+    Возвращает:
+    Загруженные данные или None, если файла нет или он поврежден.
+    """
+
+    if not os.path.exists(file_path):
+        return None
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Файл {file_path} не удалось прочитать, он будет пересчитан: {e}")
+        return None
+
+
+def is_valid_audio_result(entry, required_keys=AUDIO_RESULT_KEYS):
+    """
+    Проверяет, что запись с результатами аудиоанализа шота полная и пригодна для кластеризации.
+
+    Аргументы:
+    entry — значение из JSON файла аудиорезультатов для одного шота.
+    required_keys — разделы, которые должны быть посчитаны (по умолчанию все). Разделы анализаторов,
+                    выключенных профилем анализа (см. profiles), равны null и в проверку не входят.
+
+    Возвращает:
+    True, если все разделы анализа на месте, нужные посчитаны, а транскрипция и тональность не пустые
+    (их первые элементы используются в clastersTojson.merge_shot_data), или если у видео нет аудиодорожки
+    (entry равен NO_AUDIO_STREAM).
+    """
+
+    if entry == NO_AUDIO_STREAM:
+        return True
+    if not isinstance(entry, dict) or any(key not in entry for key in AUDIO_RESULT_KEYS):
+        return False
+    if any(entry[key] is None for key in required_keys):
+        return False
+    return all(bool(entry[key]) for key in ("transcriptions", "sentiment_analysis") if key in required_keys)
+
+
+def is_valid_video_result(entry, required_fields=VIDEO_RESULT_FIELDS):
+    """
+    Проверяет, что запись с результатами видеоанализа шота полная.
+
+    Аргументы:
+    entry — значение из JSON файла видеорезультатов для одного шота (список кадров).
+    required_fields — поля кадра, которые должны быть посчитаны (по умолчанию все; поля из VIDEO_POI_KEYS
+                      ищутся внутри 'poi'). Поля анализаторов, выключенных профилем анализа, равны null.
+
+    Возвращает:
+    True, если это непустой список кадров, у каждого кадра есть все обязательные поля и нужные поля посчитаны.
+    Пустой список допустим, только если профиль не требует ни одного поля (все анализаторы кадров выключены):
+    у любого шота есть хотя бы один ключевой кадр, и пустой список означает, что кадры потерялись.
+    """
+
+    if not isinstance(entry, list):
+        return False
+    if not entry:
+        return not required_fields
+
+    def is_complete(frame):
+        if not isinstance(frame, dict) or any(key not in frame for key in VIDEO_FRAME_KEYS):
+            return False
+        poi = frame["poi"] or {}
+        return all((poi.get(field) if field in VIDEO_POI_KEYS else frame[field]) is not None
+                   for field in required_fields)
+
+    return all(is_complete(frame) for frame in entry)
+
+
+def is_stage_up_to_date(output_file, input_files):
+    """
+    Проверяет, можно ли пропустить этап конвейера: его результат уже есть и новее всех входных файлов.
+
+    Аргументы:
+    output_file — путь к файлу результата этапа.
+    input_files — список путей к входным файлам этапа.
+
+    Возвращает:
+    True, если результат существует, читается и не старше ни одного из входных файлов.
+    """
+
+    if load_json_safe(output_file) is None:
+        return False
+    if not all(os.path.exists(path) for path in input_files):
+        return False
+
+    output_mtime = os.path.getmtime(output_file)
+    return all(os.path.getmtime(path) <= output_mtime for path in input_files)
+
+
+def video_fingerprint(video_path):
+    """
+    Возвращает отпечаток исходного видео, по которому проверяется, что чекпоинты относятся к нему.
+
+    Аргументы:
+    video_path — путь к видеофайлу.
+
+    Возвращает:
+    Словарь с абсолютным путем, размером и временем изменения файла.
+    """
+
+    return {
+        "video_path": os.path.abspath(video_path),
+        "size": os.path.getsize(video_path),
+        "mtime": os.path.getmtime(video_path)
+    }
+
+
+def load_run_manifest(manifest_file, video_path):
+    """
+    Загружает манифест прошлого запуска и проверяет, что он сделан для того же видео.
+
+    Аргументы:
+    manifest_file — путь к JSON файлу манифеста.
+    video_path — путь к текущему видеофайлу.
+
+    Возвращает:
+    Словарь манифеста (с сохраненными таймингами шотов в ключе 'shot_timings') или None,
+    если манифеста нет или он относится к другому видео.
+    """
+
+    manifest = load_json_safe(manifest_file)
+    if not manifest or manifest.get("video") != video_fingerprint(video_path):
+        return None
+    return manifest
+
+
+def save_run_manifest(manifest_file, video_path, shot_timings):
+    """
+    Сохраняет манифест запуска: отпечаток видео и найденные шоты.
+    Благодаря ему перезапуск не повторяет разбиение видео на шоты.
+
+    Аргументы:
+    manifest_file — путь к JSON файлу манифеста.
+    video_path — путь к видеофайлу.
+    shot_timings — словарь таймингов шотов.
+    """
+
+    write_json_atomic({"video": video_fingerprint(video_path), "shot_timings": shot_timings}, manifest_file)
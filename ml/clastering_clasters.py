@@ -2,9 +2,6 @@
 import json  # Импорт модуля для работы с JSON (чтение и запись данных)
 import re  # Импорт модуля для работы с регулярными выражениями (поиск и замена шаблонов в строках)
 
-# Импорт классов и функций из библиотеки sklearn
-from sklearn.feature_extraction.text import TfidfVectorizer  # Импорт класса для векторизации текста с помощью TF-IDF
-
 # Импорт класса Counter из стандартного модуля collections для подсчета частоты элементов в коллекциях
 from collections import Counter
 
@@ -593,6 +590,8 @@ def process_clusters(input_file, json_output_audio_path, json_output_video_path,
     ]
 
     # Векторизация текстовых описаний с помощью TF-IDF
+    from sklearn.feature_extraction.text import TfidfVectorizer  # Импорт здесь: sklearn нужен только на этапе кластеризации
+
     vectorizer = TfidfVectorizer()
     description_matrix = vectorizer.fit_transform(cluster_descriptions)
 
@@ -1,11 +1,7 @@
 import json  # Импорт модуля для работы с JSON-форматом (чтение и запись данных)
 import numpy as np  # Импорт библиотеки для работы с многомерными массивами и математическими операциями
-from sklearn.feature_extraction.text import TfidfVectorizer  # Импорт класса для создания TF-IDF векторизации текста
-from sklearn.cluster import  AgglomerativeClustering  # Импорт классов для кластеризации данных
-import matplotlib.pyplot as plt  # Импорт модуля для построения графиков и визуализации данных
-from sklearn.metrics import silhouette_score  # Импорт метрики для оценки качества кластеризации (коэффициент силуэта)
-from sklearn.decomposition import PCA  # Импорт класса для выполнения PCA (снижение размерности данных)
-from sklearn.metrics import davies_bouldin_score  # Импорт метрики для оценки кластеризации (индекс Дэвиса-Болдена)
+# Классы и метрики sklearn импортируются в функциях кластеризации: модуль импортирует separating,
+# и запуск конвейера с --help или только анализ шотов не должны ждать импорта sklearn
 
 
 
@@ -123,8 +119,8 @@ def merge_shot_data(audio_shot, video_shot_frames):
 
     # --- Извлечение ключевых характеристик из аудиоанализа ---
     
-    # Извлекаем первую текстовую транскрипцию, если она существует, иначе ставим значение 'N/A'
-    transcription = audio_shot['transcriptions'][0].get('text', 'N/A')
+    # Склеиваем текст всех сегментов транскрипции шота (распознаватель отдает по сегменту на фразу), иначе 'N/A'
+    transcription = " ".join(item.get('text', '') for item in audio_shot['transcriptions']) or 'N/A'
     
     # Извлекаем оценку тональности, если она доступна, иначе указываем 'NEUTRAL'
     sentiment = audio_shot['sentiment_analysis'][0].get('sentiment', 'NEUTRAL')
@@ -177,13 +173,15 @@ def merge_shot_data(audio_shot, video_shot_frames):
 
 
 # Функция для определения оптимального количества кластеров с помощью метода силуэта
-def determine_optimal_clusters_silhouette(data, max_clusters):
+def determine_optimal_clusters_silhouette(data, max_clusters, show_plots=False):
     """
     Определяет оптимальное количество кластеров для агломеративной кластеризации с помощью метрики силуэта.
     
     Аргументы:
     data — векторизованные данные для кластеризации (формат: scipy.sparse или numpy.ndarray).
     max_clusters — максимальное количество кластеров для тестирования.
+    show_plots — показывать ли график силуэтного коэффициента (по умолчанию False).
+                 plt.show() блокирует выполнение до закрытия окна, поэтому на сервере графики отключены.
 
     Возвращает:
     optimal_k — оптимальное количество кластеров, при котором достигается наибольший силуэтный коэффициент.
@@ -196,6 +194,9 @@ def determine_optimal_clusters_silhouette(data, max_clusters):
     # Определение диапазона значений количества кластеров (от 2 до максимального значения или количества объектов)
     K = range(2, min(max_clusters + 1, data.shape[0]))  # Число кластеров не должно превышать количество сэмплов
 
+    from sklearn.cluster import AgglomerativeClustering  # Импорт классов для кластеризации данных
+    from sklearn.metrics import silhouette_score  # Импорт метрики для оценки качества кластеризации (коэффициент силуэта)
+
     # Проход по каждому значению k в диапазоне K для оценки силуэтного коэффициента
     for k in K:
         # Создаем модель агломеративной кластеризации с текущим количеством кластеров k
@@ -222,24 +223,28 @@ def determine_optimal_clusters_silhouette(data, max_clusters):
     optimal_k = K[np.argmax(silhouette_scores)]  # Выбираем количество кластеров, соответствующее максимальному силуэтному коэффициенту
 
     # Визуализация результатов для наглядности
-    plt.figure(figsize=(8, 4))  # Определяем размер графика
-    plt.plot(K, silhouette_scores, 'bx-')  # Строим график: число кластеров против силуэтного коэффициента
-    plt.xlabel('Количество кластеров')  # Метка оси X
-    plt.ylabel('Силуэтный коэффициент')  # Метка оси Y
-    plt.title('Определение оптимального количества кластеров (метод силуэта)')  # Заголовок графика
-    plt.show()  # Отображение графика
+    if show_plots:
+        import matplotlib.pyplot as plt  # Импорт здесь: без графиков matplotlib не нужен
+
+        plt.figure(figsize=(8, 4))  # Определяем размер графика
+        plt.plot(K, silhouette_scores, 'bx-')  # Строим график: число кластеров против силуэтного коэффициента
+        plt.xlabel('Количество кластеров')  # Метка оси X
+        plt.ylabel('Силуэтный коэффициент')  # Метка оси Y
+        plt.title('Определение оптимального количества кластеров (метод силуэта)')  # Заголовок графика
+        plt.show()  # Отображение графика
 
     # Возвращаем оптимальное количество кластеров
     return optimal_k
 
 # Функция для выполнения агломеративной кластеризации и визуализации результатов
-def apply_agglomerative(data, n_clusters):
+def apply_agglomerative(data, n_clusters, show_plots=False):
     """
     Выполняет агломеративную кластеризацию на заданном наборе данных и визуализирует результаты с использованием PCA.
 
     Аргументы:
     data — векторизованные данные для кластеризации (формат: scipy.sparse или numpy.ndarray).
     n_clusters — количество кластеров для агломеративной кластеризации.
+    show_plots — показывать ли график кластеров в проекции PCA (по умолчанию False).
 
     Возвращает:
     clusters — метки кластеров для каждого объекта (массив, где каждому объекту присвоен номер кластера).
@@ -247,12 +252,20 @@ def apply_agglomerative(data, n_clusters):
     
     # --- Шаг 1: Применение агломеративной кластеризации ---
     
+    from sklearn.cluster import AgglomerativeClustering  # Импорт классов для кластеризации данных
+
     # Инициализация модели агломеративной кластеризации с указанным количеством кластеров
     agglomerative = AgglomerativeClustering(n_clusters=n_clusters)
     
     # Выполняем кластеризацию и получаем метки кластеров для каждого объекта
     clusters = agglomerative.fit_predict(data.toarray())  # Преобразуем данные в массив (если это sparse-матрица)
 
+    if not show_plots:
+        return clusters  # PCA нужен только для графика
+
+    import matplotlib.pyplot as plt  # Импорт здесь: без графиков matplotlib не нужен
+    from sklearn.decomposition import PCA  # Импорт класса для выполнения PCA (снижение размерности данных)
+
     # --- Шаг 2: Снижение размерности для визуализации с помощью PCA ---
     
     # Инициализация модели PCA для снижения размерности до 2 компонент
@@ -297,6 +310,8 @@ def print_metrics(data, labels, name):
     Ничего не возвращает. Выводит метрики на экран.
     """
 
+    from sklearn.metrics import davies_bouldin_score, silhouette_score  # Импорт метрик оценки кластеризации
+
     # Преобразование разреженной матрицы (если она таковой является) в плотный формат для вычисления метрик
     data_dense = data.toarray()  # Преобразуем данные в массив numpy, так как некоторые метрики не работают с sparse-форматом
 
@@ -316,7 +331,7 @@ def print_metrics(data, labels, name):
     print(f"  Средний силуэтный коэффициент: {silhouette_avg:.4f}")  # Округляем силуэтный коэффициент до 4 знаков после запятой
     print(f"  Индекс Дэвиса-Болдена: {db_index:.4f}")  # Округляем индекс Дэвиса-Болдена до 4 знаков после запятой
 
-def process_and_analyze(audio_file_path, video_file_path, merged_result_file_path):
+def process_and_analyze(audio_file_path, video_file_path, merged_result_file_path, show_plots=False):
     """
     Функция для объединения данных аудио и видео шотов, создания текстовых описаний и их кластеризации.
 
@@ -324,6 +339,7 @@ def process_and_analyze(audio_file_path, video_file_path, merged_result_file_pat
     audio_file_path — Путь к JSON-файлу с результатами аудиоанализа.
     video_file_path — Путь к JSON-файлу с результатами видеоанализа.
     merged_result_file_path — Путь для сохранения объединенных и кластеризованных данных.
+    show_plots — Показывать ли графики подбора числа кластеров и самих кластеров (по умолчанию False).
     """
     
     # Инициализация пустого словаря для хранения объединенных данных
@@ -363,6 +379,8 @@ def process_and_analyze(audio_file_path, video_file_path, merged_result_file_pat
     print(5)
     
     # Преобразование текстовых описаний в числовые векторы с помощью TF-IDF
+    from sklearn.feature_extraction.text import TfidfVectorizer  # Импорт класса для создания TF-IDF векторизации текста
+
     vectorizer = TfidfVectorizer()  # Создаем объект TfidfVectorizer для преобразования текста
     X = vectorizer.fit_transform(shot_descriptions)  # Выполняем векторизацию текстов
     print(6)
@@ -371,7 +389,7 @@ def process_and_analyze(audio_file_path, video_file_path, merged_result_file_pat
     num_shots = len(shot_descriptions)
     
     # Определяем оптимальное количество кластеров с помощью коэффициента силуэта
-    optimal_clusters = determine_optimal_clusters_silhouette(X, num_shots)
+    optimal_clusters = determine_optimal_clusters_silhouette(X, num_shots, show_plots)
     print(7)
     
     # Если оптимальное количество кластеров не определено или меньше 1, устанавливаем минимум в 1 кластер
@@ -379,7 +397,7 @@ def process_and_analyze(audio_file_path, video_file_path, merged_result_file_pat
         optimal_clusters = 1  # Минимальное количество кластеров
     
     # Применяем агломеративную кластеризацию к векторизованным данным
-    agglomerative_clusters = apply_agglomerative(X, optimal_clusters)
+    agglomerative_clusters = apply_agglomerative(X, optimal_clusters, show_plots)
 
     # Инициализация словаря для хранения шотов по их кластерным группам
     clusters_dict = {}
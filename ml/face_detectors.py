@@ -0,0 +1,115 @@
+# --- Стандартные библиотеки Python ---
+import os  # Библиотека для работы с файловой системой (пути к весам детектора OpenCV DNN)
+
+# --- Библиотеки для обработки изображений ---
+import cv2  # OpenCV для детекторов OpenCV DNN и каскада Хаара
+import numpy as np  # Библиотека для работы с массивами (выход детектора OpenCV DNN)
+from model_registry import register_model  # Реестр моделей: загрузка при первом использовании, одна на процесс
+
+# Детектор по умолчанию — MTCNN, как было в video.py (FER(mtcnn=True))
+DEFAULT_FACE_DETECTOR = "mtcnn"
+
+# Детекторы лиц от точного к быстрому. 'cost' — примерное время на кадр 1080p на одном ядре CPU (мс),
+# по нему выбирается детектор под бюджет времени (см. face_detector_for_budget)
+FACE_DETECTOR_TIERS = {
+    "mtcnn": {"tier": "accurate", "cost": 150},
+    "opencv_dnn": {"tier": "fast", "cost": 25},
+    "cascade": {"tier": "fastest", "cost": 10}
+}
+
+# Веса детектора OpenCV DNN (ResNet-10 SSD 300x300 из opencv/samples/dnn/face_detector)
+FACE_DNN_MODEL_DIR = os.environ.get("FACE_DNN_MODEL_DIR", "models")
+FACE_DNN_CONFIG = "deploy.prototxt"
+FACE_DNN_WEIGHTS = "res10_300x300_ssd_iter_140000.caffemodel"
+
+# Минимальная уверенность детектора OpenCV DNN
+FACE_DNN_CONFIDENCE = 0.5
+
+
+def face_detector_for_budget(ms_per_frame):
+    """
+    Выбирает самый точный детектор лиц, который укладывается в бюджет времени на кадр.
+
+    Аргументы:
+    ms_per_frame — сколько миллисекунд на кадр можно потратить на поиск лиц.
+
+    Возвращает:
+    Имя детектора из FACE_DETECTOR_TIERS. Если не укладывается ни один, возвращается самый быстрый.
+    """
+
+    for name, info in FACE_DETECTOR_TIERS.items():
+        if info["cost"] <= ms_per_frame:
+            return name
+    return list(FACE_DETECTOR_TIERS)[-1]
+
+
+@register_model("face_detector")
+def get_face_detector(name=DEFAULT_FACE_DETECTOR):
+    """
+    Возвращает детектор лиц по имени. Детектор загружается один раз на процесс.
+
+    Аргументы:
+    name — имя детектора из FACE_DETECTOR_TIERS (по умолчанию DEFAULT_FACE_DETECTOR).
+
+    Возвращает:
+    Функцию detect(frame), которая принимает кадр BGR и возвращает список рамок лиц [x, y, w, h].
+    Все детекторы отдают рамки в одном формате, поэтому результаты лиц (face_info) не зависят от выбора.
+    """
+
+    if name == "mtcnn":
+        from fer import FER  # Импорт здесь: MTCNN загружается, только если выбран этот детектор
+
+        detector = FER(mtcnn=True)
+        return lambda frame: [list(box) for box in detector.find_faces(frame, bgr=True)]
+
+    if name == "opencv_dnn":
+        return _load_dnn_detector()
+
+    if name == "cascade":
+        cascade = cv2.CascadeClassifier(os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml"))
+
+        def detect(frame):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            # Те же параметры, что у каскада в fer.FER(mtcnn=False)
+            faces = cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, flags=cv2.CASCADE_SCALE_IMAGE,
+                                             minSize=(50, 50))
+            return [[int(x), int(y), int(w), int(h)] for x, y, w, h in faces]
+
+        return detect
+
+    raise ValueError(f"Неизвестный детектор лиц: {name}. Доступны: {', '.join(FACE_DETECTOR_TIERS)}")
+
+
+def _load_dnn_detector():
+    """
+    Загружает детектор лиц OpenCV DNN (ResNet-10 SSD) из папки FACE_DNN_MODEL_DIR.
+    """
+
+    config_path = os.path.join(FACE_DNN_MODEL_DIR, FACE_DNN_CONFIG)
+    weights_path = os.path.join(FACE_DNN_MODEL_DIR, FACE_DNN_WEIGHTS)
+    if not (os.path.exists(config_path) and os.path.exists(weights_path)):
+        raise FileNotFoundError(
+            f"Нет весов детектора OpenCV DNN: положите {FACE_DNN_CONFIG} и {FACE_DNN_WEIGHTS} "
+            f"(opencv/samples/dnn/face_detector) в папку {FACE_DNN_MODEL_DIR} или укажите ее в FACE_DNN_MODEL_DIR"
+        )
+
+    net = cv2.dnn.readNetFromCaffe(config_path, weights_path)
+
+    def detect(frame):
+        height, width = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
+        net.setInput(blob)
+        detections = net.forward()[0, 0]  # Строки: [_, _, уверенность, xmin, ymin, xmax, ymax] в долях кадра
+
+        boxes = []
+        for detection in detections:
+            if detection[2] < FACE_DNN_CONFIDENCE:
+                continue
+            xmin, ymin, xmax, ymax = (detection[3:7] * np.array([width, height, width, height])).astype(int)
+            xmin, ymin = max(0, xmin), max(0, ymin)
+            xmax, ymax = min(width, xmax), min(height, ymax)
+            if xmax > xmin and ymax > ymin:
+                boxes.append([int(xmin), int(ymin), int(xmax - xmin), int(ymax - ymin)])
+        return boxes
+
+    return detect
@@ -0,0 +1,303 @@
+# --- Стандартные библиотеки Python ---
+import json  # Разбор вывода ffprobe
+import os  # Библиотека для работы с файловой системой (пути к временным файлам)
+import re  # Библиотека для работы с регулярными выражениями (разбор вывода ffmpeg)
+import shutil  # Библиотека для перемещения файлов (в том числе между файловыми системами)
+import subprocess  # Библиотека для запуска ffmpeg как внешнего процесса
+import tempfile  # Библиотека для создания временной папки под промежуточные фрагменты
+
+# Минимальная длина фрагмента (в секундах), который имеет смысл перекодировать отдельно.
+# Более короткие «хвосты» между границей и ключевым кадром меньше одного кадра и просто отбрасываются.
+MIN_SEGMENT_SECONDS = 0.01
+
+# Параметры, в которых перекодируются края диапазона (libx264 с yuv420p дает профиль High, кодер aac — профиль LC).
+# Середину можно копировать без перекодирования, только если исходное видео в тех же кодеках и профилях:
+# иначе concat demuxer часто завершается без ошибки, но склеенный файл не воспроизводится
+REENCODE_VIDEO = {"codec_name": "h264", "profile": "High", "pix_fmt": "yuv420p"}
+REENCODE_AUDIO = {"codec_name": "aac", "profile": "LC"}
+
+
+def ffmpeg_binary():
+    """
+    Возвращает путь к исполняемому файлу ffmpeg.
+
+    Описание:
+    Используется тот же ffmpeg, что и у MoviePy (поставляется пакетом imageio-ffmpeg из requirements.txt).
+    Если пакет недоступен, используется ffmpeg из PATH.
+    """
+
+    try:
+        from imageio_ffmpeg import get_ffmpeg_exe
+        return get_ffmpeg_exe()
+    except ImportError:
+        return "ffmpeg"
+
+
+def ffprobe_binary():
+    """
+    Возвращает путь к ffprobe: из той же папки, что ffmpeg, или из PATH. Если ffprobe нет, возвращает None
+    (imageio-ffmpeg поставляет только ffmpeg).
+    """
+
+    ffmpeg = ffmpeg_binary()
+    if os.path.dirname(ffmpeg):
+        sibling = os.path.join(os.path.dirname(ffmpeg), "ffprobe" + os.path.splitext(ffmpeg)[1])
+        if os.path.exists(sibling):
+            return sibling
+    return shutil.which("ffprobe")
+
+
+def probe_streams(video_path):
+    """
+    Возвращает параметры первого видео- и первого аудиопотока файла.
+
+    Аргументы:
+    video_path — путь к видеофайлу.
+
+    Возвращает:
+    Словарь {'video': {...}, 'audio': {...}} с полями ffprobe (codec_name, profile, pix_fmt, level, time_base,
+    sample_rate, channels); поток, которого нет в файле, равен None. Если ffprobe недоступен или не смог
+    прочитать файл, возвращает None.
+    """
+
+    binary = ffprobe_binary()
+    if binary is None:
+        return None
+    try:
+        result = subprocess.run(
+            [binary, "-v", "error", "-show_entries",
+             "stream=codec_type,codec_name,profile,pix_fmt,level,time_base,sample_rate,channels",
+             "-of", "json", video_path],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors="replace", check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    streams = json.loads(result.stdout or "{}").get("streams", [])
+    return {
+        codec_type: next((stream for stream in streams if stream.get("codec_type") == codec_type), None)
+        for codec_type in ("video", "audio")
+    }
+
+
+def stream_copy_compatible(streams):
+    """
+    Проверяет, можно ли склеивать скопированную середину исходного видео с перекодированными краями.
+
+    Аргументы:
+    streams — параметры потоков исходного видео (см. probe_streams) или None, если их узнать не удалось.
+
+    Возвращает:
+    Кортеж (можно ли копировать, причина, если нельзя).
+    """
+
+    if not streams or not streams["video"]:
+        return False, "параметры потоков неизвестны (нет ffprobe)"
+    for name, params, target in (("видео", streams["video"], REENCODE_VIDEO),
+                                 ("аудио", streams["audio"], REENCODE_AUDIO)):
+        if params is None:
+            continue
+        mismatched = {key: params.get(key) for key, value in target.items() if params.get(key) != value}
+        if mismatched:
+            return False, f"{name} {mismatched} не совпадает с параметрами перекодирования {target}"
+    return True, None
+
+
+def _matched_encode_args(streams):
+    """
+    Аргументы ffmpeg, которые подгоняют перекодированный край под исходный поток: уровень H.264,
+    шкала времени дорожки, частота и число каналов аудио. Без них concat склеивает фрагменты
+    с разными SPS и шкалами времени.
+    """
+
+    args = []
+    video = streams["video"]
+    if video.get("level"):
+        args += ["-level:v", f"{int(video['level']) / 10:.1f}"]
+    if "/" in (video.get("time_base") or ""):
+        args += ["-video_track_timescale", video["time_base"].split("/")[1]]
+    audio = streams["audio"]
+    if audio:
+        if audio.get("sample_rate"):
+            args += ["-ar", str(audio["sample_rate"])]
+        if audio.get("channels"):
+            args += ["-ac", str(audio["channels"])]
+    return args
+
+
+def run_ffmpeg(args):
+    """
+    Запускает ffmpeg с указанными аргументами.
+
+    Аргументы:
+    args — список аргументов командной строки ffmpeg (без имени программы).
+
+    Возвращает:
+    Объект subprocess.CompletedProcess с выводом stderr в виде строки.
+    Если ffmpeg завершился с ошибкой, выбрасывается subprocess.CalledProcessError.
+    """
+
+    return subprocess.run(
+        [ffmpeg_binary(), "-hide_banner", "-nostdin", *args],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace", check=True
+    )
+
+
+def list_keyframes(video_path):
+    """
+    Возвращает времена (в секундах) всех ключевых кадров видеопотока.
+
+    Аргументы:
+    video_path — путь к видеофайлу.
+
+    Возвращает:
+    Отсортированный список времен ключевых кадров, например [0.0, 2.002, 4.004, ...].
+
+    Описание:
+    Декодер пропускает все кадры, кроме ключевых (`-skip_frame nokey`), а фильтр showinfo печатает их время.
+    Поэтому проход по файлу намного быстрее полного декодирования.
+    """
+
+    result = run_ffmpeg([
+        "-skip_frame", "nokey", "-i", video_path,
+        "-map", "0:v:0", "-vf", "showinfo", "-f", "null", "-"
+    ])
+    return sorted(float(t) for t in re.findall(r"pts_time:\s*([-\d.]+)", result.stderr))
+
+
+def cut_segment(video_path, start, end, output_path, stream_copy, match_streams=None):
+    """
+    Вырезает фрагмент видео [start, end) в отдельный файл.
+
+    Аргументы:
+    video_path — путь к исходному видеофайлу.
+    start — начало фрагмента в секундах.
+    end — конец фрагмента в секундах.
+    output_path — путь к выходному файлу.
+    stream_copy — True: копировать потоки без перекодирования (start должен совпадать с ключевым кадром);
+                  False: перекодировать фрагмент (libx264 + aac), точно по кадрам.
+    match_streams — параметры потоков исходного видео (см. probe_streams): перекодированный фрагмент
+                    подгоняется под них, чтобы его можно было склеить со скопированными (по умолчанию None).
+    """
+
+    codec_args = ["-c", "copy", "-avoid_negative_ts", "make_zero"] if stream_copy else \
+        ["-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-pix_fmt", "yuv420p", "-c:a", "aac"]
+    if not stream_copy and match_streams:
+        codec_args += _matched_encode_args(match_streams)
+
+    run_ffmpeg([
+        "-y", "-ss", f"{start:.6f}", "-i", video_path, "-t", f"{end - start:.6f}",
+        "-map", "0:v:0", "-map", "0:a?", *codec_args, output_path
+    ])
+
+
+def concat_segments(segment_paths, output_path):
+    """
+    Склеивает фрагменты в один файл без перекодирования (concat demuxer ffmpeg).
+
+    Аргументы:
+    segment_paths — список путей к фрагментам в порядке склейки.
+    output_path — путь к выходному файлу.
+    """
+
+    list_path = f"{output_path}.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            # Экранируем одинарные кавычки в путях по правилам concat demuxer
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    try:
+        run_ffmpeg(["-y", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", output_path])
+    finally:
+        os.remove(list_path)
+
+
+def split_range_segments(ranges, keyframes):
+    """
+    Делит диапазоны на копируемые середины и перекодируемые края (см. cut_range).
+
+    Возвращает:
+    Список кортежей (start, end, stream_copy) в порядке склейки.
+    """
+
+    segments = []
+    for start, end in ranges:
+        inner = [k for k in keyframes if start <= k <= end]
+        if len(inner) < 2:
+            segments.append((start, end, False))
+            continue
+
+        first_key, last_key = inner[0], inner[-1]
+        if first_key - start > MIN_SEGMENT_SECONDS:
+            segments.append((start, first_key, False))
+        segments.append((first_key, last_key, True))
+        if end - last_key > MIN_SEGMENT_SECONDS:
+            segments.append((last_key, end, False))
+    return segments
+
+
+def cut_range(video_path, ranges, output_path, keyframes, streams=None):
+    """
+    Собирает выходной файл из одного или нескольких временных диапазонов исходного видео,
+    перекодируя только участки у границ, которые не попадают на ключевые кадры.
+
+    Аргументы:
+    video_path — путь к исходному видеофайлу.
+    ranges — список диапазонов [(start, end), ...] в секундах, в порядке склейки.
+    output_path — путь к выходному .mp4 файлу.
+    keyframes — отсортированный список времен ключевых кадров исходного видео (см. list_keyframes).
+    streams — параметры потоков исходного видео (см. probe_streams; по умолчанию None — определяются здесь).
+
+    Описание:
+    Для каждого диапазона [start, end):
+    - [start, K1) перекодируется, где K1 — первый ключевой кадр не раньше start;
+    - [K1, K2) копируется без перекодирования, где K2 — последний ключевой кадр не позже end;
+    - [K2, end) перекодируется.
+    Если внутри диапазона нет двух ключевых кадров, он перекодируется целиком.
+    Если исходное видео не в кодеках перекодирования (см. stream_copy_compatible), каждый диапазон
+    перекодируется целиком: иначе склейка часто «удается», но файл получается битым.
+    Если склейка без перекодирования не удалась, весь результат собирается с перекодированием.
+    """
+
+    if streams is None:
+        streams = probe_streams(video_path)
+    compatible, reason = stream_copy_compatible(streams)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # --- Шаг 1: Разбиение диапазонов на копируемую середину и перекодируемые края ---
+
+        if compatible:
+            segments = split_range_segments(ranges, keyframes)
+        else:
+            print(f"Сцена перекодируется целиком: {reason}")
+            segments = [(start, end, False) for start, end in ranges]
+
+        # --- Шаг 2: Вырезание фрагментов ---
+
+        segment_paths = []
+        for index, (start, end, stream_copy) in enumerate(segments):
+            path = os.path.join(temp_dir, f"part_{index}.mp4")
+            cut_segment(video_path, start, end, path, stream_copy, streams if compatible else None)
+            segment_paths.append(path)
+
+        # --- Шаг 3: Склейка фрагментов ---
+
+        if len(segment_paths) == 1:
+            shutil.move(segment_paths[0], output_path)
+            return
+
+        try:
+            concat_segments(segment_paths, output_path)
+        except subprocess.CalledProcessError as e:
+            # Параметры перекодированных краев и скопированной середины оказались несовместимы
+            print(f"Склейка без перекодирования не удалась, перекодируем целиком: {e.stderr[-500:]}")
+            reencoded_paths = []
+            for index, (start, end) in enumerate(ranges):
+                path = os.path.join(temp_dir, f"full_{index}.mp4")
+                cut_segment(video_path, start, end, path, stream_copy=False)
+                reencoded_paths.append(path)
+            if len(reencoded_paths) == 1:
+                shutil.move(reencoded_paths[0], output_path)
+            else:
+                concat_segments(reencoded_paths, output_path)
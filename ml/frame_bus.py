@@ -0,0 +1,279 @@
+# --- Стандартные библиотеки Python ---
+import os  # Библиотека для работы с файловой системой (папка для кадров OCR)
+
+# --- Библиотеки для обработки видео ---
+import cv2  # OpenCV для декодирования видео и уменьшения кадров
+
+# Ширина, до которой PySceneDetect уменьшает кадры перед детекцией (scenedetect.scene_manager.DEFAULT_MIN_WIDTH)
+DETECTOR_MIN_WIDTH = 256
+
+
+def run_frame_bus(video_path, consumers):
+    """
+    Декодирует видео один раз и раздает кадры всем зарегистрированным потребителям.
+
+    Аргументы:
+    video_path — путь к видеофайлу.
+    consumers — список потребителей (словарей), каждый из которых содержит:
+        - 'name': имя потребителя (ключ в возвращаемых результатах);
+        - 'on_frame': функция (номер кадра, кадр), вызывается для каждого нужного потребителю кадра;
+        - 'wants': функция (номер кадра) -> bool или None, если нужны все кадры;
+        - 'scale': функция (ширина, высота) -> ширина уменьшенного кадра, или None — нужен полный кадр;
+        - 'start': функция (fps, ширина, высота, количество кадров) или None — вызывается перед первым кадром;
+        - 'finish': функция (количество прочитанных кадров) -> результат потребителя.
+    Потребители вызываются в порядке списка, поэтому потребитель может использовать то,
+    что предыдущий уже посчитал по этому же кадру (например, список склеек детектора).
+
+    Возвращает:
+    Словарь {имя потребителя: результат его функции 'finish'}.
+
+    Описание:
+    - Кадр, который не нужен ни одному потребителю, пропускается через `grab()` без конвертации в изображение.
+    - Уменьшенная копия кадра одной ширины строится один раз и отдается всем потребителям, которым она нужна.
+    """
+
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    # --- Шаг 1: Подготовка потребителей ---
+
+    for consumer in consumers:
+        if consumer.get("start") is not None:
+            consumer["start"](fps, width, height, total_frames)
+
+    # Ширина уменьшенного кадра для каждого потребителя (None — полный кадр)
+    target_widths = [
+        consumer["scale"](width, height) if consumer.get("scale") is not None else None
+        for consumer in consumers
+    ]
+
+    # --- Шаг 2: Единственный проход декодера по видео ---
+
+    index = 0  # Номер текущего кадра в исходном видео (с 0)
+    while True:
+        receivers = [
+            (consumer, target_width) for consumer, target_width in zip(consumers, target_widths)
+            if consumer.get("wants") is None or consumer["wants"](index)
+        ]
+
+        if not receivers:
+            # Кадр никому не нужен: только продвигаем декодер
+            if not cap.grab():
+                break
+            index += 1
+            continue
+
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        views = {None: frame}  # Кадр и его уменьшенные копии по ширине
+        for consumer, target_width in receivers:
+            if target_width not in views:
+                views[target_width] = downscale_frame(frame, target_width)
+            consumer["on_frame"](index, views[target_width])
+
+        index += 1
+
+    cap.release()
+
+    # --- Шаг 3: Сбор результатов ---
+
+    return {consumer["name"]: consumer["finish"](index) for consumer in consumers}
+
+
+def downscale_frame(frame, target_width):
+    """
+    Уменьшает кадр до заданной ширины с сохранением пропорций (линейная интерполяция, как в PySceneDetect).
+    """
+
+    height, width = frame.shape[:2]
+    if target_width >= width:
+        return frame
+    target_height = round(height * target_width / width)
+    return cv2.resize(frame, (target_width, target_height), interpolation=cv2.INTER_LINEAR)
+
+
+def detector_width(width):
+    """
+    Ширина кадра, на которой PySceneDetect ищет склейки: кадр уменьшается в целое число раз
+    до ширины не меньше 256 пикселей (как scenedetect.scene_manager.compute_downscale_factor).
+    """
+
+    factor = 1 if width < DETECTOR_MIN_WIDTH else width // DETECTOR_MIN_WIDTH
+    return round(width / factor)
+
+
+def content_detector_consumer(threshold=30.0, min_scene_len=15):
+    """
+    Потребитель для разбиения видео на шоты детектором ContentDetector из PySceneDetect.
+
+    Аргументы:
+    threshold — порог ContentDetector (по умолчанию 30.0, как в separating.detect_shots).
+    min_scene_len — минимальная длина шота в кадрах (по умолчанию 15, как в PySceneDetect).
+
+    Возвращает:
+    Кортеж (consumer, cuts): потребитель для run_frame_bus и список номеров кадров, с которых начинаются
+    новые шоты. Список пополняется по ходу декодирования, поэтому следующие потребители видят склейки сразу.
+    Результат 'finish' — словарь {'cuts': склейки, 'total_frames': количество кадров, 'fps': частота кадров}.
+
+    Описание:
+    Детектор получает кадры, уменьшенные так же, как это делает SceneManager (в целое число раз до ширины
+    не меньше 256 пикселей), поэтому склейки совпадают с разбиением через VideoManager/SceneManager.
+    """
+
+    from scenedetect.detectors import ContentDetector  # Импорт здесь: библиотека нужна только детектору
+
+    detector = ContentDetector(threshold=threshold, min_scene_len=min_scene_len)
+    cuts = []
+    video_info = {}
+
+    def start(fps, width, height, total_frames):
+        video_info["fps"] = fps
+
+    def scale(width, height):
+        return detector_width(width)
+
+    def on_frame(index, frame):
+        for cut in detector.process_frame(index, frame):
+            if not cuts or cut > cuts[-1]:
+                cuts.append(cut)
+
+    def finish(total_frames):
+        for cut in detector.post_process(total_frames - 1):
+            if not cuts or cut > cuts[-1]:
+                cuts.append(cut)
+        return {"cuts": cuts, "total_frames": total_frames, "fps": video_info["fps"]}
+
+    consumer = {"name": "shots", "on_frame": on_frame, "wants": None, "scale": scale, "start": start,
+                "finish": finish}
+    return consumer, cuts
+
+
+def shot_keyframe_consumer(cuts, on_keyframes, grid_step=None, buffer_size=32):
+    """
+    Потребитель, который выбирает ключевые кадры шотов (первый, средний, последний) прямо во время детекции шотов,
+    а также (по желанию) каждый grid_step-й кадр видео.
+
+    Аргументы:
+    cuts — список склеек, который пополняет content_detector_consumer (должен стоять в списке раньше).
+    on_keyframes — функция, которой передается список пар (номер кадра в исходном видео, кадр),
+                   как только кадры выбраны.
+    grid_step — шаг сетки кадров для анализа всего видео (по умолчанию None — сетка не нужна).
+    buffer_size — сколько кадров текущего шота держать в памяти для выбора среднего кадра (по умолчанию 32).
+
+    Возвращает:
+    Потребитель для run_frame_bus. Результат 'finish' — список номеров средних кадров, которых не оказалось
+    в буфере: их нужно дочитать отдельно (например, через frame_sampler.sample_frames с перемоткой).
+
+    Описание:
+    Где середина шота, становится известно только на его склейке. Поэтому кадры текущего шота хранятся
+    в буфере с прореживанием: когда буфер заполняется, из него удаляется каждый второй кадр, а шаг удваивается.
+    Для коротких шотов средний кадр всегда есть в буфере; для длинных он может потребовать дочитывания.
+    Номера кадров совпадают с video.analyze_video по шоту: первый, total // 2 и последний кадр шота.
+    ContentDetector (фильтр вспышек) может сообщить о склейке на несколько кадров позже, чем она произошла:
+    тогда шот закрывается на кадре склейки, а уже прочитанные кадры нового шота переходят в его буфер.
+    """
+
+    # 'last' — последний прочитанный кадр (номер, кадр): он же последний кадр шота, если склейка на следующем кадре
+    state = {"shot_start": 0, "stride": 1, "buffer": {}, "last": None, "closed_cuts": 0, "emitted": set()}
+    missing = []
+
+    def emit(frames):
+        frames = [(index, frame) for index, frame in frames if index not in state["emitted"]]
+        state["emitted"].update(index for index, _ in frames)
+        if frames:
+            on_keyframes(sorted(frames, key=lambda item: item[0]))
+
+    def close_shot(shot_end):
+        shot_start = state["shot_start"]
+        total = shot_end - shot_start
+        selected = []
+        for number in sorted({1, total // 2, total}):
+            if not 1 <= number <= total:
+                continue
+            index = shot_start + number - 1
+            if state["last"] is not None and state["last"][0] == index:
+                selected.append(state["last"])
+            elif index in state["buffer"]:
+                selected.append((index, state["buffer"][index]))
+            elif index not in state["emitted"]:
+                missing.append(index)
+        emit(selected)
+
+    def on_frame(index, frame):
+        # --- Склейки на этом кадре или раньше: закрываем шоты, которые на них заканчиваются ---
+
+        while state["closed_cuts"] < len(cuts) and cuts[state["closed_cuts"]] <= index:
+            cut = cuts[state["closed_cuts"]]
+            state["closed_cuts"] += 1
+            if cut <= state["shot_start"]:
+                continue
+            close_shot(cut)
+            # Кадры нового шота, прочитанные до того, как о склейке стало известно, остаются в его буфере
+            state.update(shot_start=cut, stride=1,
+                         buffer={kept: kept_frame for kept, kept_frame in state["buffer"].items() if kept >= cut})
+            if state["last"] is not None and state["last"][0] < cut:
+                state["last"] = None
+
+        # --- Прореживаемый буфер кадров текущего шота ---
+
+        offset = index - state["shot_start"]
+        if offset % state["stride"] == 0:
+            state["buffer"][index] = frame
+            if len(state["buffer"]) > buffer_size:
+                state["stride"] *= 2
+                state["buffer"] = {
+                    kept: kept_frame for kept, kept_frame in state["buffer"].items()
+                    if (kept - state["shot_start"]) % state["stride"] == 0
+                }
+        state["last"] = (index, frame)
+
+        # --- Кадры сетки для анализа всего видео ---
+
+        if grid_step and (index + 1) % grid_step == 0:
+            emit([(index, frame)])
+
+    def finish(total_frames):
+        # Без склеек PySceneDetect не возвращает ни одного шота — тогда и ключевых кадров шотов нет
+        if cuts and total_frames > state["shot_start"]:
+            close_shot(total_frames)
+        return missing
+
+    return {"name": "keyframes", "on_frame": on_frame, "wants": None, "scale": None, "start": None,
+            "finish": finish}
+
+
+def ocr_sampler_consumer(output_folder, interval=None):
+    """
+    Потребитель, который сохраняет по одному кадру в секунду для распознавания текста (как symbol_result.extract_frames).
+
+    Аргументы:
+    output_folder — папка, куда сохраняются кадры 'frame_{N}.jpg'.
+    interval — шаг в кадрах (по умолчанию None — один кадр в секунду по FPS видео).
+
+    Возвращает:
+    Потребитель для run_frame_bus. Результат 'finish' — количество сохраненных кадров.
+    """
+
+    state = {"interval": interval, "saved": 0}
+
+    def start(fps, width, height, total_frames):
+        os.makedirs(output_folder, exist_ok=True)
+        if state["interval"] is None:
+            state["interval"] = max(1, int(fps))
+
+    def wants(index):
+        return index % state["interval"] == 0
+
+    def on_frame(index, frame):
+        cv2.imwrite(os.path.join(output_folder, f"frame_{state['saved']}.jpg"), frame)
+        state["saved"] += 1
+
+    def finish(total_frames):
+        return state["saved"]
+
+    return {"name": "ocr", "on_frame": on_frame, "wants": wants, "scale": None, "start": start, "finish": finish}
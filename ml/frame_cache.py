@@ -0,0 +1,212 @@
+# --- Стандартные библиотеки Python ---
+import os  # Библиотека для работы с файловой системой (пути к файлам кэша, атомарная замена)
+
+# --- Библиотеки для работы с данными ---
+import numpy as np  # Библиотека для работы с массивами (файл кэша .npy, открываемый через memmap)
+
+# --- Модули проекта ---
+from checkpoints import load_json_safe, video_fingerprint, write_json_atomic  # Индекс кэша и проверка видео
+from frame_bus import detector_width, downscale_frame, run_frame_bus  # Однократное декодирование видео
+
+# Папка кэша кадров по умолчанию
+FRAME_CACHE_DIR = "frame_cache"
+
+# Сколько кадров переносится за раз при увеличении массива кэша (см. build_frame_cache)
+GROW_CHUNK_FRAMES = 256
+
+
+def frame_cache_paths(video_path, cache_dir=FRAME_CACHE_DIR, width=None):
+    """
+    Возвращает пути к файлам кэша кадров видео: массиву кадров (.npy) и индексу (.json).
+
+    Аргументы:
+    video_path — путь к видеофайлу.
+    cache_dir — папка кэша (по умолчанию FRAME_CACHE_DIR).
+    width — ширина кадров в кэше (None — ширина, на которой ищет склейки детектор шотов).
+            Кэши разной ширины одного видео лежат рядом и не мешают друг другу.
+    """
+
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    suffix = "detector" if width is None else str(width)
+    base = os.path.join(cache_dir, f"{video_name}_{suffix}")
+    return base + ".npy", base + ".json"
+
+
+def build_frame_cache(video_path, cache_dir=FRAME_CACHE_DIR, width=None):
+    """
+    Декодирует видео один раз и сохраняет все кадры, уменьшенные до одного размера, в файл .npy с индексом.
+
+    Аргументы:
+    video_path — путь к видеофайлу.
+    cache_dir — папка кэша (по умолчанию FRAME_CACHE_DIR).
+    width — ширина кадров в кэше (по умолчанию None — ширина детектора шотов, см. frame_bus.detector_width).
+
+    Возвращает:
+    Открытый кэш (см. open_frame_cache).
+
+    Описание:
+    - Массив записывается во временный файл и переименовывается только после последнего кадра,
+      а индекс пишется последним: недописанный кэш никогда не будет принят за готовый.
+    - Массив создается по числу кадров, которое сообщает контейнер, но в индекс попадает число фактически
+      декодированных кадров. Если кадров больше, массив увеличивается (вдвое, с переносом уже записанных
+      кадров), и ни один кадр не теряется; если меньше, лишний хвост массива не читается (см. open_frame_cache).
+    """
+
+    frames_path, index_path = frame_cache_paths(video_path, cache_dir, width)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = frames_path + ".tmp.npy"
+
+    state = {"frames": None, "decoded": 0}
+    info = {}
+
+    def start(fps, source_width, source_height, total_frames):
+        target_width = detector_width(source_width) if width is None else min(width, source_width)
+        target_height = round(source_height * target_width / source_width)
+        info.update(fps=fps, source_size=[source_width, source_height], frame_size=[target_width, target_height],
+                    reported_frames=total_frames)
+        # Массив на все кадры, о которых сообщает контейнер: запись идет напрямую в файл, а не в память процесса
+        state["frames"] = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.uint8, shape=(max(total_frames, 1), target_height, target_width, 3)
+        )
+
+    def scale(source_width, source_height):
+        return detector_width(source_width) if width is None else min(width, source_width)
+
+    def grow(min_length):
+        # Размер .npy задан в заголовке файла: новый массив пишется рядом, а старые кадры переносятся частями
+        frames = state["frames"]
+        grown_path = tmp_path + ".grow.npy"
+        grown = np.lib.format.open_memmap(
+            grown_path, mode="w+", dtype=np.uint8, shape=(max(min_length, 2 * len(frames)), *frames.shape[1:])
+        )
+        for begin in range(0, len(frames), GROW_CHUNK_FRAMES):
+            grown[begin:begin + GROW_CHUNK_FRAMES] = frames[begin:begin + GROW_CHUNK_FRAMES]
+        grown.flush()
+        del frames, grown
+        state["frames"] = None  # Файлы закрываются до замены (на Windows открытый memmap заменить нельзя)
+        os.replace(grown_path, tmp_path)
+        state["frames"] = np.load(tmp_path, mmap_mode="r+")
+
+    def on_frame(index, frame):
+        if index >= len(state["frames"]):
+            grow(index + 1)
+        state["frames"][index] = frame
+        state["decoded"] = max(state["decoded"], index + 1)
+
+    def finish(total_frames):
+        frames = state["frames"]
+        frames.flush()
+        del state["frames"]
+        if state["decoded"] != info["reported_frames"]:
+            print(f"Контейнер сообщает {info['reported_frames']} кадров, декодировано {state['decoded']}")
+        return state["decoded"]
+
+    consumer = {"name": "cache", "on_frame": on_frame, "wants": None, "scale": scale, "start": start,
+                "finish": finish}
+    frame_count = run_frame_bus(video_path, [consumer])["cache"]
+
+    os.replace(tmp_path, frames_path)
+    write_json_atomic({"video": video_fingerprint(video_path), "frame_count": frame_count, **info}, index_path)
+    print(f"Кэш кадров сохранен в {frames_path}: {frame_count} кадров {info['frame_size'][0]}x{info['frame_size'][1]}")
+
+    return open_frame_cache(video_path, cache_dir, width)
+
+
+def open_frame_cache(video_path, cache_dir=FRAME_CACHE_DIR, width=None):
+    """
+    Открывает готовый кэш кадров видео без чтения его в память.
+
+    Аргументы:
+    video_path — путь к видеофайлу.
+    cache_dir — папка кэша (по умолчанию FRAME_CACHE_DIR).
+    width — ширина кадров в кэше (см. frame_cache_paths).
+
+    Возвращает:
+    Словарь кэша или None, если кэша нет или он построен для другой версии видеофайла:
+    - 'frames': массив кадров формы (количество кадров, высота, ширина, 3), открытый через memmap только на чтение;
+    - 'fps', 'frame_count', 'frame_size' (ширина, высота), 'source_size' (размер кадра исходного видео).
+    """
+
+    frames_path, index_path = frame_cache_paths(video_path, cache_dir, width)
+    index = load_json_safe(index_path)
+    if not index or index.get("video") != video_fingerprint(video_path) or not os.path.exists(frames_path):
+        return None
+
+    # Кадры читаются с диска по обращению: доступ к любому кадру без декодирования видео
+    frames = np.load(frames_path, mmap_mode="r")
+    return {**index, "frames": frames[:index["frame_count"]]}
+
+
+def get_frame_cache(video_path, cache_dir=FRAME_CACHE_DIR, width=None):
+    """
+    Возвращает кэш кадров видео, при необходимости построив его (см. open_frame_cache и build_frame_cache).
+    """
+
+    cache = open_frame_cache(video_path, cache_dir, width)
+    if cache is None:
+        cache = build_frame_cache(video_path, cache_dir, width)
+    return cache
+
+
+def cached_frames(cache, frame_numbers, start_frame=0):
+    """
+    Отдает нужные кадры из кэша — аналог frame_sampler.sample_frames без декодирования видео.
+
+    Аргументы:
+    cache — открытый кэш кадров (см. open_frame_cache).
+    frame_numbers — номера нужных кадров, считая с 1 от start_frame.
+    start_frame — номер кадра исходного видео (с 0), от которого отсчитываются frame_numbers (по умолчанию 0).
+
+    Возвращает:
+    Генератор пар (номер кадра, кадр) в порядке возрастания номеров. Кадр — копия в памяти,
+    которую анализаторы могут менять (массив кэша открыт только на чтение).
+    """
+
+    frames = cache["frames"]
+    for number in sorted(set(frame_numbers)):
+        index = start_frame + number - 1
+        if number < 1 or index >= len(frames):
+            continue
+        yield number, np.array(frames[index])
+
+
+def run_cached_frame_bus(cache, consumers):
+    """
+    Раздает кадры из кэша потребителям шины кадров — аналог frame_bus.run_frame_bus без декодирования видео.
+
+    Аргументы:
+    cache — открытый кэш кадров (см. open_frame_cache).
+    consumers — потребители в формате frame_bus.run_frame_bus.
+
+    Возвращает:
+    Словарь {имя потребителя: результат его функции 'finish'}.
+
+    Описание:
+    Потребители получают кадры размера кэша (или уменьшенные из них, если потребитель просит меньшую ширину).
+    Результаты совпадают с проходом по видео, только если кэш построен в нужном потребителю размере:
+    например, детектор шотов — на кэше ширины детектора (width=None).
+    """
+
+    frames = cache["frames"]
+    source_width, source_height = cache["source_size"]
+    frame_count = cache["frame_count"]
+
+    for consumer in consumers:
+        if consumer.get("start") is not None:
+            consumer["start"](cache["fps"], source_width, source_height, frame_count)
+
+    target_widths = [
+        consumer["scale"](source_width, source_height) if consumer.get("scale") is not None else None
+        for consumer in consumers
+    ]
+
+    for index in range(frame_count):
+        frame = None
+        for consumer, target_width in zip(consumers, target_widths):
+            if consumer.get("wants") is not None and not consumer["wants"](index):
+                continue
+            if frame is None:
+                frame = np.array(frames[index])
+            consumer["on_frame"](index, frame if target_width is None else downscale_frame(frame, target_width))
+
+    return {consumer["name"]: consumer["finish"](frame_count) for consumer in consumers}
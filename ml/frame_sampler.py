@@ -0,0 +1,187 @@
+# --- Стандартные библиотеки Python ---
+import queue  # Ограниченная очередь кадров между потоком чтения и потоком анализа
+import threading  # Фоновый поток чтения кадров
+import time  # Замер времени ожидания для метрик очереди
+
+# --- Библиотеки для обработки видео ---
+import cv2  # OpenCV для чтения кадров видео
+
+# Если до следующего нужного кадра больше этого числа кадров, выгоднее перемотать (seek), чем пропускать кадры:
+# при перемотке декодер переходит к ближайшему предыдущему ключевому кадру и декодирует только от него.
+# Значение порядка длины группы кадров (GOP) у типичного H.264 видео.
+SEEK_THRESHOLD = 250
+
+# Сколько прочитанных кадров может ждать анализа в очереди предвыборки (см. prefetch_frames)
+PREFETCH_QUEUE_SIZE = 16
+
+
+def key_frame_numbers(total_frames):
+    """
+    Номера ключевых кадров шота по умолчанию: первый, средний и последний.
+
+    Аргументы:
+    total_frames — количество кадров в анализируемом диапазоне.
+
+    Возвращает:
+    Отсортированный список номеров кадров (считая с 1), без повторов.
+    """
+
+    return sorted({number for number in (1, total_frames // 2, total_frames) if 1 <= number <= total_frames})
+
+
+def every_nth_frame_numbers(total_frames, step=100):
+    """
+    Номера каждого step-го кадра (100, 200, ...), как в режиме process_every_100_frames.
+
+    Аргументы:
+    total_frames — количество кадров в анализируемом диапазоне.
+    step — шаг выборки (по умолчанию 100).
+
+    Возвращает:
+    Список номеров кадров (считая с 1).
+    """
+
+    return list(range(step, total_frames + 1, step))
+
+
+def sample_frames(cap, frame_numbers, start_frame=0, seek_threshold=SEEK_THRESHOLD):
+    """
+    Читает из видео только нужные кадры, не декодируя в изображения все остальные.
+
+    Аргументы:
+    cap — открытый cv2.VideoCapture.
+    frame_numbers — номера нужных кадров, считая с 1 от start_frame (любой список, порядок не важен).
+    start_frame — номер кадра исходного видео (с 0), от которого отсчитываются frame_numbers (по умолчанию 0).
+    seek_threshold — при каком расстоянии до следующего кадра перематывать, а не пропускать кадры
+                     (по умолчанию SEEK_THRESHOLD). None — перематывать только в начало диапазона
+                     (для файлов, в которых перемотка по номеру кадра неточна, например с переменной частотой кадров).
+
+    Возвращает:
+    Генератор пар (номер кадра, кадр) в порядке возрастания номеров. Если видео закончилось раньше,
+    генератор останавливается.
+
+    Описание:
+    - Близкие кадры достигаются через `grab()` без `retrieve()`: кадр проходит через декодер,
+      но не конвертируется в BGR и не копируется в NumPy массив.
+    - К далеким кадрам видео перематывается через CAP_PROP_POS_FRAMES: декодер начинает
+      с ближайшего ключевого кадра перед нужным, а промежуточные группы кадров не декодируются вовсе.
+    """
+
+    position = None  # Номер кадра (с 1), который будет прочитан следующим; None — позиция неизвестна
+
+    for number in sorted(set(frame_numbers)):
+        if number < 1:
+            continue
+
+        # --- Перемотка к далекому кадру или в начало диапазона ---
+
+        if position is None or (seek_threshold is not None and number - position > seek_threshold):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame + number - 1)
+            position = number
+
+        # --- Пропуск близких кадров без конвертации в изображение ---
+
+        while position < number:
+            if not cap.grab():
+                return  # Видео закончилось раньше, чем нужный кадр
+            position += 1
+
+        ret, frame = cap.read()
+        if not ret:
+            return
+        position += 1
+
+        yield number, frame
+
+
+def prefetch_frames(frames, queue_size=PREFETCH_QUEUE_SIZE, transform=None, stats=None):
+    """
+    Читает кадры в фоновом потоке, пока текущий поток занят анализом предыдущих кадров.
+
+    Аргументы:
+    frames — итератор пар (номер кадра, кадр), например sample_frames(...). Итератор целиком проходится
+             в фоновом потоке, поэтому видеопоток, из которого он читает, нельзя трогать до конца перебора.
+    queue_size — сколько готовых кадров может ждать анализа (по умолчанию PREFETCH_QUEUE_SIZE).
+                 Очередь ограничена, чтобы декодер не заполнил память кадрами, если анализ медленнее.
+    transform — функция (кадр) -> подготовленные входы анализаторов (например, уменьшенный кадр для модели),
+                вызывается тоже в фоновом потоке (по умолчанию None).
+    stats — словарь, в который записываются метрики очереди (по умолчанию None — метрики только печатаются):
+            'frames' — сколько кадров прошло через очередь; 'mean_depth' и 'max_depth' — глубина очереди
+            в момент, когда анализ забирает кадр; 'consumer_wait' — сколько секунд анализ ждал декодер;
+            'producer_wait' — сколько секунд декодер ждал свободного места в очереди.
+
+    Возвращает:
+    Генератор троек (номер кадра, кадр, результат transform или None) в исходном порядке.
+
+    Описание:
+    Декодирование и cv2.resize в OpenCV отпускают GIL, поэтому фоновый поток действительно работает
+    параллельно с моделями. Почти пустая очередь и большое 'consumer_wait' означают, что узкое место — декодер;
+    почти полная очередь и большое 'producer_wait' — что узкое место анализ.
+    """
+
+    buffer = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    done = object()  # Метка конца потока кадров
+    metrics = {"frames": 0, "depth_sum": 0, "max_depth": 0, "consumer_wait": 0.0, "producer_wait": 0.0}
+
+    def put(item):
+        # Ждем места в очереди, но выходим, если анализ остановился и кадры больше не нужны
+        started = time.perf_counter()
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        metrics["producer_wait"] += time.perf_counter() - started
+
+    def produce():
+        # Метка конца или ошибка кладется в очередь при любом завершении потока: иначе анализ навсегда
+        # остался бы в buffer.get()
+        outcome = done
+        try:
+            for number, frame in frames:
+                if stop.is_set():
+                    return
+                put((number, frame, None if transform is None else transform(frame)))
+        except BaseException as error:  # Ошибка чтения (в том числе не Exception) передается в поток анализа
+            outcome = error
+        finally:
+            put(outcome)
+
+    producer = threading.Thread(target=produce, name="frame-prefetch", daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            depth = buffer.qsize()
+            started = time.perf_counter()
+            item = buffer.get()
+            metrics["consumer_wait"] += time.perf_counter() - started
+
+            if item is done:
+                break
+            if isinstance(item, BaseException):
+                raise item
+
+            metrics["frames"] += 1
+            metrics["depth_sum"] += depth
+            metrics["max_depth"] = max(metrics["max_depth"], depth)
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+        summary = {
+            "frames": metrics["frames"],
+            "mean_depth": metrics["depth_sum"] / metrics["frames"] if metrics["frames"] else 0.0,
+            "max_depth": metrics["max_depth"],
+            "consumer_wait": metrics["consumer_wait"],
+            "producer_wait": metrics["producer_wait"]
+        }
+        if stats is not None:
+            stats.update(summary)
+        print(f"Предвыборка кадров: {summary['frames']} кадров, глубина очереди в среднем "
+              f"{summary['mean_depth']:.1f} (макс. {summary['max_depth']} из {queue_size}), "
+              f"анализ ждал декодер {summary['consumer_wait']:.2f} с, "
+              f"декодер ждал анализ {summary['producer_wait']:.2f} с")
@@ -0,0 +1,191 @@
+# --- Стандартные библиотеки Python ---
+import os  # Библиотека для работы с файловой системой (папки очереди, атомарное перемещение файлов заданий)
+import time  # Время постановки, начала и окончания задания
+import uuid  # Уникальная часть идентификатора задания
+
+# --- Модули проекта ---
+from checkpoints import load_json_safe, write_json_atomic  # Чтение и атомарная запись файлов заданий
+from profiles import DEFAULT_PROFILE, load_profile  # Проверка профиля анализа при постановке задания
+
+# Папка очереди по умолчанию
+JOB_QUEUE_DIR = os.environ.get("JOB_QUEUE_DIR", "jobs")
+
+# Состояния задания — подпапки очереди. Задание — JSON файл, который переходит между ними атомарным
+# переименованием, поэтому одно задание забирает ровно один воркер, даже если их запущено несколько
+JOB_STATES = ("pending", "running", "done", "failed")
+
+# Суффикс файла задания, которое воркер забирает прямо сейчас: '<id>.json.<PID воркера>.claim' в папке running.
+# Задание в состоянии 'running' появляется только вместе с PID воркера, а PID в имени файла позволяет
+# вернуть в очередь задание воркера, упавшего посреди claim_job (см. requeue_orphaned_jobs)
+CLAIM_SUFFIX = ".claim"
+
+
+def job_state_dir(queue_dir, state):
+    """
+    Возвращает папку заданий в состоянии state (см. JOB_STATES) и создает ее при необходимости.
+    """
+
+    path = os.path.join(queue_dir, state)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def submit_job(video_path, profile=DEFAULT_PROFILE, pipeline_args=(), queue_dir=JOB_QUEUE_DIR, output_dir=None):
+    """
+    Ставит видео в очередь анализа.
+
+    Аргументы:
+    video_path — путь к видеофайлу (в задании хранится абсолютный путь).
+    profile — профиль анализа: имя готового профиля или путь к JSON файлу (см. profiles.load_profile).
+    pipeline_args — дополнительные аргументы конвейера separating.py, например ['--single-pass'].
+    queue_dir — папка очереди (по умолчанию JOB_QUEUE_DIR).
+    output_dir — папка результатов задания (по умолчанию results/<id задания> внутри папки очереди).
+
+    Возвращает:
+    Словарь задания (идентификатор в ключе 'id').
+    """
+
+    load_profile(profile)  # Ошибка в профиле видна сразу при постановке, а не в воркере
+    if os.path.isfile(profile):
+        profile = os.path.abspath(profile)
+
+    # Идентификатор начинается со времени постановки с точностью до наносекунды (UTC, без переходов на летнее
+    # время): задания забираются в порядке очереди, даже если поставлены в одну и ту же секунду
+    submitted_ns = time.time_ns()
+    seconds, nanoseconds = divmod(submitted_ns, 10 ** 9)
+    job_id = f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime(seconds))}-{nanoseconds:09d}-{uuid.uuid4().hex[:8]}"
+    job = {
+        "id": job_id,
+        "video_path": os.path.abspath(video_path),
+        "profile": profile,
+        "pipeline_args": list(pipeline_args),
+        "output_dir": os.path.abspath(output_dir or os.path.join(queue_dir, "results", job_id)),
+        "submitted_at": submitted_ns / 10 ** 9
+    }
+
+    # Файл сначала пишется под временным именем: воркер не увидит недописанное задание
+    write_json_atomic(job, os.path.join(job_state_dir(queue_dir, "pending"), f"{job_id}.json"))
+    return job
+
+
+def claim_job(queue_dir=JOB_QUEUE_DIR):
+    """
+    Забирает самое раннее задание из очереди и переводит его в состояние 'running'.
+
+    Возвращает:
+    Словарь задания или None, если очередь пуста.
+
+    Описание:
+    Задание забирается переименованием в файл с PID воркера в имени (см. CLAIM_SUFFIX): это переименование
+    удается ровно одному воркеру. Файл '<id>.json' в папке running появляется уже с PID воркера, поэтому
+    requeue_orphaned_jobs другого воркера, запущенного в этот момент, не примет задание за брошенное.
+    """
+
+    pending_dir = job_state_dir(queue_dir, "pending")
+    running_dir = job_state_dir(queue_dir, "running")
+
+    for file_name in sorted(name for name in os.listdir(pending_dir) if name.endswith(".json")):
+        claim_path = os.path.join(running_dir, f"{file_name}.{os.getpid()}{CLAIM_SUFFIX}")
+        try:
+            os.rename(os.path.join(pending_dir, file_name), claim_path)
+        except FileNotFoundError:
+            continue  # Задание уже забрал другой воркер
+
+        job = load_json_safe(claim_path)
+        if job is None:
+            os.replace(claim_path, os.path.join(job_state_dir(queue_dir, "failed"), file_name))
+            continue
+
+        job.update({"worker_pid": os.getpid(), "started_at": time.time()})
+        write_json_atomic(job, os.path.join(running_dir, file_name))
+        os.remove(claim_path)
+        return job
+
+    return None
+
+
+def finish_job(job, queue_dir=JOB_QUEUE_DIR, error=None):
+    """
+    Переводит задание из 'running' в 'done' или, если передана ошибка, в 'failed'.
+
+    Аргументы:
+    job — словарь задания (см. claim_job).
+    queue_dir — папка очереди.
+    error — текст ошибки (по умолчанию None — задание выполнено).
+
+    Возвращает:
+    Путь к файлу задания в новом состоянии.
+    """
+
+    file_name = f"{job['id']}.json"
+    job = dict(job, finished_at=time.time(), error=error)
+    job["seconds"] = round(job["finished_at"] - job.get("started_at", job["finished_at"]), 3)
+
+    path = os.path.join(job_state_dir(queue_dir, "failed" if error else "done"), file_name)
+    write_json_atomic(job, path)
+    running_path = os.path.join(job_state_dir(queue_dir, "running"), file_name)
+    if os.path.exists(running_path):
+        os.remove(running_path)
+    return path
+
+
+def requeue_job(job, queue_dir=JOB_QUEUE_DIR):
+    """
+    Возвращает задание из 'running' в начало очереди (например, если воркер остановлен посреди задания).
+    Конвейер продолжит его с чекпоинтов в папке результатов задания.
+    """
+
+    file_name = f"{job['id']}.json"
+    running_path = os.path.join(job_state_dir(queue_dir, "running"), file_name)
+    if os.path.exists(running_path):
+        os.replace(running_path, os.path.join(job_state_dir(queue_dir, "pending"), file_name))
+
+
+def requeue_orphaned_jobs(queue_dir=JOB_QUEUE_DIR):
+    """
+    Возвращает в очередь задания, воркер которых больше не работает (процесс упал или хост перезагружен).
+
+    Возвращает:
+    Список идентификаторов возвращенных заданий.
+
+    Описание:
+    Воркер записывает в задание свой PID, а задание, которое он забирает прямо сейчас, несет PID в имени
+    файла (см. claim_job). Проверка PID действительна только для воркеров этого хоста,
+    поэтому папку очереди не стоит делить между хостами.
+    """
+
+    requeued = []
+    pending_dir = job_state_dir(queue_dir, "pending")
+    running_dir = job_state_dir(queue_dir, "running")
+    for file_name in sorted(os.listdir(running_dir)):
+        if file_name.endswith(CLAIM_SUFFIX):
+            # Воркер упал между переименованием задания и записью в него своего PID
+            job_file, pid = file_name[:-len(CLAIM_SUFFIX)].rsplit(".", 1)
+            if pid.isdigit() and not _is_process_alive(int(pid)):
+                os.replace(os.path.join(running_dir, file_name), os.path.join(pending_dir, job_file))
+                requeued.append(job_file[:-len(".json")])
+            continue
+        if not file_name.endswith(".json"):
+            continue
+        job = load_json_safe(os.path.join(running_dir, file_name))
+        if job is None or _is_process_alive(job.get("worker_pid")):
+            continue
+        requeue_job(job, queue_dir)
+        requeued.append(job["id"])
+    return requeued
+
+
+def _is_process_alive(pid):
+    """
+    Проверяет, работает ли процесс с данным PID на этом хосте.
+    """
+
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Процесс есть, но принадлежит другому пользователю
+    return True
@@ -0,0 +1,121 @@
+# --- Библиотеки для работы с данными и нейронными сетями ---
+import numpy as np  # Библиотека для работы с массивами (сборка пакетов кадров)
+from model_registry import register_model  # Реестр моделей: загрузка при первом использовании, одна на процесс
+# TensorFlow импортируется в функциях: импорт модуля (например, ради констант) не загружает TensorFlow
+
+# Максимальный размер пакета, который подается в модель за один вызов
+ENGINE_BATCH_SIZE = 8
+
+# Слой InceptionV3, карта признаков которого служит картой классов для сегментации (17x17x768 на входе 299x299).
+# Последний блок mixed10 дает только 8x8, а mixed7 заметно детальнее и считается по пути к нему бесплатно
+BACKBONE_FEATURE_LAYER = 'mixed7'
+
+
+def batch_buckets(max_batch_size):
+    """
+    Возвращает фиксированные размеры пакетов, под которые компилируется граф: 1, 2, 4, ... до max_batch_size.
+
+    Описание:
+    Граф компилируется заранее для каждого размера, поэтому во время работы повторной трассировки не бывает.
+    Неполный пакет дополняется нулями только до ближайшего размера, а не до максимального:
+    у шота всего три ключевых кадра, и считать вместо них восемь было бы расточительно.
+    """
+
+    buckets = []
+    size = 1
+    while size < max_batch_size:
+        buckets.append(size)
+        size *= 2
+    buckets.append(max_batch_size)
+    return buckets
+
+
+def compile_model(model, input_size, max_batch_size=ENGINE_BATCH_SIZE):
+    """
+    Оборачивает модель Keras в скомпилированный граф (tf.function) с фиксированными размерами пакетов и прогревом.
+
+    Аргументы:
+    model — модель Keras.
+    input_size — размер входного изображения модели (высота, ширина).
+    max_batch_size — максимальный размер пакета за один вызов (по умолчанию ENGINE_BATCH_SIZE).
+
+    Возвращает:
+    Функцию predict(images), которая принимает массив изображений формы (N, высота, ширина, 3)
+    и возвращает выход модели формы (N, ...) в виде NumPy массива.
+    Для модели с несколькими выходами возвращается список массивов в порядке выходов модели.
+
+    Описание:
+    `model.predict()` на каждый вызов строит tf.data датасет и запускает колбэки, и для одного кадра
+    эти накладные расходы в разы больше самого прямого прохода. Скомпилированный граф вызывается напрямую.
+    """
+
+    import tensorflow as tf  # TensorFlow для компиляции графа вычислений
+
+    buckets = batch_buckets(max_batch_size)
+
+    @tf.function
+    def forward(images):
+        return model(images, training=False)
+
+    # --- Прогрев: трассировка графа для каждого размера пакета до начала работы ---
+
+    for size in buckets:
+        forward(tf.zeros((size, *input_size, 3), dtype=tf.float32))
+
+    def predict(images):
+        images = np.asarray(images, dtype=np.float32)
+        outputs = []
+
+        for start in range(0, len(images), max_batch_size):
+            chunk = images[start:start + max_batch_size]
+            count = len(chunk)
+
+            # Дополняем пакет нулями до ближайшего скомпилированного размера
+            size = next(bucket for bucket in buckets if bucket >= count)
+            if size > count:
+                padding = np.zeros((size - count, *chunk.shape[1:]), dtype=np.float32)
+                chunk = np.concatenate([chunk, padding])
+
+            outputs.append([output.numpy()[:count] for output in tf.nest.flatten(forward(tf.constant(chunk)))])
+
+        if not outputs:
+            return np.empty((0,), dtype=np.float32)
+
+        # Склеиваем части пакета отдельно для каждого выхода модели
+        merged = [np.concatenate(parts) for parts in zip(*outputs)]
+        return merged if len(merged) > 1 else merged[0]
+
+    return predict
+
+
+@register_model('inception_backbone')
+def get_inception_backbone():
+    """
+    Возвращает модель Keras InceptionV3 с двумя выходами (вход 299x299):
+    - вероятности классов ImageNet (события кадра);
+    - карта признаков слоя BACKBONE_FEATURE_LAYER (пространственная карта классов для сегментации).
+    Оба выхода считаются одним прямым проходом.
+    """
+
+    import tensorflow as tf  # TensorFlow для загрузки модели Keras
+
+    model = tf.keras.applications.InceptionV3(weights='imagenet')
+    return tf.keras.Model(model.input, [model.output, model.get_layer(BACKBONE_FEATURE_LAYER).output])
+
+
+@register_model('inception')
+def get_inception_engine(precision="fp32"):
+    """
+    Возвращает скомпилированную модель InceptionV3 с двумя выходами (см. get_inception_backbone).
+    Модель загружается и прогревается один раз на процесс для каждой точности.
+
+    Аргументы:
+    precision — 'fp32' (граф TensorFlow) или 'int8' (квантованная модель TFLite, см. quantization.tflite_engine).
+    """
+
+    if precision == "int8":
+        from quantization import tflite_engine  # Импорт здесь: TFLite нужен только для INT8 пути
+
+        return tflite_engine(get_inception_backbone(), (299, 299), "inception_v3")
+
+    return compile_model(get_inception_backbone(), (299, 299))
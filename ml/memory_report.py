@@ -0,0 +1,59 @@
+# --- Стандартные библиотеки Python ---
+import os  # PID текущего процесса
+
+# --- Сторонние библиотеки ---
+import psutil  # Память процессов: RSS, собственная (USS) и пропорциональная (PSS) доли
+
+# Байт в мегабайте (для отчета)
+MB = 1024 * 1024
+
+
+def process_memory(pid=None):
+    """
+    Возвращает память процесса в мегабайтах.
+
+    Аргументы:
+    pid — PID процесса (по умолчанию None — текущий процесс).
+
+    Возвращает:
+    Словарь с ключами:
+    - 'pid' — PID процесса;
+    - 'rss' — вся память процесса в ОЗУ, включая страницы, общие с другими процессами;
+    - 'uss' — собственная память процесса (освободится, если завершить только его);
+    - 'pss' — собственная память плюс доля общих страниц, поделенных между всеми процессами, которые их используют
+              (только Linux; на других ОС None);
+    - 'shared' — память, общая с другими процессами (rss - uss): для воркеров, запущенных через fork, это
+                 в основном веса моделей родителя.
+    """
+
+    info = psutil.Process(pid or os.getpid()).memory_full_info()
+    pss = getattr(info, "pss", None)
+    return {
+        "pid": pid or os.getpid(),
+        "rss": round(info.rss / MB, 1),
+        "uss": round(info.uss / MB, 1),
+        "pss": None if pss is None else round(pss / MB, 1),
+        "shared": round((info.rss - info.uss) / MB, 1)
+    }
+
+
+def print_memory_report(parent, workers):
+    """
+    Печатает отчет о памяти основного процесса и воркеров.
+
+    Аргументы:
+    parent — память основного процесса (см. process_memory).
+    workers — список памяти воркеров (см. process_memory), по одной записи на воркер.
+
+    Описание:
+    Сумма USS воркеров — сколько памяти добавляет каждый воркер сверх общих весов; по ней видно,
+    сколько еще воркеров поместится на хост.
+    """
+
+    print(f"Основной процесс {parent['pid']}: RSS {parent['rss']} МБ, USS {parent['uss']} МБ")
+    for memory in workers:
+        pss = "н/д" if memory["pss"] is None else f"{memory['pss']} МБ"
+        print(f"Воркер {memory['pid']}: RSS {memory['rss']} МБ, собственная (USS) {memory['uss']} МБ, "
+              f"PSS {pss}, общая с другими процессами {memory['shared']} МБ")
+    if workers:
+        print(f"Собственная память воркеров всего: {round(sum(memory['uss'] for memory in workers), 1)} МБ")
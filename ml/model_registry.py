@@ -0,0 +1,91 @@
+# --- Стандартные библиотеки Python ---
+import functools  # Сохранение имени и документации загрузчика у функции доступа к модели
+import inspect  # Подстановка значений аргументов загрузчика по умолчанию в ключ модели
+import threading  # Блокировки загрузки: анализаторы одного пакета обращаются к моделям из разных потоков
+
+# Загрузчики моделей по имени (заполняются декоратором register_model при импорте модуля с загрузчиком)
+_MODEL_LOADERS = {}
+
+# Загруженные модели процесса: {(имя, аргументы загрузчика): модель}
+_LOADED_MODELS = {}
+
+# Блокировки загрузки по ключу модели: разные модели грузятся параллельно, одна и та же — один раз
+_LOAD_LOCKS = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def register_model(name):
+    """
+    Регистрирует загрузчик модели под именем name.
+
+    Аргументы:
+    name — имя модели в реестре (например, 'yolo').
+
+    Возвращает:
+    Декоратор. Функция загрузчика заменяется функцией доступа с теми же аргументами: модель загружается
+    при первом вызове и дальше берется из реестра (одна загрузка на процесс для каждого набора аргументов).
+
+    Описание:
+    Модули не создают модели при импорте, поэтому импорт любого модуля и запуск с --help не загружают
+    веса и тяжелые библиотеки. Библиотеки модели импортируются внутри ее загрузчика.
+    """
+
+    def decorator(loader):
+        _MODEL_LOADERS[name] = loader
+
+        @functools.wraps(loader)
+        def get(*args, **kwargs):
+            return get_model(name, *args, **kwargs)
+
+        return get
+
+    return decorator
+
+
+def get_model(name, *args, **kwargs):
+    """
+    Возвращает модель name из реестра и загружает ее при первом обращении.
+
+    Аргументы:
+    name — имя зарегистрированной модели.
+    args, kwargs — аргументы загрузчика (например, точность вычислений); для каждого набора аргументов своя модель.
+                   Значения по умолчанию подставляются, так что get_yolo_model() и get_yolo_model('fp32') —
+                   одна и та же модель.
+    """
+
+    if name not in _MODEL_LOADERS:
+        raise KeyError(f"Модель {name} не зарегистрирована. Доступны: {', '.join(sorted(_MODEL_LOADERS))}")
+
+    bound = inspect.signature(_MODEL_LOADERS[name]).bind(*args, **kwargs)
+    bound.apply_defaults()
+    key = (name, bound.args)
+    model = _LOADED_MODELS.get(key)
+    if model is not None:
+        return model
+
+    with _REGISTRY_LOCK:
+        lock = _LOAD_LOCKS.setdefault(key, threading.Lock())
+
+    # Пока один поток загружает модель, остальные ждут ее, а не загружают вторую копию
+    with lock:
+        if key not in _LOADED_MODELS:
+            _LOADED_MODELS[key] = _MODEL_LOADERS[name](*bound.args)
+    return _LOADED_MODELS[key]
+
+
+def loaded_models():
+    """
+    Возвращает список загруженных в процессе моделей в виде пар (имя, аргументы загрузчика).
+    """
+
+    return list(_LOADED_MODELS)
+
+
+def unload_models(*names):
+    """
+    Удаляет модели из реестра процесса (все или только с именами names); при следующем обращении они загрузятся заново.
+    """
+
+    for key in list(_LOADED_MODELS):
+        if not names or key[0] in names:
+            del _LOADED_MODELS[key]
@@ -0,0 +1,286 @@
+# --- Стандартные библиотеки Python ---
+import argparse  # Модуль для обработки аргументов командной строки
+import os  # Библиотека для работы с файловой системой (поиск эталонных клипов в папке)
+import sys  # Код возврата, если точность INT8 ниже порогов
+import time  # Замер времени моделей в каждой точности
+
+# --- Библиотеки для работы с видео и данными ---
+import cv2  # OpenCV для чтения эталонных клипов
+import numpy as np  # Библиотека для работы с массивами (номера кадров, входы калибровки)
+
+# --- Модули проекта ---
+from checkpoints import write_json_atomic  # Запись отчета сравнения
+from frame_sampler import sample_frames  # Чтение только нужных кадров клипа
+from keras_engine import get_inception_backbone  # Модель InceptionV3 для калибровки квантования
+from quantization import quantize_keras_model, quantize_yolo  # Квантование моделей в INT8
+import video  # Анализаторы кадров и выбор точности моделей
+
+# Сколько кадров берется с каждого эталонного клипа (равномерно по длительности)
+REFERENCE_FRAMES_PER_CLIP = 32
+
+# Детекция INT8 совпадает с детекцией FP32, если у них один класс и IoU рамок не меньше порога
+DETECTION_IOU = 0.5
+
+# Пороги приемки INT8: F1 детекций, совпадение первого события и основной эмоции с FP32
+MIN_DETECTION_F1 = 0.9
+MIN_TOP1_AGREEMENT = 0.9
+MIN_EMOTION_AGREEMENT = 0.9
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+
+def reference_frames(clip_paths, frames_per_clip=REFERENCE_FRAMES_PER_CLIP):
+    """
+    Читает кадры эталонных клипов, равномерно распределенные по длительности каждого клипа.
+
+    Аргументы:
+    clip_paths — пути к клипам или папкам с клипами.
+    frames_per_clip — сколько кадров брать с клипа (по умолчанию REFERENCE_FRAMES_PER_CLIP).
+
+    Возвращает:
+    Список кадров BGR всех клипов.
+    """
+
+    paths = []
+    for path in clip_paths:
+        if os.path.isdir(path):
+            paths.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.lower().endswith(VIDEO_EXTENSIONS)))
+        else:
+            paths.append(path)
+
+    frames = []
+    for path in paths:
+        cap = cv2.VideoCapture(path)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        numbers = np.linspace(1, max(1, total_frames), frames_per_clip).astype(int)
+        frames.extend(frame for _, frame in sample_frames(cap, numbers))
+        cap.release()
+
+    print(f"Эталонных кадров: {len(frames)} из {len(paths)} клипов")
+    return frames
+
+
+def run_models(frames, batch_size):
+    """
+    Прогоняет кадры через YOLO, InceptionV3 и FER в текущей точности моделей (см. video.set_model_precision).
+
+    Возвращает:
+    Кортеж (outputs, seconds):
+    - outputs — {'detections': [...], 'events': [...], 'emotions': [...]} по кадрам;
+    - seconds — {модель: время работы, с}. Лица ищутся один раз вне замера: детектор лиц не квантуется.
+    """
+
+    outputs = {"detections": [], "events": [], "emotions": []}
+    seconds = {"yolo": 0.0, "inception": 0.0, "fer": 0.0}
+
+    for start in range(0, len(frames), batch_size):
+        batch = frames[start:start + batch_size]
+
+        begin = time.perf_counter()
+        outputs["detections"].extend(detections for _, detections in video.detect_objects_batch(batch))
+        seconds["yolo"] += time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        outputs["events"].extend(video.analyze_events_batch(batch))
+        seconds["inception"] += time.perf_counter() - begin
+
+        face_boxes = [video.detect_faces(frame) for frame in batch]
+        face_inputs = []
+        for frame, boxes in zip(batch, face_boxes):
+            gray_image = video.emotion_gray_image(frame)
+            face_inputs.extend(face for face in (video.emotion_face_input(gray_image, box) for box in boxes)
+                               if face is not None)
+
+        begin = time.perf_counter()
+        outputs["emotions"].extend(video.classify_emotions(face_inputs))
+        seconds["fer"] += time.perf_counter() - begin
+
+    return outputs, seconds
+
+
+def box_iou(box_a, box_b):
+    """
+    IoU двух рамок [xmin, ymin, xmax, ymax].
+    """
+
+    width = min(box_a[2], box_b[2]) - max(box_a[0], box_b[0])
+    height = min(box_a[3], box_b[3]) - max(box_a[1], box_b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    intersection = width * height
+    union = ((box_a[2] - box_a[0]) * (box_a[3] - box_a[1]) +
+             (box_b[2] - box_b[0]) * (box_b[3] - box_b[1]) - intersection)
+    return intersection / union if union > 0 else 0.0
+
+
+def compare_detections(reference, candidate, iou_threshold=DETECTION_IOU):
+    """
+    Сравнивает детекции INT8 с детекциями FP32 как с эталоном.
+
+    Возвращает:
+    Словарь с precision, recall и F1 совпавших детекций (жадное сопоставление по убыванию уверенности)
+    и средним модулем разницы уверенностей совпавших пар.
+    """
+
+    matched, confidence_diffs = 0, []
+    reference_count = sum(len(frame) for frame in reference)
+    candidate_count = sum(len(frame) for frame in candidate)
+
+    for reference_frame, candidate_frame in zip(reference, candidate):
+        unmatched = list(reference_frame)
+        for detection in sorted(candidate_frame, key=lambda item: item["confidence"], reverse=True):
+            scores = [(box_iou(detection["bbox"], other["bbox"]), index)
+                      for index, other in enumerate(unmatched) if other["class"] == detection["class"]]
+            best_iou, best_index = max(scores, default=(0.0, None))
+            if best_index is None or best_iou < iou_threshold:
+                continue
+            confidence_diffs.append(abs(detection["confidence"] - unmatched.pop(best_index)["confidence"]))
+            matched += 1
+
+    precision = matched / candidate_count if candidate_count else 1.0
+    recall = matched / reference_count if reference_count else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4),
+        "confidence_mae": round(float(np.mean(confidence_diffs)), 4) if confidence_diffs else None
+    }
+
+
+def compare_events(reference, candidate):
+    """
+    Сравнивает события (топ-3 ImageNet) INT8 с FP32: доля кадров с тем же первым событием
+    и средняя доля общих классов в топ-3.
+    """
+
+    if not reference:
+        return {"top1_agreement": 1.0, "top3_overlap": 1.0}
+
+    top1 = [ref[0]["class_id"] == cand[0]["class_id"] for ref, cand in zip(reference, candidate)]
+    overlap = [len({e["class_id"] for e in ref} & {e["class_id"] for e in cand}) / len(ref)
+               for ref, cand in zip(reference, candidate)]
+    return {"top1_agreement": round(float(np.mean(top1)), 4), "top3_overlap": round(float(np.mean(overlap)), 4)}
+
+
+def compare_emotions(reference, candidate):
+    """
+    Сравнивает эмоции лиц INT8 с FP32: доля лиц с той же основной эмоцией.
+    """
+
+    if not reference:
+        return {"agreement": 1.0, "faces": 0}
+
+    agreement = [max(ref, key=ref.get) == max(cand, key=cand.get) for ref, cand in zip(reference, candidate)]
+    return {"agreement": round(float(np.mean(agreement)), 4), "faces": len(reference)}
+
+
+def calibrate(frames, models):
+    """
+    Переквантовывает модели со статической калибровкой активаций на эталонных кадрах.
+
+    Аргументы:
+    frames — эталонные кадры (см. reference_frames).
+    models — какие модели переквантовать (ключи video.MODEL_PRECISION).
+    """
+
+    if "yolo" in models:
+        quantize_yolo(video.YOLO_WEIGHTS, calibration_frames=frames, force=True)
+
+    if "inception" in models:
+        from tensorflow.keras.applications.inception_v3 import preprocess_input  # Предобработка входа InceptionV3
+
+        events_inputs = [preprocess_input(np.asarray(video.resize_for_events(frame), dtype=np.float32))
+                         for frame in frames]
+        quantize_keras_model(get_inception_backbone(), (299, 299), "inception_v3", calibration_inputs=events_inputs,
+                             force=True)
+
+    if "fer" not in models:
+        return
+
+    face_inputs = []
+    for frame in frames:
+        gray_image = video.emotion_gray_image(frame)
+        face_inputs.extend(face[..., np.newaxis] for face in
+                           (video.emotion_face_input(gray_image, box) for box in video.detect_faces(frame))
+                           if face is not None)
+    # Без лиц на эталонных клипах калибровать нечем: классификатор эмоций остается с динамическим квантованием
+    if face_inputs:
+        quantize_keras_model(video.get_emotion_detector()["model"], video.EMOTION_INPUT_SIZE, "fer_emotion",
+                             channels=1, calibration_inputs=face_inputs, force=True)
+
+
+def check_precision(frames, models, batch_size=video.YOLO_BATCH_SIZE):
+    """
+    Сравнивает результаты и скорость моделей в INT8 с FP32 на одних и тех же кадрах.
+
+    Аргументы:
+    frames — эталонные кадры (см. reference_frames).
+    models — модели, которые проверяются в INT8 (ключи video.MODEL_PRECISION); остальные остаются в FP32.
+    batch_size — размер пакета кадров (по умолчанию video.YOLO_BATCH_SIZE).
+
+    Возвращает:
+    Отчет {'detections', 'events', 'emotions', 'speedup', 'seconds'}.
+    """
+
+    # Прогрев: первая загрузка и трассировка моделей не должна попасть в замер
+    warmup = frames[:batch_size]
+    for precision in ("fp32", "int8"):
+        video.set_model_precision({model_name: precision for model_name in models})
+        run_models(warmup, batch_size)
+
+    video.set_model_precision({model_name: "fp32" for model_name in models})
+    reference, reference_seconds = run_models(frames, batch_size)
+    video.set_model_precision({model_name: "int8" for model_name in models})
+    candidate, candidate_seconds = run_models(frames, batch_size)
+    video.set_model_precision({model_name: "fp32" for model_name in models})
+
+    return {
+        "detections": compare_detections(reference["detections"], candidate["detections"]),
+        "events": compare_events(reference["events"], candidate["events"]),
+        "emotions": compare_emotions(reference["emotions"], candidate["emotions"]),
+        "speedup": {model_name: round(reference_seconds[model_name] / candidate_seconds[model_name], 2)
+                    for model_name in models if candidate_seconds[model_name] > 0},
+        "seconds": {"fp32": reference_seconds, "int8": candidate_seconds}
+    }
+
+
+if __name__ == "__main__":
+    """
+    Проверка точности и скорости квантованных моделей на эталонных клипах.
+    """
+
+    parser = argparse.ArgumentParser(description="Сравнение моделей INT8 с FP32 на эталонных клипах.")
+    parser.add_argument("clips", nargs="+", help="Эталонные клипы или папки с клипами.")
+    parser.add_argument("--models", nargs="+", choices=list(video.MODEL_PRECISION), default=list(video.MODEL_PRECISION),
+                        help="Какие модели проверять в INT8 (по умолчанию все).")
+    parser.add_argument("--frames-per-clip", type=int, default=REFERENCE_FRAMES_PER_CLIP,
+                        help="Сколько кадров брать с каждого клипа.")
+    parser.add_argument("--calibrate", action="store_true",
+                        help="Переквантовать модели со статической калибровкой на кадрах эталонных клипов.")
+    parser.add_argument("--report", type=str, default=None, help="Путь к JSON файлу отчета.")
+    args = parser.parse_args()
+
+    frames = reference_frames(args.clips, args.frames_per_clip)
+    if args.calibrate:
+        calibrate(frames, args.models)
+
+    report = check_precision(frames, args.models)
+    if args.report:
+        write_json_atomic(report, args.report)
+
+    print(f"Детекции: {report['detections']}")
+    print(f"События: {report['events']}")
+    print(f"Эмоции: {report['emotions']}")
+    print(f"Ускорение INT8: {report['speedup']}")
+
+    # Ненулевой код возврата — INT8 нельзя включать на этих данных
+    failed = [
+        name for name, passed in (
+            ("детекции", "yolo" not in args.models or report["detections"]["f1"] >= MIN_DETECTION_F1),
+            ("события", "inception" not in args.models or report["events"]["top1_agreement"] >= MIN_TOP1_AGREEMENT),
+            ("эмоции", "fer" not in args.models or report["emotions"]["agreement"] >= MIN_EMOTION_AGREEMENT)
+        ) if not passed
+    ]
+    if failed:
+        print(f"Точность INT8 ниже порога: {', '.join(failed)}")
+        sys.exit(1)
@@ -0,0 +1,113 @@
+# --- Стандартные библиотеки Python ---
+import json  # Чтение профиля анализа из JSON файла
+import os  # Проверка, передан ли профиль файлом или именем готового профиля
+
+# Анализаторы кадров (см. video.analyze_keyframes) и поля результатов кадра, которые они заполняют.
+# Поля 'faces', 'moving_objects' и 'salient_regions' лежат внутри 'poi'
+VIDEO_ANALYZERS = {
+    "objects": "detections",
+    "events": "events",
+    "faces": "faces",
+    "motion": "moving_objects",
+    "saliency": "salient_regions"
+}
+
+# Анализаторы аудио (см. audio.analyze_audio) и ключи JSON файла аудиорезультатов, которые они заполняют
+AUDIO_ANALYZERS = {
+    "transcription": "transcriptions",
+    "summary": "summary",
+    "sentiment": "sentiment_analysis",
+    "soundscape": "soundscape_analysis",
+    "clap": "clap_analysis",
+    "key_events": "key_events",
+    "labels": "labeled_transcriptions"
+}
+
+# Анализаторы, которые работают по тексту транскрипции и без нее не имеют смысла
+TRANSCRIPT_ANALYZERS = ("summary", "sentiment", "key_events", "labels")
+
+# Готовые профили: {имя: {'video': анализаторы кадров, 'audio': анализаторы аудио}}.
+# Необязательный ключ 'cascade' включает каскадные условия анализаторов кадров (см. video.ANALYZER_GATES):
+# лица ищутся только вокруг людей, найденных YOLO. По умолчанию каскад выключен — лица ищутся на всем кадре
+PROFILE_PRESETS = {
+    "full": {"video": tuple(VIDEO_ANALYZERS), "audio": tuple(AUDIO_ANALYZERS)},
+    "full_cascade": {"video": tuple(VIDEO_ANALYZERS), "audio": tuple(AUDIO_ANALYZERS), "cascade": True},
+    "detections_transcripts": {"video": ("objects",), "audio": ("transcription",)},
+    "video_only": {"video": tuple(VIDEO_ANALYZERS), "audio": ()},
+    "audio_only": {"video": (), "audio": tuple(AUDIO_ANALYZERS)}
+}
+
+DEFAULT_PROFILE = "full"
+
+
+def load_profile(spec=DEFAULT_PROFILE):
+    """
+    Загружает профиль анализа: какие анализаторы кадров и аудио включены в запуск.
+
+    Аргументы:
+    spec — имя готового профиля из PROFILE_PRESETS или путь к JSON файлу вида
+           {"video": ["objects"], "audio": ["transcription"], "cascade": true} (по умолчанию DEFAULT_PROFILE).
+           Если в файле нет раздела, включены все анализаторы этого раздела; без 'cascade' каскад выключен.
+
+    Возвращает:
+    Словарь {'video': кортеж анализаторов кадров, 'audio': кортеж анализаторов аудио, 'cascade': включен ли каскад}
+    с анализаторами в порядке VIDEO_ANALYZERS и AUDIO_ANALYZERS.
+
+    Описание:
+    Выключенные анализаторы не импортируют свои библиотеки, не загружают модели и не запускаются,
+    а их поля в JSON результатах равны null.
+    """
+
+    if spec in PROFILE_PRESETS:
+        profile = PROFILE_PRESETS[spec]
+    elif os.path.isfile(spec):
+        with open(spec, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+    else:
+        raise ValueError(f"Неизвестный профиль анализа: {spec}. Укажите путь к JSON файлу "
+                         f"или один из профилей: {', '.join(PROFILE_PRESETS)}")
+
+    video = profile.get("video", tuple(VIDEO_ANALYZERS))
+    audio = profile.get("audio", tuple(AUDIO_ANALYZERS))
+
+    for name, known in ((video, VIDEO_ANALYZERS), (audio, AUDIO_ANALYZERS)):
+        unknown = [analyzer for analyzer in name if analyzer not in known]
+        if unknown:
+            raise ValueError(f"Неизвестные анализаторы: {', '.join(unknown)}. Доступны: {', '.join(known)}")
+
+    without_transcript = [analyzer for analyzer in TRANSCRIPT_ANALYZERS if analyzer in audio]
+    if without_transcript and "transcription" not in audio:
+        raise ValueError(f"Анализаторы {', '.join(without_transcript)} работают по транскрипции: "
+                         f"включите в профиль 'transcription'")
+
+    return {
+        "video": tuple(analyzer for analyzer in VIDEO_ANALYZERS if analyzer in video),
+        "audio": tuple(analyzer for analyzer in AUDIO_ANALYZERS if analyzer in audio),
+        "cascade": bool(profile.get("cascade", False))
+    }
+
+
+def is_full_profile(profile):
+    """
+    Проверяет, включены ли в профиле все анализаторы (этапы сцен и кластеризации нужны все поля результатов).
+    Каскад на это не влияет: с ним заполняются те же поля.
+    """
+
+    full = PROFILE_PRESETS["full"]
+    return profile["video"] == full["video"] and profile["audio"] == full["audio"]
+
+
+def required_audio_keys(profile):
+    """
+    Возвращает ключи аудиорезультатов, которые в профиле должны быть посчитаны (не null).
+    """
+
+    return tuple(AUDIO_ANALYZERS[analyzer] for analyzer in profile["audio"])
+
+
+def required_video_fields(profile):
+    """
+    Возвращает поля результатов кадра, которые в профиле должны быть посчитаны (не null).
+    """
+
+    return tuple(VIDEO_ANALYZERS[analyzer] for analyzer in profile["video"])
@@ -0,0 +1,198 @@
+# --- Стандартные библиотеки Python ---
+import os  # Библиотека для работы с файловой системой (папка квантованных моделей, атомарная замена файлов)
+import threading  # Блокировка интерпретатора TFLite (он не потокобезопасен)
+
+# --- Библиотеки для работы с данными и нейронными сетями ---
+import cv2  # OpenCV для подготовки кадров калибровки YOLO
+import numpy as np  # Библиотека для работы с массивами (пакеты входов и выходов моделей)
+# TensorFlow Lite и ONNX Runtime импортируются в функциях квантования: модуль импортируют video и keras_engine,
+# и в исходной точности эти библиотеки не нужны
+
+# Точности вычислений моделей: 'fp32' — исходная модель, 'int8' — квантованная
+MODEL_PRECISIONS = ("fp32", "int8")
+
+# Папка квантованных моделей. Модели квантуются при первом использовании и дальше берутся из этой папки
+QUANTIZED_MODEL_DIR = os.environ.get("QUANTIZED_MODEL_DIR", os.path.join("models", "int8"))
+
+# Входной размер YOLO при экспорте в ONNX
+YOLO_IMAGE_SIZE = 640
+
+
+def quantized_model_path(name, extension):
+    """
+    Возвращает путь к квантованной модели в QUANTIZED_MODEL_DIR (например, 'inception_v3_int8.tflite').
+    """
+
+    return os.path.join(QUANTIZED_MODEL_DIR, f"{name}_int8.{extension}")
+
+
+def quantize_yolo(weights="yolov8n.pt", calibration_frames=None, force=False):
+    """
+    Экспортирует модель YOLO в ONNX и квантует ее в INT8 для ONNX Runtime.
+
+    Аргументы:
+    weights — веса YOLO (по умолчанию 'yolov8n.pt').
+    calibration_frames — кадры BGR для статической калибровки активаций (по умолчанию None — динамическое
+                         квантование: в INT8 хранятся только веса, масштабы активаций считаются на лету).
+    force — переквантовать, даже если файл модели уже есть (по умолчанию False).
+
+    Возвращает:
+    Путь к квантованной модели .onnx, который можно передать в ultralytics.YOLO(path, task='detect').
+
+    Описание:
+    Статическое квантование (формат QDQ) быстрее на CPU с VNNI, но требует кадров, похожих на рабочие:
+    их отдает precision_check (--calibrate) с эталонных клипов.
+    """
+
+    name = os.path.splitext(os.path.basename(weights))[0]
+    path = quantized_model_path(name, "onnx")
+    if os.path.exists(path) and not force:
+        return path
+
+    import onnx  # Импорт здесь: ONNX нужен только для INT8 пути
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static
+    from ultralytics import YOLO
+
+    os.makedirs(QUANTIZED_MODEL_DIR, exist_ok=True)
+    onnx_path = YOLO(weights).export(format="onnx", imgsz=YOLO_IMAGE_SIZE, dynamic=True, simplify=True)
+    tmp_path = path + ".tmp"
+
+    if calibration_frames is None:
+        quantize_dynamic(onnx_path, tmp_path, weight_type=QuantType.QUInt8)
+    else:
+        input_name = onnx.load(onnx_path).graph.input[0].name
+
+        class FrameReader(CalibrationDataReader):
+            def __init__(self):
+                self.inputs = iter(yolo_input(frame)[np.newaxis] for frame in calibration_frames)
+
+            def get_next(self):
+                batch = next(self.inputs, None)
+                return None if batch is None else {input_name: batch}
+
+        quantize_static(onnx_path, tmp_path, FrameReader(), quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+    # ultralytics берет имена классов, шаг сетки и размер входа из метаданных ONNX, а квантование их не переносит
+    source, quantized = onnx.load(onnx_path), onnx.load(tmp_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source.metadata_props)
+    onnx.save(quantized, tmp_path)
+
+    os.replace(tmp_path, path)
+    print(f"Квантованная модель YOLO сохранена в {path}")
+    return path
+
+
+def yolo_input(frame, image_size=YOLO_IMAGE_SIZE):
+    """
+    Готовит кадр BGR как вход YOLO при калибровке: вписывает в квадрат image_size с серыми полями (как letterbox
+    в ultralytics), переводит в RGB и в формат (3, высота, ширина) со значениями от 0 до 1.
+    """
+
+    height, width = frame.shape[:2]
+    scale = image_size / max(height, width)
+    resized = cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_LINEAR)
+
+    canvas = np.full((image_size, image_size, 3), 114, dtype=np.uint8)
+    top = (image_size - resized.shape[0]) // 2
+    left = (image_size - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+
+    return canvas[..., ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+
+
+def quantize_keras_model(model, input_size, name, channels=3, calibration_inputs=None, force=False):
+    """
+    Конвертирует модель Keras в TensorFlow Lite с квантованием в INT8.
+
+    Аргументы:
+    model — модель Keras (может иметь несколько выходов).
+    input_size — размер входного изображения модели (высота, ширина).
+    name — имя файла модели в QUANTIZED_MODEL_DIR.
+    channels — число каналов входа (по умолчанию 3; у классификатора эмоций FER — 1).
+    calibration_inputs — подготовленные входы модели для калибровки активаций (по умолчанию None —
+                         квантуются только веса, dynamic range).
+    force — переконвертировать, даже если файл модели уже есть (по умолчанию False).
+
+    Возвращает:
+    Путь к модели .tflite. Вход и выходы модели остаются float32, так что вызывающий код не меняется.
+    """
+
+    path = quantized_model_path(name, "tflite")
+    if os.path.exists(path) and not force:
+        return path
+
+    import tensorflow as tf  # TensorFlow Lite для квантованных моделей Keras
+
+    # Размер пакета не фиксируется: интерпретатор подстраивает вход под пакет при вызове
+    @tf.function(input_signature=[tf.TensorSpec((None, *input_size, channels), tf.float32)])
+    def forward(images):
+        return model(images, training=False)
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([forward.get_concrete_function()], model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if calibration_inputs is not None:
+        converter.representative_dataset = lambda: ([np.asarray(sample, dtype=np.float32)[np.newaxis]]
+                                                    for sample in calibration_inputs)
+
+    os.makedirs(QUANTIZED_MODEL_DIR, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(converter.convert())
+    os.replace(tmp_path, path)
+    print(f"Квантованная модель {name} сохранена в {path}")
+    return path
+
+
+def tflite_engine(model, input_size, name, channels=3):
+    """
+    Возвращает квантованную модель TFLite с тем же интерфейсом, что у keras_engine.compile_model.
+
+    Аргументы:
+    model — исходная модель Keras (квантуется, если в QUANTIZED_MODEL_DIR еще нет файла name).
+    input_size — размер входного изображения модели (высота, ширина).
+    name — имя файла модели в QUANTIZED_MODEL_DIR.
+    channels — число каналов входа (по умолчанию 3).
+
+    Возвращает:
+    Функцию predict(images): массив формы (N, высота, ширина, channels) -> выход модели (N, ...)
+    или список выходов в порядке выходов модели Keras.
+    """
+
+    import tensorflow as tf  # TensorFlow Lite для квантованных моделей Keras
+
+    path = quantize_keras_model(model, input_size, name, channels)
+
+    # Потоки интерпретатора — та же доля, что выделена TensorFlow (см. video.set_analyzer_thread_budget)
+    threads = tf.config.threading.get_intra_op_parallelism_threads() or None
+    interpreter = tf.lite.Interpreter(model_path=path, num_threads=threads)
+    input_index = interpreter.get_input_details()[0]["index"]
+
+    # TFLite не гарантирует порядок выходов, поэтому выходы сопоставляются с выходами Keras по форме
+    expected_shapes = [tuple(output.shape[1:]) for output in tf.nest.flatten(model.outputs)]
+    output_details = interpreter.get_output_details()
+    output_indexes = [
+        next(detail["index"] for detail in output_details if tuple(detail["shape"][1:]) == shape)
+        for shape in expected_shapes
+    ]
+
+    lock = threading.Lock()
+    state = {"batch": None}
+
+    def predict(images):
+        images = np.asarray(images, dtype=np.float32)
+        with lock:
+            # Вход пересоздается, только когда меняется размер пакета
+            if state["batch"] != len(images):
+                interpreter.resize_tensor_input(input_index, images.shape)
+                interpreter.allocate_tensors()
+                state["batch"] = len(images)
+
+            interpreter.set_tensor(input_index, images)
+            interpreter.invoke()
+            outputs = [interpreter.get_tensor(index).copy() for index in output_indexes]
+
+        return outputs if len(outputs) > 1 else outputs[0]
+
+    return predict
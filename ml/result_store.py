@@ -0,0 +1,252 @@
+# --- Стандартные библиотеки Python ---
+import json  # Библиотека для работы с JSON (одна запись на строку файла JSONL)
+import os  # Библиотека для работы с файловой системой (проверка файлов, сброс записи на диск)
+
+# --- Модули проекта ---
+from checkpoints import (AUDIO_RESULT_KEYS, NO_AUDIO_STREAM, VIDEO_RESULT_FIELDS, is_valid_audio_result,
+                         is_valid_video_result, load_json_safe, write_json_atomic)  # Проверка и запись результатов
+from profiles import required_audio_keys, required_video_fields  # Какие результаты нужны профилю анализа
+
+# Соответствие ключей результата audio.analyze_audio ключам JSON файла аудиорезультатов (см. audio.save_results_to_json)
+AUDIO_JSON_KEYS = {
+    "transcriptions": "transcriptions",
+    "summary_results": "summary",
+    "sentiment_results": "sentiment_analysis",
+    "soundscape_results": "soundscape_analysis",
+    "clap_results": "clap_analysis",
+    "key_events": "key_events",
+    "labeled_transcriptions": "labeled_transcriptions"
+}
+
+
+def append_shot_result(store_path, video_name, shot_name, audio_results, video_results):
+    """
+    Дописывает результаты анализа одного шота в хранилище (файл JSONL, одна строка на шот).
+
+    Аргументы:
+    store_path — путь к файлу хранилища (.jsonl).
+    video_name — имя видео (ключ индекса вместе с именем шота).
+    shot_name — имя шота, например 'shot_1'.
+    audio_results — словарь результатов `audio.analyze_audio`, None, если аудио не извлечено,
+                    или checkpoints.NO_AUDIO_STREAM, если у видео нет аудиодорожки.
+    video_results — список результатов по ключевым кадрам из `video.analyze_video`.
+
+    Описание:
+    Раньше после каждого шота весь JSON файл результатов читался и записывался заново, и объем записи рос
+    квадратично от числа шотов. Теперь запись одного шота — это одна строка в конце файла.
+    Если шот записан повторно, при чтении используется последняя запись.
+    """
+
+    record = {
+        "video": video_name,
+        "shot": shot_name,
+        "audio": audio_results if audio_results is None or audio_results == NO_AUDIO_STREAM else {
+            json_key: audio_results[key] for key, json_key in AUDIO_JSON_KEYS.items()
+        },
+        "video_results": video_results
+    }
+
+    with open(store_path, "ab") as f:
+        # Если прошлый процесс упал посреди записи, оборванная строка не должна склеиться с новой
+        if f.tell() > 0 and not _ends_with_newline(store_path):
+            f.write(b"\n")
+        f.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())  # Запись шота должна пережить падение процесса (файл служит чекпоинтом)
+
+
+def _ends_with_newline(store_path):
+    """
+    Проверяет, что файл хранилища заканчивается переводом строки (последняя запись дописана целиком).
+    """
+
+    with open(store_path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _read_records(store_path, start=0):
+    """
+    Последовательно читает записи хранилища, начиная со смещения start.
+
+    Возвращает:
+    Генератор троек (смещение строки в файле, запись, смещение конца строки). Поврежденные строки пропускаются.
+    """
+
+    if not os.path.exists(store_path):
+        return
+
+    with open(store_path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            end = offset + len(line)
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                    yield offset, record, end
+                except ValueError:
+                    # Недописанная последняя строка (процесс упал во время записи) тоже попадает сюда
+                    if line.endswith(b"\n"):
+                        print(f"Пропуск поврежденной записи в {store_path} (смещение {offset})")
+            offset = end
+
+
+def _index_path(store_path):
+    """
+    Возвращает путь к файлу индекса хранилища (лежит рядом с ним).
+    """
+
+    return f"{store_path}.index.json"
+
+
+def read_store_index(store_path):
+    """
+    Возвращает индекс хранилища: где в файле лежит последняя запись каждого шота.
+
+    Аргументы:
+    store_path — путь к файлу хранилища (.jsonl).
+
+    Возвращает:
+    Словарь {(имя видео, имя шота): смещение строки в файле} в порядке первой записи шотов.
+    Если файла нет, возвращается пустой словарь.
+
+    Описание:
+    Индекс хранится рядом с хранилищем вместе с размером проиндексированной части файла. Хранилище только
+    дописывается, поэтому при чтении разбираются лишь строки, дописанные после прошлого обновления индекса.
+    Если хранилище стало короче проиндексированной части (файл заменен), индекс строится заново.
+    Оборванная последняя строка в индекс не попадает и будет прочитана, когда ее допишут.
+    """
+
+    if not os.path.exists(store_path):
+        return {}
+
+    saved = load_json_safe(_index_path(store_path)) or {}
+    covered = saved.get("size", 0)
+    if covered > os.path.getsize(store_path):
+        covered, saved = 0, {}
+    index = {(video, shot): offset for video, shot, offset in saved.get("shots", [])}
+
+    new_records = 0
+    for offset, record, end in _read_records(store_path, covered):
+        index[(record["video"], record["shot"])] = offset
+        covered = end
+        new_records += 1
+
+    if new_records or "size" not in saved:
+        write_json_atomic({"size": covered, "shots": [[video, shot, offset] for (video, shot), offset in index.items()]},
+                          _index_path(store_path))
+    return index
+
+
+def read_shot_result(store_path, offset, f=None):
+    """
+    Читает одну запись хранилища по смещению из индекса (см. read_store_index).
+
+    Аргументы:
+    store_path — путь к файлу хранилища (.jsonl).
+    offset — смещение строки в файле.
+    f — уже открытый на чтение в двоичном режиме файл хранилища (по умолчанию None — файл открывается здесь).
+
+    Возвращает:
+    Словарь записи с ключами 'video', 'shot', 'audio' и 'video_results' или None, если по смещению нет целой записи.
+    """
+
+    if f is None:
+        with open(store_path, "rb") as f:
+            return read_shot_result(store_path, offset, f)
+
+    f.seek(offset)
+    try:
+        return json.loads(f.readline())
+    except ValueError:
+        return None
+
+
+def load_shot_results(store_path, video_name):
+    """
+    Загружает последние записи всех шотов одного видео.
+
+    Аргументы:
+    store_path — путь к файлу хранилища (.jsonl).
+    video_name — имя видео.
+
+    Возвращает:
+    Словарь {имя шота: запись} в порядке первой записи шотов в хранилище.
+
+    Описание:
+    Читаются только записи этого видео по смещениям из индекса (см. read_store_index), а не весь файл.
+    Если запись по смещению не совпала с индексом (файл хранилища заменен), индекс строится заново.
+    """
+
+    for attempt in range(2):
+        index = read_store_index(store_path)
+        if not index:
+            return {}
+
+        records = {}
+        with open(store_path, "rb") as f:
+            for (video, shot), offset in index.items():
+                if video != video_name:
+                    continue
+                record = read_shot_result(store_path, offset, f)
+                if record is None or (record.get("video"), record.get("shot")) != (video, shot):
+                    break
+                records[shot] = record
+            else:
+                return records
+
+        # Индекс не соответствует файлу: строим его заново по всему хранилищу
+        os.remove(_index_path(store_path))
+
+    raise RuntimeError(f"Индекс хранилища {store_path} не совпадает с файлом даже после перестроения")
+
+
+def completed_shots(store_path, video_name, profile=None):
+    """
+    Возвращает множество шотов видео, для которых в хранилище уже есть валидные результаты и аудио-, и видеоанализа.
+
+    Аргументы:
+    store_path — путь к файлу хранилища (.jsonl).
+    video_name — имя видео.
+    profile — профиль анализа (см. profiles.load_profile) или None — нужны результаты всех анализаторов.
+              Шот, посчитанный с более узким профилем, считается недосчитанным.
+
+    Возвращает:
+    Множество имен шотов (например, {'shot_1', 'shot_2'}), которые при перезапуске можно пропустить.
+    """
+
+    audio_keys = AUDIO_RESULT_KEYS if profile is None else required_audio_keys(profile)
+    video_fields = VIDEO_RESULT_FIELDS if profile is None else required_video_fields(profile)
+
+    return {
+        shot_name for shot_name, record in load_shot_results(store_path, video_name).items()
+        if is_valid_audio_result(record["audio"], audio_keys) and is_valid_video_result(record["video_results"], video_fields)
+    }
+
+
+def export_results(store_path, video_name, shot_names, json_output_audio_path, json_output_video_path):
+    """
+    Выгружает результаты шотов из хранилища в JSON файлы аудио и видео прежнего формата
+    ({имя шота: результаты}), которые читают clastersTojson.process_and_analyze и импорт в API.
+
+    Аргументы:
+    store_path — путь к файлу хранилища (.jsonl).
+    video_name — имя видео.
+    shot_names — имена шотов в порядке их следования в видео (в этом порядке шоты идут в JSON файлах).
+    json_output_audio_path — путь к выходному JSON файлу с результатами аудио.
+    json_output_video_path — путь к выходному JSON файлу с результатами видео.
+    """
+
+    records = load_shot_results(store_path, video_name)
+    order = {name: index for index, name in enumerate(shot_names)}
+    ordered = sorted(records.values(), key=lambda record: order.get(record["shot"], len(order)))
+
+    # Шотов без аудио (не извлечено или нет аудиодорожки) в JSON аудиорезультатов нет, как и раньше
+    audio_data = {record["shot"]: record["audio"] for record in ordered
+                  if record["audio"] is not None and record["audio"] != NO_AUDIO_STREAM}
+    video_data = {record["shot"]: record["video_results"] for record in ordered}
+
+    write_json_atomic(audio_data, json_output_audio_path)
+    write_json_atomic(video_data, json_output_video_path)
+    print(f"Результаты {len(video_data)} шотов выгружены в {json_output_audio_path} и {json_output_video_path}")
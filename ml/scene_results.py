@@ -0,0 +1,282 @@
+# --- Стандартные библиотеки Python ---
+import os  # Библиотека для работы с файловой системой (имя видео для ключа в JSON)
+from collections import Counter  # Подсчет голосов за звуковые классы и тональность по шотам
+
+# --- Модули проекта ---
+from checkpoints import load_json_safe, write_json_atomic  # Чтение и атомарная запись JSON результатов
+from face_detectors import DEFAULT_FACE_DETECTOR  # Детектор лиц по умолчанию для досчитываемых кадров
+
+# Шаг выборки кадров для анализа сцен и всего видео (как у process_every_100_frames в video.analyze_video)
+FRAME_STEP = 100
+
+# Метки, которые split_audio_and_transcribe возвращает вместо текста, если распознать речь не удалось (см. asr)
+FAILED_TRANSCRIPTIONS = ("[Не удалось распознать]", "[Ошибка API]")
+
+
+def collect_frame_results(video_results, shot_timings):
+    """
+    Собирает посчитанные результаты кадров всех шотов в один словарь по номеру кадра исходного видео.
+
+    Аргументы:
+    video_results — данные JSON файла видеорезультатов шотов ({имя шота: список кадров}).
+    shot_timings — словарь таймингов шотов с ключом 'start_frame'.
+
+    Возвращает:
+    Словарь {номер кадра в исходном видео (с 0): результаты кадра без полей 'scene' и 'frame'}.
+    """
+
+    frame_results = {}
+    for shot_name, frames in video_results.items():
+        if shot_name not in shot_timings:
+            continue
+        start_frame = shot_timings[shot_name]["start_frame"]
+        for frame in frames:
+            # В результатах шота 'frame' считается с 1 от начала шота
+            frame_index = start_frame + frame["frame"] - 1
+            frame_results[frame_index] = {key: value for key, value in frame.items() if key not in ("scene", "frame")}
+    return frame_results
+
+
+def sampled_frames(total_frames, step=FRAME_STEP):
+    """
+    Возвращает номера кадров исходного видео (с 0), которые анализируются в режиме «каждый 100-й кадр».
+
+    Аргументы:
+    total_frames — общее количество кадров видео.
+    step — шаг выборки кадров (по умолчанию FRAME_STEP).
+    """
+
+    return list(range(step - 1, total_frames, step))
+
+
+def build_full_video_results(frame_results, total_frames, step=FRAME_STEP):
+    """
+    Формирует результаты анализа всего видео в формате video.analyze_video с process_every_100_frames=True.
+
+    Аргументы:
+    frame_results — словарь результатов кадров по номеру кадра исходного видео (см. collect_frame_results).
+    total_frames — общее количество кадров видео.
+    step — шаг выборки кадров (по умолчанию FRAME_STEP).
+
+    Возвращает:
+    Список результатов по каждому 100-му кадру видео.
+    """
+
+    return [
+        {"scene": 0, "frame": frame_index + 1, **frame_results[frame_index]}
+        for frame_index in sampled_frames(total_frames, step) if frame_index in frame_results
+    ]
+
+
+def build_scene_video_results(scene_shots, shot_timings, frame_results):
+    """
+    Формирует видеорезультаты сцены из уже посчитанных кадров ее шотов.
+
+    Аргументы:
+    scene_shots — список имен шотов сцены в порядке склейки.
+    shot_timings — словарь таймингов шотов с ключами 'start_frame' и 'end_frame'.
+    frame_results — словарь результатов кадров по номеру кадра исходного видео (см. collect_frame_results).
+
+    Возвращает:
+    Список результатов по кадрам сцены. В сцену попадают все посчитанные кадры ее шотов: ключевые кадры шотов
+    и каждый 100-й кадр исходного видео. Номера кадров считаются с 1 от начала сцены, как в файле scene_N.mp4.
+    """
+
+    scene_data = []
+    scene_offset = 0  # Сколько кадров сцены приходится на предыдущие шоты
+    for shot_name in scene_shots:
+        if shot_name not in shot_timings:
+            continue
+        start_frame, end_frame = shot_timings[shot_name]["start_frame"], shot_timings[shot_name]["end_frame"]
+        for frame_index in range(start_frame, end_frame):
+            if frame_index in frame_results:
+                scene_data.append({
+                    "scene": 0,
+                    "frame": scene_offset + frame_index - start_frame + 1,
+                    **frame_results[frame_index]
+                })
+        scene_offset += end_frame - start_frame
+    return scene_data
+
+
+def build_scene_audio_results(scene_shots, shot_timings, audio_results):
+    """
+    Формирует аудиорезультаты сцены из уже посчитанных аудиорезультатов ее шотов, не запуская модели.
+
+    Аргументы:
+    scene_shots — список имен шотов сцены в порядке склейки.
+    shot_timings — словарь таймингов шотов с ключами 'start_seconds' и 'end_seconds'.
+    audio_results — данные JSON файла аудиорезультатов шотов ({имя шота: результаты}).
+
+    Возвращает:
+    Словарь в формате записи JSON файла аудиорезультатов (см. audio.save_results_to_json)
+    или None, если ни у одного шота сцены нет аудиорезультатов.
+
+    Описание:
+    Структура совпадает с результатом анализа файла сцены целиком: одна транскрипция на сцену,
+    одна суммаризация и одна оценка тональности.
+    - Транскрипция и суммаризация — тексты шотов, склеенные по порядку.
+    - Тональность — метка, набравшая больше всего уверенности с учетом длительности шотов.
+    - Звуковые характеристики — средние по шотам, взвешенные по длительности.
+    - Классы CLAP — до трех классов, которые встречаются в самых длинных по сумме шотах.
+    - Ключевые события — события шотов со временем, пересчитанным от начала сцены.
+    """
+
+    shots = []  # Кортежи (время начала шота от начала сцены, результаты шота, длительность шота)
+    scene_time = 0.0
+    for shot_name in scene_shots:
+        if shot_name not in shot_timings:
+            continue
+        duration = shot_timings[shot_name]["end_seconds"] - shot_timings[shot_name]["start_seconds"]
+        if shot_name in audio_results:
+            shots.append((scene_time, audio_results[shot_name], duration))
+        scene_time += duration
+    if not shots:
+        return None
+
+    # --- Транскрипция и суммаризация ---
+
+    texts = [item["text"] for _, result, _ in shots for item in result["transcriptions"]
+             if item["text"] not in FAILED_TRANSCRIPTIONS]
+    text = " ".join(texts) if texts else shots[0][1]["transcriptions"][0]["text"]
+
+    summaries = [item["summary"] for _, result, _ in shots for item in result["summary"]]
+    original_texts = [item["original_text"] for _, result, _ in shots for item in result["summary"]]
+
+    # --- Тональность ---
+
+    sentiment_weights = Counter()
+    confidence_sums = Counter()
+    for _, result, duration in shots:
+        for item in result["sentiment_analysis"]:
+            sentiment_weights[item["sentiment"]] += item["confidence"] * duration
+            confidence_sums[item["sentiment"]] += duration
+    sentiment = sentiment_weights.most_common(1)[0][0] if sentiment_weights else None
+
+    # --- Звуковые характеристики и классы CLAP ---
+
+    total_duration = sum(duration for _, _, duration in shots) or 1.0
+    soundscape = {
+        key: sum(result["soundscape_analysis"][key] * duration for _, result, duration in shots) / total_duration
+        for key in ("rms", "spectral_centroid", "spectral_bandwidth")
+    }
+
+    clap_weights = Counter()
+    for _, result, duration in shots:
+        for label in result["clap_analysis"]:
+            clap_weights[label] += duration
+    clap_results = [label for label, _ in clap_weights.most_common(3)]
+
+    # --- Ключевые события и метки ---
+
+    key_events = [
+        {**event, "timestamp": shot_time + event["timestamp"]}
+        for shot_time, result, _ in shots for event in result["key_events"]
+    ]
+
+    labels = list(dict.fromkeys(label for _, result, _ in shots for label in result["labeled_transcriptions"]))
+    if len(labels) > 1 and "base" in labels:
+        labels.remove("base")  # Метка 'base' ставится только тексту, у которого нет других меток
+
+    return {
+        "transcriptions": [{"text": text, "start": 0.0, "end": round(scene_time, 2), "timestamp": 0}],
+        "summary": [{"timestamp": 0, "summary": " ".join(summaries), "original_text": " ".join(original_texts)}],
+        "sentiment_analysis": [] if sentiment is None else [{
+            "time": 0,
+            "text": text,
+            "sentiment": sentiment,
+            "confidence": sentiment_weights[sentiment] / confidence_sums[sentiment]
+        }],
+        "soundscape_analysis": soundscape,
+        "clap_analysis": clap_results,
+        "key_events": key_events,
+        "labeled_transcriptions": labels
+    }
+
+
+def derive_scene_results(video_path, shot_timings, final_json_file, json_output_audio_path, json_output_video_path,
+                         json_output_audio_path_scenes, json_output_video_path_scenes, json_output_video_path_full,
+                         step=FRAME_STEP, batch_size=8, extra_frame_results=None,
+                         face_detector=DEFAULT_FACE_DETECTOR, gates=None, frame_cache=None):
+    """
+    Формирует JSON результаты сцен и всего видео из уже посчитанных результатов шотов.
+
+    Аргументы:
+    video_path — путь к исходному видеофайлу.
+    shot_timings — словарь таймингов шотов.
+    final_json_file — JSON файл кластеризации ({номер сцены: список шотов}).
+    json_output_audio_path — JSON файл аудиорезультатов шотов.
+    json_output_video_path — JSON файл видеорезультатов шотов.
+    json_output_audio_path_scenes — выходной JSON файл аудиорезультатов сцен.
+    json_output_video_path_scenes — выходной JSON файл видеорезультатов сцен.
+    json_output_video_path_full — выходной JSON файл видеорезультатов всего видео.
+    step — шаг выборки кадров для всего видео (по умолчанию FRAME_STEP).
+    batch_size — сколько кадров подается в YOLO за один вызов (см. video.YOLO_BATCH_SIZE).
+    extra_frame_results — уже посчитанные результаты кадров вне шотов {номер кадра в исходном видео: результаты}
+                          (по умолчанию None), например кадры сетки из общего прохода по видео.
+    face_detector — детектор лиц для досчитываемых кадров (по умолчанию DEFAULT_FACE_DETECTOR, см. face_detectors).
+    gates — каскадные условия анализаторов для досчитываемых кадров (по умолчанию None — без каскада,
+            см. video.gates_for_profile): кадры всего видео считаются так же, как ключевые кадры шотов.
+    frame_cache — открытый кэш кадров видео (см. frame_cache.get_frame_cache; по умолчанию None —
+                  досчитываемые кадры декодируются).
+
+    Описание:
+    Сцены — это склейка уже проанализированных шотов, поэтому раньше модели прогонялись по тем же кадрам
+    еще два раза: по файлам сцен и по всему видео. Теперь модели запускаются за один проход по исходному видео
+    и только на тех 100-х кадрах, которых нет среди ключевых кадров шотов. Остальное собирается из кэша.
+    Поэтому кадры сцены — ключевые кадры ее шотов и 100-е кадры исходного видео (см. build_scene_video_results),
+    а не каждый 100-й кадр файла сцены, как при прогоне по файлам сцен (--reanalyze-scenes).
+    """
+
+    import cv2  # Импорт здесь: модулю нужен только счетчик кадров видео
+    import video  # Модели видеоанализа загружаются, только если действительно нужно досчитать кадры
+
+    cluster_data = load_json_safe(final_json_file) or {}
+    audio_results = load_json_safe(json_output_audio_path) or {}
+    frame_results = collect_frame_results(load_json_safe(json_output_video_path) or {}, shot_timings)
+    for frame_index, result in (extra_frame_results or {}).items():
+        frame_results.setdefault(frame_index, result)
+
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if frame_cache is not None:
+        total_frames = frame_cache["frame_count"]  # В кэше — фактическое число декодированных кадров
+
+    # --- Шаг 1: Досчитываем только непокрытые кадры ---
+
+    full_video_frames = sampled_frames(total_frames, step)
+    missing_frames = [frame_index for frame_index in full_video_frames if frame_index not in frame_results]
+    print(f"Кадров для анализа всего видео: {len(full_video_frames)}, "
+          f"из них уже посчитано в шотах: {len(full_video_frames) - len(missing_frames)}")
+
+    if missing_frames:
+        new_results = video.analyze_video(
+            video_path, frame_numbers=[frame_index + 1 for frame_index in missing_frames], batch_size=batch_size,
+            face_detector=face_detector, gates=gates, frame_cache=frame_cache
+        )
+        for frame in new_results:
+            frame_results[frame["frame"] - 1] = {key: value for key, value in frame.items() if key not in ("scene", "frame")}
+
+    # --- Шаг 2: Результаты всего видео ---
+
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    write_json_atomic({video_name: build_full_video_results(frame_results, total_frames, step)},
+                      json_output_video_path_full)
+
+    # --- Шаг 3: Результаты сцен ---
+
+    scenes_audio = {}
+    scenes_video = {}
+    for cluster_id, scene_shots in cluster_data.items():
+        scene_name = f"scene_{cluster_id}"
+        scene_audio = build_scene_audio_results(scene_shots, shot_timings, audio_results)
+        if scene_audio is not None:
+            scenes_audio[scene_name] = scene_audio
+        scenes_video[scene_name] = build_scene_video_results(scene_shots, shot_timings, frame_results)
+
+    write_json_atomic(scenes_audio, json_output_audio_path_scenes)
+    write_json_atomic(scenes_video, json_output_video_path_scenes)
+
+    print(f"Результаты сцен сохранены в {json_output_audio_path_scenes} и {json_output_video_path_scenes}, "
+          f"всего видео — в {json_output_video_path_full}")
@@ -4,16 +4,27 @@ import os  # Библиотека для работы с файловой сис
 import numpy as np  # Библиотека для работы с массивами и математическими операциями (например, для обработки данных)
 
 # --- Библиотеки для обработки видео ---
-from moviepy.editor import VideoFileClip, concatenate_videoclips  # Импорт класса VideoFileClip для работы с видео (извлечение, резка), Дополнительно импортируем concatenate_videoclips для объединения видеоклипов
-from scenedetect import VideoManager, SceneManager  # Импорт классов VideoManager и SceneManager для детектирования сцен в видео
-from scenedetect.detectors import ContentDetector  # Детектор ContentDetector для анализа содержимого видео и выявления сцен
+# MoviePy (резка и склейка клипов) и PySceneDetect (разбиение на шоты) импортируются в функциях, которые их используют,
+# а модели анализа загружаются при первом использовании (см. model_registry): запуск с --help не загружает ничего тяжелого
+from ffmpeg_utils import cut_range, list_keyframes, probe_streams  # Вырезание сцен из исходного видео с копированием потоков
+from frame_bus import content_detector_consumer, ocr_sampler_consumer, run_frame_bus, shot_keyframe_consumer  # Общий проход по кадрам
+from asr import ASR_BACKENDS, DEFAULT_ASR_BACKEND  # Распознаватели речи
+from face_detectors import DEFAULT_FACE_DETECTOR, FACE_DETECTOR_TIERS, face_detector_for_budget  # Детекторы лиц
+from frame_cache import get_frame_cache, run_cached_frame_bus  # Кэш уменьшенных кадров на диске
+from frame_sampler import key_frame_numbers  # Номера ключевых кадров шота
+from profiles import DEFAULT_PROFILE, PROFILE_PRESETS, is_full_profile, load_profile  # Профиль анализа: какие анализаторы включены
 
 # --- Модули для обработки аудио и кластеризации (импорт собственных модулей) ---
 from audio import process_video_to_audio_analysis  # Импорт функции для обработки аудио и анализа звука в видео
 from clastering_clasters import process_clusters  # Импорт функции для обработки кластеров (например, шотов)
+import video  # Анализ ключевых кадров, пришедших из общего прохода по видео
 from video import process_video  # Импорт функции для обработки видео (например, детектирование объектов, сегментация)
 from clastersTojson import process_and_analyze  # Импорт функции для анализа и объединения данных аудио и видео в JSON формат
+from shot_analysis import WORKER_START_METHODS, analyze_shots  # Импорт функции для последовательного или параллельного анализа шотов
+from scene_results import FRAME_STEP, derive_scene_results, sampled_frames  # Результаты сцен и всего видео из результатов шотов
+from checkpoints import is_stage_up_to_date, load_json_safe, load_run_manifest, save_run_manifest, write_json_atomic  # Чекпоинты для перезапуска конвейера
 import shutil
+import argparse  # Библиотека для обработки аргументов командной строки
 
 
 def format_time(seconds):
@@ -55,71 +66,251 @@ def format_time(seconds):
     return f"{hours:02}:{minutes:02}:{seconds:02}"
 
 
-# Загрузка видео и настройка SceneManager
-video_path = "10-22.mp4"  # Путь к видеофайлу
-output_dir = "shots"  # Папка для сохранения шотов
-
-# Проверяем и создаем папку для сохранения шотов, если она не существует
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
-
-# Настройка менеджера видео и сцены
-video_manager = VideoManager([video_path])
-scene_manager = SceneManager()
-scene_manager.add_detector(ContentDetector(threshold=30.0))  # Устанавливаем порог для разбиения на шоты
-
-# Начинаем разбиение видео на шоты
-video_manager.start()
-scene_manager.detect_scenes(frame_source=video_manager)
-scenes = scene_manager.get_scene_list()  # Получаем список шотов (сцен)
-video_manager.release()
-
-# Загружаем видео с помощью MoviePy
-video_clip = VideoFileClip(video_path)
-json_output_video_path = 'video_results_new_russia_V1.json'
-json_output_audio_path = 'audio_results_new_russia_V1.json'
-json_output_clasters_analiz_path = 'clasters_merged_russia_V1.json'
-
-shot_timings = {}
-
-for i, scene in enumerate(scenes):
-    start_time = scene[0].get_seconds()  # Начало шота в секундах
-    end_time = scene[1].get_seconds()  # Конец шота в секундах
-    print(f"Shot {i+1}: Start - {format_time(start_time)}, End - {format_time(end_time)}")
-    # Добавляем тайминги в словарь с ключом shot_{i+1}
-    shot_timings[f"shot_{i + 1}"] = {
-        "start_time": format_time(start_time),
-        "end_time": format_time(end_time)
+def detect_shots(video_path, frame_cache_dir=None):
+    """
+    Разбивает видео на шоты с помощью PySceneDetect и возвращает их тайминги.
+
+    Аргументы:
+    video_path — путь к видеофайлу.
+    frame_cache_dir — папка кэша уменьшенных кадров (по умолчанию None — видео декодируется детектором).
+                      Если указана, детектор читает кадры из кэша (кэш строится при первом запуске),
+                      и повторное разбиение, например с другим порогом, почти не тратит время на декодирование.
+
+    Возвращает:
+    shot_timings — словарь {'shot_N': тайминги} в порядке следования шотов. Тайминги содержат:
+    - 'start_time', 'end_time' — границы в формате 'HH:MM:SS' (для отчетов и API);
+    - 'start_seconds', 'end_seconds' — точные границы в секундах;
+    - 'start_frame', 'end_frame' — границы в кадрах исходного видео (конец не включается).
+    """
+
+    if frame_cache_dir is not None:
+        # Кэш ширины детектора: те же кадры, что SceneManager получил бы после уменьшения
+        detector, _ = content_detector_consumer(threshold=30.0)
+        shots = run_cached_frame_bus(get_frame_cache(video_path, frame_cache_dir), [detector])["shots"]
+        return shot_timings_from_frames(shot_frame_ranges(shots["cuts"], shots["total_frames"]), shots["fps"])
+
+    from scenedetect import VideoManager, SceneManager  # Импорт классов VideoManager и SceneManager для детектирования сцен в видео
+    from scenedetect.detectors import ContentDetector  # Детектор ContentDetector для анализа содержимого видео и выявления сцен
+
+    # Настройка менеджера видео и сцены
+    video_manager = VideoManager([video_path])
+    scene_manager = SceneManager()
+    scene_manager.add_detector(ContentDetector(threshold=30.0))  # Устанавливаем порог для разбиения на шоты
+
+    # Начинаем разбиение видео на шоты
+    video_manager.start()
+    scene_manager.detect_scenes(frame_source=video_manager)
+    scenes = scene_manager.get_scene_list()  # Получаем список шотов (сцен)
+    video_manager.release()
+
+    # Границы шотов в кадрах исходного видео (конец не включается)
+    frame_ranges = [(scene[0].get_frames(), scene[1].get_frames()) for scene in scenes]
+    fps = scenes[0][0].get_framerate() if scenes else None
+
+    return shot_timings_from_frames(frame_ranges, fps)
+
+
+def shot_timings_from_frames(frame_ranges, fps):
+    """
+    Формирует тайминги шотов по их границам в кадрах.
+
+    Аргументы:
+    frame_ranges — список пар (первый кадр шота, кадр начала следующего шота) в порядке следования шотов.
+    fps — частота кадров видео.
+
+    Возвращает:
+    shot_timings — словарь {'shot_N': тайминги} в формате detect_shots.
+    """
+
+    shot_timings = {}
+
+    for i, (start_frame, end_frame) in enumerate(frame_ranges):
+        start_time = start_frame / fps  # Начало шота в секундах
+        end_time = end_frame / fps  # Конец шота в секундах
+        print(f"Shot {i+1}: Start - {format_time(start_time)}, End - {format_time(end_time)}")
+        # Добавляем тайминги в словарь с ключом shot_{i+1}
+        # Точные границы в секундах и кадрах нужны, чтобы анализировать шот и резать сцены прямо из исходного видео
+        shot_timings[f"shot_{i + 1}"] = {
+            "start_time": format_time(start_time),
+            "end_time": format_time(end_time),
+            "start_seconds": start_time,
+            "end_seconds": end_time,
+            "start_frame": start_frame,  # Первый кадр шота в исходном видео
+            "end_frame": end_frame  # Кадр, с которого начинается следующий шот
+        }
+
+    return shot_timings
+
+
+def shot_frame_ranges(cuts, total_frames):
+    """
+    Переводит склейки детектора в границы шотов, как это делает SceneManager.get_scene_list.
+
+    Аргументы:
+    cuts — отсортированный список кадров, с которых начинаются новые шоты.
+    total_frames — количество кадров видео.
+
+    Возвращает:
+    Список пар (первый кадр шота, кадр начала следующего шота). Если склеек нет, список пустой.
+    """
+
+    if not cuts:
+        return []
+    boundaries = [0] + [cut for cut in cuts if 0 < cut < total_frames] + [total_frames]
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def detect_and_analyze_shots(video_path, batch_size=8, grid_step=FRAME_STEP, ocr_folder=None,
+                             face_detector=video.DEFAULT_FACE_DETECTOR, analyzers=PROFILE_PRESETS["full"]["video"],
+                             gates=None):
+    """
+    Разбивает видео на шоты и анализирует их ключевые кадры за один проход декодера по видео.
+
+    Аргументы:
+    video_path — путь к видеофайлу.
+    batch_size — сколько ключевых кадров подается в YOLO за один вызов (по умолчанию 8).
+    grid_step — шаг сетки кадров для результатов всего видео (по умолчанию FRAME_STEP; None — сетка не нужна).
+    ocr_folder — папка для кадров распознавания текста, по одному в секунду (по умолчанию None — кадры не сохраняются).
+    face_detector — детектор лиц (по умолчанию video.DEFAULT_FACE_DETECTOR, см. face_detectors).
+    analyzers — включенные анализаторы кадров (по умолчанию все, см. profiles.VIDEO_ANALYZERS).
+    gates — каскадные условия анализаторов кадров (по умолчанию None — без каскада, см. video.gates_for_profile).
+
+    Возвращает:
+    Кортеж (shot_timings, shot_video_results, grid_results), где:
+    - shot_timings — тайминги шотов в формате detect_shots;
+    - shot_video_results — {имя шота: результаты ключевых кадров в формате video.analyze_video по шоту};
+    - grid_results — {номер кадра в исходном видео (с 0): результаты кадра} для кадров сетки.
+
+    Описание:
+    Раньше видео декодировалось целиком детектором шотов, потом еще раз по каждому шоту для ключевых кадров
+    и еще раз для каждого 100-го кадра. Теперь кадры один раз раздаются всем потребителям шины (см. frame_bus):
+    детектор склеек получает уменьшенные кадры, а ключевые кадры и кадры сетки уходят на анализ пакетами
+    по мере декодирования. Средние кадры длинных шотов, не оставшиеся в буфере, дочитываются с перемоткой.
+    """
+
+    # --- Шаг 1: Потребители общей шины кадров ---
+
+    frame_results = {}  # Результаты проанализированных кадров по номеру кадра исходного видео
+    pending = []  # Кадры, ожидающие анализа пакетом
+
+    def analyze_pending():
+        analyzed = []
+        # В результатах video.analyze_keyframes номер кадра считается с 1
+        video.analyze_keyframes([(index + 1, frame) for index, frame in pending], 0, False, analyzed,
+                                face_detector=face_detector, analyzers=analyzers, gates=gates)
+        for frame in analyzed:
+            frame_results[frame["frame"] - 1] = {key: value for key, value in frame.items() if key not in ("scene", "frame")}
+        pending.clear()
+
+    def on_keyframes(frames):
+        pending.extend(frames)
+        if len(pending) >= batch_size:
+            analyze_pending()
+
+    detector, cuts = content_detector_consumer(threshold=30.0)
+    consumers = [detector, shot_keyframe_consumer(cuts, on_keyframes, grid_step=grid_step)]
+    if ocr_folder is not None:
+        consumers.append(ocr_sampler_consumer(ocr_folder))
+
+    # --- Шаг 2: Единственный проход по видео ---
+
+    results = run_frame_bus(video_path, consumers)
+    if pending:
+        analyze_pending()
+
+    shots = results["shots"]
+    shot_timings = shot_timings_from_frames(shot_frame_ranges(shots["cuts"], shots["total_frames"]), shots["fps"])
+
+    # --- Шаг 3: Дочитываем ключевые кадры, которых нет среди проанализированных ---
+
+    # Это средние кадры длинных шотов, не оставшиеся в буфере (results["keyframes"]), и любые другие ключевые
+    # кадры итоговых шотов, которые шина не выдала: шот не должен остаться с неполным набором кадров
+    missing = sorted({
+        timing["start_frame"] + number - 1
+        for timing in shot_timings.values()
+        for number in key_frame_numbers(timing["end_frame"] - timing["start_frame"])
+    }.difference(frame_results))
+    if missing:
+        print(f"Дочитываем ключевые кадры шотов: {len(missing)}")
+        for frame in video.analyze_video(video_path, frame_numbers=[index + 1 for index in missing],
+                                         batch_size=batch_size, face_detector=face_detector, analyzers=analyzers,
+                                         gates=gates):
+            frame_results[frame["frame"] - 1] = {key: value for key, value in frame.items() if key not in ("scene", "frame")}
+
+    # --- Шаг 4: Раскладываем результаты по шотам ---
+
+    shot_video_results = {}
+    for shot_name, timing in shot_timings.items():
+        start_frame = timing["start_frame"]
+        shot_video_results[shot_name] = [
+            {"scene": 0, "frame": number, **frame_results[start_frame + number - 1]}
+            for number in key_frame_numbers(timing["end_frame"] - start_frame)
+            if start_frame + number - 1 in frame_results
+        ]
+
+    grid_results = {} if not grid_step else {
+        index: frame_results[index] for index in sampled_frames(shots["total_frames"], grid_step)
+        if index in frame_results
     }
-    # Извлекаем подфрагмент (шот) из видео
-    subclip = video_clip.subclip(start_time, end_time)
 
-    # Сохраняем шот в виде отдельного видеофайла
-    shot_output_path = os.path.join(output_dir, f"shot_{i+1}.mp4")
-    subclip.write_videofile(shot_output_path, codec="libx264")
-    # Пример использования
-    video_path = f"shots/shot_{i+1}.mp4"
+    return shot_timings, shot_video_results, grid_results
+
+
+def save_shot_files(video_path, shot_timings, output_dir):
+    """
+    Сохраняет каждый шот отдельным .mp4 файлом (для анализа не требуется, нужно только по запросу).
 
-    process_video_to_audio_analysis(video_path,json_output_audio_path)
-    process_video(video_path, json_output_video_path)  # Пропускать 10 кадров
+    Аргументы:
+    video_path — путь к исходному видеофайлу.
+    shot_timings — словарь таймингов шотов (см. detect_shots).
+    output_dir — папка для сохранения шотов.
+    """
 
-    print(f"Shot {i+1} saved as {shot_output_path}")
+    from moviepy.editor import VideoFileClip  # Импорт класса VideoFileClip для работы с видео (извлечение, резка)
 
-# Проходим по каждому шоту и сохраняем его как отдельный файл
+    video_clip = VideoFileClip(video_path)
 
+    for shot_name, timing in shot_timings.items():
+        # Извлекаем подфрагмент (шот) из видео и сохраняем его в виде отдельного видеофайла
+        subclip = video_clip.subclip(timing["start_seconds"], timing["end_seconds"])
+        shot_output_path = os.path.join(output_dir, f"{shot_name}.mp4")
+        subclip.write_videofile(shot_output_path, codec="libx264")
+        print(f"{shot_name} saved as {shot_output_path}")
+
+    video_clip.close()
 
-timings_output_path = os.path.join("shot_timings_russia_V1.json")
-with open(timings_output_path, 'w', encoding='utf-8') as f:
-    json.dump(shot_timings, f, ensure_ascii=False, indent=4)
-    
 
-process_and_analyze(json_output_audio_path,json_output_video_path, json_output_clasters_analiz_path)
-process_clusters("clasters_merged_russia_V1.json", json_output_audio_path, json_output_video_path, "final_test_russia_V1.json")
-print("All shots have been extracted and saved.")
+def scene_time_ranges(shots, shot_timings):
+    """
+    Превращает список шотов сцены в список непрерывных временных диапазонов исходного видео.
 
+    Аргументы:
+    shots — список имен шотов сцены, например ['shot_3', 'shot_4', 'shot_5'].
+    shot_timings — словарь таймингов шотов с ключами 'start_seconds' и 'end_seconds'.
 
+    Возвращает:
+    Список диапазонов [(start, end), ...] в секундах. Соседние шоты склеиваются в один диапазон,
+    поэтому для обычной сцены из подряд идущих шотов получается ровно один диапазон.
+    Пустые шоты и шоты без таймингов пропускаются.
+    """
 
-def create_scenes_from_shots(shots_folder, final_json_file, scenes_folder):
+    ranges = []
+    for shot in shots:
+        if shot not in shot_timings:
+            print(f"Для шота {shot} нет таймингов.")
+            continue
+        start, end = shot_timings[shot]["start_seconds"], shot_timings[shot]["end_seconds"]
+        if end <= start:
+            print(f"Пропуск пустого шота: {shot}")
+            continue
+        if ranges and abs(ranges[-1][1] - start) < 1e-6:
+            ranges[-1] = (ranges[-1][0], end)  # Шот продолжает предыдущий — расширяем диапазон
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def create_scenes_from_shots(shots_folder, final_json_file, scenes_folder, source_video_path=None, shot_timings=None):
     """
     Объединяет шоты (отрезки видео) в сцены на основе данных кластеризации и сохраняет каждую сцену как отдельный видеоклип.
 
@@ -130,11 +321,16 @@ def create_scenes_from_shots(shots_folder, final_json_file, scenes_folder):
                       Пример: 'final_test.json'.
     scenes_folder — путь к папке, в которую будут сохраняться созданные сцены.
                     Пример: 'scenes/'.
+    source_video_path — путь к исходному видео (по умолчанию None).
+    shot_timings — словарь таймингов шотов с ключами 'start_seconds' и 'end_seconds' (по умолчанию None).
 
     Описание:
     - Считывает данные кластеризации из JSON файла.
-    - Для каждого кластера (сцены) находит соответствующие видеошоты.
-    - Объединяет шоты в единый видеоклип и сохраняет его в указанной папке `scenes_folder`.
+    - Если известны исходное видео и тайминги шотов, сцена вырезается из исходного видео по времени:
+      шоты кластера идут подряд, поэтому середина сцены копируется без перекодирования (от ключевого кадра
+      до ключевого кадра), а перекодируются только края у границ сцены (см. ffmpeg_utils.cut_range).
+    - Иначе для каждого кластера находятся файлы шотов в `shots_folder`, объединяются в единый видеоклип
+      и перекодируются в указанную папку `scenes_folder`.
     """
 
     # --- Шаг 1: Очистка выходной папки перед созданием сцен ---
@@ -151,28 +347,50 @@ def create_scenes_from_shots(shots_folder, final_json_file, scenes_folder):
     with open(final_json_file, 'r', encoding='utf-8') as f:
         cluster_data = json.load(f)
 
-    # --- Шаг 3: Проход по каждому кластеру (сцене) ---
-    
+    # --- Шаг 3: Быстрая сборка сцен из исходного видео без полного перекодирования ---
+
+    if source_video_path and shot_timings:
+        # Ключевые кадры и кодеки исходного видео определяются один раз для всех сцен
+        keyframes = list_keyframes(source_video_path)
+        streams = probe_streams(source_video_path)
+
+        for cluster_id, shots in cluster_data.items():
+            ranges = scene_time_ranges(shots, shot_timings)
+            if not ranges:
+                print(f"Пропуск пустой сцены {cluster_id}")
+                continue
+
+            output_file = os.path.join(scenes_folder, f"scene_{cluster_id}.mp4")
+            try:
+                cut_range(source_video_path, ranges, output_file, keyframes, streams)
+            except Exception as e:
+                print(f"Ошибка при вырезании сцены {cluster_id}: {e}")
+        return
+
+    # --- Шаг 4: Сборка сцен из файлов шотов ---
+
+    from moviepy.editor import VideoFileClip, concatenate_videoclips  # Чтение шотов и их склейка в сцену
+
     for cluster_id, shots in cluster_data.items():
         clips = []
 
-        # --- Шаг 4: Проход по каждому шоту в кластере ---
-        
+        # Проход по каждому шоту в кластере
         for shot in shots:
             shot_file = os.path.join(shots_folder, f"{shot}.mp4")
 
             if os.path.exists(shot_file):
                 clip = VideoFileClip(shot_file)
-                
-                # Добавляем только непустые клипы
-                if clip.duration > 0:
-                    clips.append(clip)
-                else:
-                    print(f"Пропуск пустого шота: {shot_file}")
             else:
                 print(f"Файл {shot_file} не найден.")
+                continue
+
+            # Добавляем только непустые клипы
+            if clip.duration > 0:
+                clips.append(clip)
+            else:
+                print(f"Пропуск пустого шота: {shot_file}")
 
-        # --- Шаг 5: Объединение шотов и создание финального видеоклипа ---
+        # Объединение шотов и создание финального видеоклипа
         
         if clips:
             try:
@@ -190,20 +408,16 @@ def create_scenes_from_shots(shots_folder, final_json_file, scenes_folder):
             except Exception as e:
                 print(f"Ошибка при объединении или сохранении сцены {cluster_id}: {e}")
 
-# Пример вызова функции
-shots_folder = "shots"  # Папка с шотами
-final_json_file = "final_test_russia_V1.json"  # Файл с описанием кластеров
-scenes_folder = "scenes"  # Папка для сохранения сцен
-
-# Очистка и создание новых сцен
-create_scenes_from_shots(shots_folder, final_json_file, scenes_folder)
-
-def analyze_existing_scenes(scenes_folder):
+def analyze_existing_scenes(scenes_folder, face_detector=DEFAULT_FACE_DETECTOR, output_dir=".",
+                            asr_backend=DEFAULT_ASR_BACKEND):
     """
     Выполняет анализ аудио и видео для всех видеоклипов в папке сцен.
     
     Аргументы:
     scenes_folder — путь к папке, содержащей видеофайлы сцен (например, 'scenes/').
+    face_detector — детектор лиц (по умолчанию DEFAULT_FACE_DETECTOR, см. face_detectors).
+    output_dir — папка для JSON файлов результатов сцен (по умолчанию текущая).
+    asr_backend — распознаватель речи (по умолчанию DEFAULT_ASR_BACKEND, см. asr).
     
     Описание:
     - Проходит по всем .mp4 файлам в указанной папке.
@@ -225,24 +439,223 @@ def analyze_existing_scenes(scenes_folder):
             # --- Шаг 3: Определение путей для сохранения результатов анализа ---
             
             # Путь для сохранения результатов анализа аудио
-            json_output_audio_path_scenes = 'json_audio_scenes_russia_V1.json'
+            json_output_audio_path_scenes = os.path.join(output_dir, 'json_audio_scenes_russia_V1.json')
             # Путь для сохранения результатов анализа видео
-            json_output_video_path_scenes = 'json_video_scenes_russia_V1.json'
+            json_output_video_path_scenes = os.path.join(output_dir, 'json_video_scenes_russia_V1.json')
 
             # --- Шаг 4: Выполнение анализа аудио и видео ---
             
             # Анализ аудиодорожки и сохранение результатов в json_output_audio_path_scenes
-            process_video_to_audio_analysis(video_path, json_output_audio_path_scenes)
+            process_video_to_audio_analysis(video_path, json_output_audio_path_scenes, asr_backend=asr_backend)
             
             # Анализ видеодорожки, обрабатываем каждый 100-й кадр
-            process_video(video_path, json_output_video_path_scenes, process_every_100_frames=True)
+            process_video(video_path, json_output_video_path_scenes, process_every_100_frames=True,
+                          face_detector=face_detector)
+
+
+def build_parser():
+    """
+    Возвращает разбор аргументов командной строки конвейера (им же пользуется worker_daemon для заданий очереди).
+    """
+
+    parser = argparse.ArgumentParser(description="Разметка видеоконтента: шоты, сцены, аудио- и видеоанализ.")
+    parser.add_argument("video_path", type=str, nargs="?", default="10-22.mp4", help="Путь к видеофайлу.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Количество процессов для параллельного анализа шотов (по умолчанию 1).")
+    parser.add_argument("--worker-start", choices=list(WORKER_START_METHODS), default="spawn",
+                        help="Запуск воркеров: spawn (каждый загружает свои модели) или fork (модели PyTorch загружаются "
+                             "один раз и общие для воркеров, только Linux/macOS; память воркеров печатается в конце).")
+    parser.add_argument("--save-shots", action="store_true",
+                        help="Сохранять шоты отдельными .mp4 файлами в папку shots (внутри --output-dir).")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Не использовать результаты прошлого запуска и посчитать все заново.")
+    parser.add_argument("--batch-size", type=int, default=8,
+                        help="Сколько ключевых кадров подается в YOLO за один вызов (по умолчанию 8).")
+    parser.add_argument("--display", action="store_true",
+                        help="Показывать аннотированные ключевые кадры в окне (только при --workers 1, нужен дисплей).")
+    parser.add_argument("--annotated-dir", type=str, default=None,
+                        help="Папка для аннотированного видео шотов (по умолчанию не пишется).")
+    parser.add_argument("--show-plots", action="store_true",
+                        help="Показывать графики кластеризации (выполнение ждет закрытия окна).")
+    parser.add_argument("--single-pass", action="store_true",
+                        help="Разбивать на шоты и анализировать ключевые кадры за один проход декодера по видео "
+                             "(только для нового запуска без --display и --annotated-dir).")
+    parser.add_argument("--ocr-frames", type=str, default=None,
+                        help="Папка, куда в том же проходе сохраняются кадры для распознавания текста (один в секунду).")
+    parser.add_argument("--frame-cache", type=str, default=None,
+                        help="Папка кэша уменьшенных кадров (строится при первом запуске): разбиение на шоты, "
+                             "анализ кадров шотов и сцен и кадры OCR читают кадры из кэша без декодирования видео.")
+    parser.add_argument("--frame-cache-width", type=int, default=640,
+                        help="Ширина кадров в кэше для анализа и OCR (разбиение на шоты — в кэше ширины детектора).")
+    parser.add_argument("--face-detector", choices=list(FACE_DETECTOR_TIERS), default=DEFAULT_FACE_DETECTOR,
+                        help="Детектор лиц: точный mtcnn (по умолчанию) или быстрые opencv_dnn и cascade для архивов.")
+    parser.add_argument("--face-budget-ms", type=float, default=None,
+                        help="Бюджет времени на поиск лиц в кадре, мс: выбирает самый точный детектор, который в него укладывается.")
+    parser.add_argument("--asr-backend", choices=list(ASR_BACKENDS), default=DEFAULT_ASR_BACKEND,
+                        help="Распознаватель речи: онлайн google (по умолчанию) или офлайн vosk (модель скачивается в папку models, см. readme).")
+    parser.add_argument("--int8", nargs="+", choices=list(video.MODEL_PRECISION), default=[],
+                        help="Модели, которые работают в квантованной точности INT8 (проверка точности: precision_check.py).")
+    parser.add_argument("--profile", type=str, default=DEFAULT_PROFILE,
+                        help="Профиль анализа: имя готового профиля (full, detections_transcripts, video_only, audio_only) "
+                             "или путь к JSON файлу вида {\"video\": [\"objects\"], \"audio\": [\"transcription\"]}. "
+                             "Этапы сцен и кластеризации выполняются только с профилем full.")
+    parser.add_argument("--reanalyze-scenes", action="store_true",
+                        help="Заново прогнать модели по файлам сцен и по всему видео, "
+                             "а не собирать результаты из уже посчитанных шотов.")
+    parser.add_argument("--output-dir", type=str, default=".",
+                        help="Папка для результатов, чекпоинтов, шотов и сцен запуска (по умолчанию текущая).")
+    return parser
+
+
+def run_pipeline(args):
+    """
+    Полный конвейер разметки видео: разбиение на шоты, анализ шотов, кластеризация шотов в сцены,
+    сборка и анализ сцен, анализ всего видео.
+
+    Аргументы:
+    args — разобранные аргументы командной строки (см. build_parser).
 
+    Описание:
+    Модели берутся из реестра процесса (см. model_registry), поэтому в долгоживущем процессе
+    (worker_daemon) повторные запуски не загружают их заново.
+    """
 
-# Пример вызова функции
-scenes_folder = "scenes"  # Папка с уже созданными сценами
+    # --- Шаг 1: Параметры запуска и пути к файлам ---
+
+    video_path = args.video_path  # Путь к видеофайлу
+    face_detector = args.face_detector if args.face_budget_ms is None else face_detector_for_budget(args.face_budget_ms)
+    # Точность задается для всех моделей: в долгоживущем процессе не должна оставаться точность прошлого запуска
+    video.set_model_precision({model_name: "int8" if model_name in args.int8 else "fp32"
+                               for model_name in video.MODEL_PRECISION})  # Воркеры получают ту же точность
+    profile = load_profile(args.profile)  # Выключенные анализаторы не загружают модели и не запускаются
+    full_profile = is_full_profile(profile)
+    run_dir = args.output_dir  # Папка для всех файлов запуска
+    os.makedirs(run_dir, exist_ok=True)
+    output_dir = os.path.join(run_dir, "shots")  # Папка для сохранения шотов (и аудиокэша видео)
+
+    store_path = os.path.join(run_dir, 'shot_results_russia_V1.jsonl')  # Хранилище результатов шотов (одна строка на шот, чекпоинт)
+    json_output_video_path = os.path.join(run_dir, 'video_results_new_russia_V1.json')
+    json_output_audio_path = os.path.join(run_dir, 'audio_results_new_russia_V1.json')
+    json_output_clasters_analiz_path = os.path.join(run_dir, 'clasters_merged_russia_V1.json')
+    final_json_file = os.path.join(run_dir, "final_test_russia_V1.json")  # Файл с описанием кластеров
+    manifest_path = os.path.join(run_dir, 'run_manifest_russia_V1.json')  # Манифест запуска: видео и найденные шоты (чекпоинт)
+    grid_frames_path = os.path.join(run_dir, 'grid_frames_russia_V1.json')  # Кадры сетки всего видео, посчитанные в общем проходе
+
+    # Проверяем и создаем папку для сохранения шотов, если она не существует
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    # Кэш кадров для анализа открывается (или строится) один раз: шоты, сцены и OCR читают кадры из него.
+    # Детектор шотов работает на отдельном кэше своей ширины (см. detect_shots)
+    frame_cache = None
+    if args.frame_cache:
+        frame_cache = get_frame_cache(video_path, args.frame_cache, args.frame_cache_width)
+
+    # --- Шаг 2: Разбиение видео на шоты (или загрузка из чекпоинта) ---
+
+    manifest = None if args.no_resume else load_run_manifest(manifest_path, video_path)
+    shot_video_results = None  # Результаты ключевых кадров, если они посчитаны в общем проходе по видео
+
+    if manifest is not None:
+        shot_timings = manifest["shot_timings"]
+        print(f"Продолжаем прошлый запуск: {len(shot_timings)} шотов загружено из {manifest_path}")
+    else:
+        # Новый запуск: результаты прошлых запусков (возможно, по другому видео) не должны смешиваться с новыми
+        for stale_file in (store_path, json_output_audio_path, json_output_video_path, grid_frames_path):
+            if os.path.exists(stale_file):
+                os.remove(stale_file)
+        if args.single_pass and not (args.display or args.annotated_dir):
+            # Шоты, ключевые кадры, кадры сетки и кадры OCR — из одного декодирования видео
+            # Кадры сетки нужны только этапу результатов всего видео, который выполняется с профилем full
+            shot_timings, shot_video_results, grid_results = detect_and_analyze_shots(
+                video_path, batch_size=args.batch_size, grid_step=FRAME_STEP if full_profile else None,
+                ocr_folder=args.ocr_frames, face_detector=face_detector, analyzers=profile["video"],
+                gates=video.gates_for_profile(profile)
+            )
+            write_json_atomic({str(index): result for index, result in grid_results.items()}, grid_frames_path)
+        else:
+            shot_timings = detect_shots(video_path, frame_cache_dir=args.frame_cache)
+            if args.ocr_frames:
+                from symbol_result import extract_frames  # Импорт здесь: pytesseract нужен только для OCR
+                extract_frames(video_path, args.ocr_frames, frame_cache=frame_cache)
+        save_run_manifest(manifest_path, video_path, shot_timings)
+
+    if args.save_shots:
+        save_shot_files(video_path, shot_timings, output_dir)
+    if args.annotated_dir:
+        os.makedirs(args.annotated_dir, exist_ok=True)
+
+    # --- Шаг 3: Анализ шотов прямо по исходному видео ---
+
+    # Уже посчитанные шоты пропускаются: после падения перезапуск досчитывает только оставшиеся
+    analyze_shots(video_path, shot_timings, output_dir, store_path, json_output_audio_path, json_output_video_path,
+                  workers=args.workers, batch_size=args.batch_size, display=args.display, annotated_dir=args.annotated_dir,
+                  shot_video_results=shot_video_results, face_detector=face_detector, profile=profile,
+                  start_method=args.worker_start, asr_backend=args.asr_backend, frame_cache_dir=args.frame_cache,
+                  frame_cache_width=args.frame_cache_width)
+
+    timings_output_path = os.path.join(run_dir, "shot_timings_russia_V1.json")
+    with open(timings_output_path, 'w', encoding='utf-8') as f:
+        json.dump(shot_timings, f, ensure_ascii=False, indent=4)
+
+    # Кластеризация и сцены опираются на все поля результатов шотов (эмбеддинги CLAP, эмоции, события...)
+    if not full_profile:
+        print(f"Профиль анализа {args.profile}: результаты шотов сохранены в {json_output_audio_path} и "
+              f"{json_output_video_path}. Кластеризация и сцены выполняются только с профилем full.")
+        return
+
+    # --- Шаг 4: Кластеризация шотов в сцены ---
+
+    # Этапы пропускаются, если их результат уже есть и новее входных данных
+    if not is_stage_up_to_date(json_output_clasters_analiz_path, [json_output_audio_path, json_output_video_path]):
+        process_and_analyze(json_output_audio_path, json_output_video_path, json_output_clasters_analiz_path,
+                            show_plots=args.show_plots)
+    if not is_stage_up_to_date(final_json_file, [json_output_clasters_analiz_path, json_output_audio_path, json_output_video_path]):
+        process_clusters(json_output_clasters_analiz_path, json_output_audio_path, json_output_video_path, final_json_file)
+    print("All shots have been analyzed.")
+
+    # --- Шаг 5: Сборка и анализ сцен ---
+
+    shots_folder = output_dir  # Папка с шотами
+    scenes_folder = os.path.join(run_dir, "scenes")  # Папка для сохранения сцен
+
+    # Очистка и создание новых сцен
+    create_scenes_from_shots(shots_folder, final_json_file, scenes_folder, video_path, shot_timings)
+
+    # --- Шаг 6: Результаты сцен и всего видео ---
+
+    json_output_audio_path_scenes = os.path.join(run_dir, 'json_audio_scenes_russia_V1.json')
+    json_output_video_path_scenes = os.path.join(run_dir, 'json_video_scenes_russia_V1.json')
+    json_output_video_path_full = os.path.join(run_dir, 'json_video_full_russia_V1.json')
+
+    if args.reanalyze_scenes:
+        # Полный прогон моделей по файлам сцен и по всему видео (как раньше) — например, для сверки результатов
+        for stale_file in (json_output_audio_path_scenes, json_output_video_path_scenes):
+            if os.path.exists(stale_file):
+                os.remove(stale_file)
+        analyze_existing_scenes(scenes_folder, face_detector, run_dir, args.asr_backend)
+        process_video(video_path, json_output_video_path_full, process_every_100_frames=True,
+                      face_detector=face_detector, frame_cache=frame_cache)
+    else:
+        # Сцены — это склейка уже проанализированных шотов: результаты собираются из кэша шотов,
+        # а модели запускаются только на 100-х кадрах видео, которые не попали в ключевые кадры шотов
+        scene_outputs = [json_output_audio_path_scenes, json_output_video_path_scenes, json_output_video_path_full]
+        scene_inputs = [final_json_file, json_output_audio_path, json_output_video_path]
+        if not all(is_stage_up_to_date(output_file, scene_inputs) for output_file in scene_outputs):
+            grid_results = {int(index): result for index, result in (load_json_safe(grid_frames_path) or {}).items()}
+            derive_scene_results(video_path, shot_timings, final_json_file, json_output_audio_path,
+                                 json_output_video_path, *scene_outputs, batch_size=args.batch_size,
+                                 extra_frame_results=grid_results, face_detector=face_detector,
+                                 gates=video.gates_for_profile(profile), frame_cache=frame_cache)
+
+
+def main(argv=None):
+    """
+    Точка входа командной строки: разбирает аргументы и запускает конвейер (см. run_pipeline).
+    """
 
-analyze_existing_scenes(scenes_folder)
+    run_pipeline(build_parser().parse_args(argv))
 
-json_output_video_path_full = 'json_video_full_russia_V1.json'
 
-process_video(video_path,json_output_video_path_full, process_every_100_frames = True)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+# --- Стандартные библиотеки Python ---
+import gc  # Заморозка объектов основного процесса перед fork (сборщик мусора не копирует общие страницы)
+import os  # Библиотека для работы с файловой системой (пути к аннотированному видео шотов)
+import subprocess  # Ошибка ffmpeg, если у видео нет аудиодорожки
+import sys  # Проверка, загружен ли TensorFlow в основном процессе до fork
+import multiprocessing  # Библиотека для выбора способа запуска дочерних процессов
+from concurrent.futures import ProcessPoolExecutor  # Пул процессов для параллельного анализа шотов
+
+# --- Модули анализа аудио и видео (импорт собственных модулей) ---
+from asr import DEFAULT_ASR_BACKEND, set_asr_thread_budget  # Распознаватель речи и его потоки в воркере
+from audio_buffer import AUDIO_IN_MEMORY_MAX_SECONDS, has_audio_stream, load_video_audio  # Аудиодорожка видео
+from checkpoints import NO_AUDIO_STREAM, is_stage_up_to_date  # Результат шота без аудио и проверка JSON файлов
+from result_store import append_shot_result, completed_shots, export_results  # Хранилище результатов шотов
+import audio  # Анализ аудиодорожки шота (транскрипция, тональность, CLAP и т.д.)
+import video  # Анализ кадров шота (объекты, события, лица, движение, салентность)
+from profiles import PROFILE_PRESETS  # Профиль анализа по умолчанию (все анализаторы)
+from model_registry import loaded_models, unload_models  # Модели основного процесса; сброс вычитателя фона
+from memory_report import print_memory_report, process_memory  # Отчет о памяти воркеров
+from frame_cache import open_frame_cache  # Кадры шотов из кэша на диске вместо декодирования
+
+# Способы запуска воркеров параллельного анализа:
+# - 'spawn' — каждый воркер запускается с нуля и загружает свою копию всех моделей;
+# - 'fork' — модели PyTorch загружаются один раз в основном процессе, и воркеры делят их веса
+#   copy-on-write (см. _preload_for_fork). Только Linux и macOS
+WORKER_START_METHODS = ("spawn", "fork")
+
+
+def analyze_shot(video_path, shot_name, timing, audio_dir, display=False, annotated_dir=None,
+                 batch_size=video.YOLO_BATCH_SIZE, video_results=None, face_detector=video.DEFAULT_FACE_DETECTOR,
+                 profile=None, asr_backend=DEFAULT_ASR_BACKEND, has_audio=True, frame_cache_dir=None,
+                 frame_cache_width=None):
+    """
+    Выполняет анализ аудио и видео одного шота прямо по исходному видео, ничего не записывая в JSON.
+
+    Аргументы:
+    video_path — путь к исходному видеофайлу.
+    shot_name — имя шота, используемое как ключ в результатах (например, 'shot_1').
+    timing — словарь с границами шота: 'start_seconds', 'end_seconds', 'start_frame', 'end_frame'.
+    audio_dir — папка аудиокэша видео (None — дорожка декодируется в память процесса, см. audio_buffer).
+                Аудио шота в файл не пишется: анализаторы получают срез дорожки.
+    display — показывать ли аннотированные кадры в окне (по умолчанию False).
+    annotated_dir — папка для аннотированного видео шота '<shot_name>.mp4' (по умолчанию None — видео не пишется).
+    batch_size — сколько ключевых кадров подается в YOLO за один вызов (по умолчанию video.YOLO_BATCH_SIZE).
+    video_results — уже посчитанные результаты ключевых кадров шота (по умолчанию None — кадры анализируются здесь).
+                    Их передает общий проход по видео (см. separating.detect_and_analyze_shots).
+    face_detector — детектор лиц (по умолчанию video.DEFAULT_FACE_DETECTOR, см. face_detectors).
+    profile — профиль анализа (см. profiles.load_profile; по умолчанию None — все анализаторы, без каскада).
+              Каскад анализаторов кадров включается ключом профиля 'cascade' (см. video.gates_for_profile).
+    asr_backend — распознаватель речи (по умолчанию asr.DEFAULT_ASR_BACKEND, см. asr.ASR_BACKENDS).
+    has_audio — есть ли у видео аудиодорожка (по умолчанию True). Если нет, аудио шота не анализируется,
+                а результатом аудио будет checkpoints.NO_AUDIO_STREAM (см. analyze_shots: дорожка
+                проверяется один раз на видео).
+    frame_cache_dir — папка готового кэша кадров видео (по умолчанию None — кадры шота декодируются).
+    frame_cache_width — ширина кадров кэша (см. frame_cache.frame_cache_paths). Кэш открывается здесь,
+                        а не передается открытым: воркер читает его с диска через memmap, а не получает копию.
+
+    Возвращает:
+    Кортеж (shot_name, audio_results, video_results), где:
+    - audio_results — словарь результатов `audio.analyze_audio`, None, если аудио не извлечено,
+      или NO_AUDIO_STREAM, если у видео нет аудиодорожки.
+    - video_results — список результатов по ключевым кадрам из `video.analyze_video`.
+    """
+
+    profile = profile or PROFILE_PRESETS["full"]
+
+    audio_results = NO_AUDIO_STREAM
+    if has_audio:
+        audio_results = audio.analyze_audio(
+            video_path, timing["start_seconds"], timing["end_seconds"],
+            analyzers=profile["audio"], audio_cache_dir=audio_dir, asr_backend=asr_backend
+        )
+    if video_results is None and not profile["video"]:
+        video_results = []  # Все анализаторы кадров выключены: кадры шота даже не читаются
+    if video_results is None:
+        # Вычитатель фона накапливает модель фона по кадрам: каждый шот начинается с пустой модели,
+        # иначе результат движения зависел бы от того, какие шоты воркер анализировал до этого
+        unload_models("background_subtractor")
+        frame_cache = None
+        if frame_cache_dir is not None:
+            frame_cache = open_frame_cache(video_path, frame_cache_dir, frame_cache_width)
+        video_results = video.analyze_video(
+            video_path, start_frame=timing["start_frame"], end_frame=timing["end_frame"], display=display,
+            annotated_output_path=None if annotated_dir is None else os.path.join(annotated_dir, f"{shot_name}.mp4"),
+            batch_size=batch_size, face_detector=face_detector, analyzers=profile["video"],
+            frame_cache=frame_cache, gates=video.gates_for_profile(profile)
+        )
+
+    return shot_name, audio_results, video_results
+
+
+def save_shot_results(shot_name, audio_results, video_results, store_path, video_name):
+    """
+    Дописывает результаты анализа одного шота в хранилище результатов.
+
+    Аргументы:
+    shot_name — имя шота.
+    audio_results — словарь результатов аудиоанализа или None.
+    video_results — список результатов видеоанализа по ключевым кадрам.
+    store_path — путь к файлу хранилища результатов шотов (.jsonl).
+    video_name — имя видео (ключ хранилища вместе с именем шота).
+    """
+
+    append_shot_result(store_path, video_name, shot_name, audio_results, video_results)
+
+
+def _init_worker(threads_per_worker, model_precision, profile, asr_backend=DEFAULT_ASR_BACKEND):
+    """
+    Инициализация процесса-воркера: ограничивает число потоков библиотек и один раз загружает модели.
+
+    Аргументы:
+    threads_per_worker — сколько потоков могут использовать TF/torch/OpenCV внутри одного воркера.
+                         Без ограничения каждый воркер занимает все ядра, и процессы мешают друг другу.
+    model_precision — точность моделей основного процесса (см. video.set_model_precision): воркер запускается
+                      через spawn и заново импортирует video, поэтому выбор точности передается явно.
+    profile — профиль анализа: загружаются модели только включенных анализаторов.
+    asr_backend — распознаватель речи, модель которого загружается при включенной транскрипции.
+    """
+
+    # Переменные окружения задаются только в воркере, а не в основном процессе: TensorFlow и OpenMP читают их
+    # при инициализации, а TensorFlow импортируется только при загрузке моделей ниже. TensorFlow получает
+    # свою долю потоков воркера (см. video.set_analyzer_thread_budget), а два потока межоперационного пула —
+    # чтобы InceptionV3 и FER, работающие одновременно, не ждали друг друга
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(max(1, threads_per_worker // 3))
+    os.environ["TF_NUM_INTEROP_THREADS"] = "2"
+    os.environ["OMP_NUM_THREADS"] = str(threads_per_worker)
+
+    # Потоки воркера делятся между одновременно работающими анализаторами кадров
+    video.set_analyzer_thread_budget(threads_per_worker)
+    set_asr_thread_budget(threads_per_worker)  # Окна распознавания речи тоже делят только ядра воркера
+    video.set_model_precision(model_precision)
+
+    # Модели загружаются один раз на воркер, а не на каждый шот. Отдельной модели сегментации
+    # для аннотированного видео нет: карта классов считается тем же прямым проходом InceptionV3, что и события
+    audio.load_audio_models(profile["audio"], asr_backend)
+    video.load_video_models(profile["video"])
+
+
+def _analyze_shot_in_worker(*args):
+    """
+    Анализирует шот в воркере (см. analyze_shot) и возвращает (результаты шота, память воркера после шота).
+    """
+
+    return analyze_shot(*args), process_memory()
+
+
+def _preload_for_fork(profile, asr_backend=DEFAULT_ASR_BACKEND):
+    """
+    Загружает в основном процессе модели профиля, которые переживают fork, перед запуском воркеров через fork.
+
+    Аргументы:
+    profile — профиль анализа (см. profiles.load_profile).
+    asr_backend — распознаватель речи (см. asr.ASR_BACKENDS).
+
+    Возвращает:
+    Способ запуска воркеров: 'fork' или 'spawn', если fork здесь небезопасен или недоступен.
+
+    Описание:
+    Модели PyTorch (суммаризатор, тональность, CLAP, YOLO) и модель Vosk — основная часть весов — загружаются один раз,
+    и воркеры, запущенные через fork, читают их из общих страниц памяти родителя (copy-on-write).
+    Модели TensorFlow (InceptionV3, FER) каждый воркер загружает сам после fork: TensorFlow запускает пулы
+    потоков при первой операции, и в дочернем процессе этих потоков уже нет. По той же причине fork
+    безопасен, только если основной процесс еще не запускал модели (например, общий проход --single-pass
+    анализирует кадры в основном процессе) — иначе воркеры запускаются через spawn.
+    """
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        print("Запуск воркеров через fork недоступен на этой ОС, используется spawn")
+        return "spawn"
+    if loaded_models() or "tensorflow" in sys.modules:
+        print("Модели уже работали в основном процессе, и fork небезопасен: воркеры запускаются через spawn")
+        return "spawn"
+
+    # Пайплайны transformers не импортируют TensorFlow: в основном процессе он не должен появиться до fork
+    os.environ.setdefault("USE_TF", "0")
+    audio.load_audio_models(profile["audio"], asr_backend)
+    video.load_video_models(profile["video"], fork_safe_only=True)
+
+    # Сборщик мусора не трогает замороженные объекты, и страницы с ними остаются общими для воркеров
+    gc.freeze()
+    print(f"Модели загружены в основном процессе и общие для воркеров: {', '.join(name for name, _ in loaded_models()) or 'нет'}")
+    return "fork"
+
+
+def analyze_shots(video_path, shot_timings, audio_dir, store_path, json_output_audio_path, json_output_video_path,
+                  workers=1, resume=True, batch_size=video.YOLO_BATCH_SIZE, display=False, annotated_dir=None,
+                  shot_video_results=None, face_detector=video.DEFAULT_FACE_DETECTOR, profile=None,
+                  start_method="spawn", asr_backend=DEFAULT_ASR_BACKEND, frame_cache_dir=None, frame_cache_width=None):
+    """
+    Анализирует все шоты видео последовательно или параллельно в нескольких процессах.
+
+    Аргументы:
+    video_path — путь к исходному видеофайлу.
+    shot_timings — словарь {имя шота: тайминги}, порядок ключей соответствует порядку шотов в видео.
+    audio_dir — папка аудиокэша: дорожка видео декодируется в нее один раз, если ее читают несколько
+                воркеров или она слишком длинная для памяти (см. audio_buffer.AUDIO_IN_MEMORY_MAX_SECONDS).
+    store_path — путь к файлу хранилища результатов шотов (.jsonl).
+    json_output_audio_path — путь к JSON файлу с результатами аудио (выгружается из хранилища в конце).
+    json_output_video_path — путь к JSON файлу с результатами видео (выгружается из хранилища в конце).
+    workers — количество процессов-воркеров (по умолчанию 1 — последовательный анализ в текущем процессе).
+    resume — пропускать шоты, для которых в хранилище уже есть валидные результаты (по умолчанию True).
+    batch_size — сколько ключевых кадров подается в YOLO за один вызов (по умолчанию video.YOLO_BATCH_SIZE).
+    display — показывать ли аннотированные кадры в окне (по умолчанию False; только в последовательном режиме).
+    annotated_dir — папка для аннотированного видео шотов (по умолчанию None — видео не пишется).
+    shot_video_results — {имя шота: результаты ключевых кадров}, уже посчитанные общим проходом по видео
+                         (по умолчанию None). Для этих шотов остается только аудиоанализ.
+    face_detector — детектор лиц (по умолчанию video.DEFAULT_FACE_DETECTOR, см. face_detectors).
+    profile — профиль анализа (см. profiles.load_profile; по умолчанию None — все анализаторы).
+              Шоты, посчитанные раньше с более узким профилем, пересчитываются.
+    start_method — способ запуска воркеров из WORKER_START_METHODS (по умолчанию 'spawn').
+    asr_backend — распознаватель речи (по умолчанию asr.DEFAULT_ASR_BACKEND, см. asr.ASR_BACKENDS).
+    frame_cache_dir — папка кэша кадров видео, уже построенного (см. frame_cache.get_frame_cache), или None —
+                      кадры шотов декодируются. С кэшем повторный анализ почти не тратит время на декодирование,
+                      но анализаторы получают кадры ширины кэша, а не исходного видео.
+    frame_cache_width — ширина кадров кэша (см. frame_cache.frame_cache_paths).
+
+    Описание:
+    - Аудиодорожка декодируется один раз на видео, и каждый шот анализирует ее срез.
+    - Каждый воркер загружает модели один раз при старте и анализирует шоты, которые ему выдает пул.
+    - В конце параллельного анализа печатается память каждого воркера (см. memory_report).
+    - Воркеры не пишут результаты: их сохраняет только основной процесс, строго в порядке шотов.
+    - Каждый шот сразу после анализа дописывается в хранилище, так что оно служит чекпоинтом:
+      после падения перезапуск досчитывает только недостающие шоты.
+    - JSON файлы прежнего формата выгружаются из хранилища один раз, после анализа всех шотов.
+    """
+
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    profile = profile or PROFILE_PRESETS["full"]
+
+    # --- Пропуск шотов, уже посчитанных в прошлых запусках ---
+
+    if resume:
+        done = completed_shots(store_path, video_name, profile)
+        pending_timings = {name: timing for name, timing in shot_timings.items() if name not in done}
+        print(f"Шотов уже посчитано: {len(shot_timings) - len(pending_timings)}, осталось: {len(pending_timings)}")
+    else:
+        pending_timings = shot_timings
+
+    shot_video_results = shot_video_results or {}
+
+    # Дорожку в памяти процесса читает только он сам: воркерам и длинным видео нужен файл на диске (memmap)
+    video_seconds = max((timing["end_seconds"] for timing in shot_timings.values()), default=0)
+    if workers <= 1 and video_seconds <= AUDIO_IN_MEMORY_MAX_SECONDS:
+        audio_dir = None
+
+    # Дорожка декодируется один раз до анализа шотов (при параллельном анализе — до запуска пула, иначе каждый
+    # воркер начал бы декодировать ее сам). Если аудиодорожки нет, аудио не анализируется ни в одном шоте,
+    # и шоты записываются с окончательным результатом NO_AUDIO_STREAM
+    has_audio = True
+    if profile["audio"] and pending_timings:
+        if has_audio_stream(video_path) is False:
+            print("У видео нет аудиодорожки: шоты анализируются без аудио.")
+            has_audio = False
+        else:
+            try:
+                load_video_audio(video_path, audio_dir)
+            except (OSError, subprocess.CalledProcessError) as e:
+                # Аудио не извлечено по другой причине: шоты получат None и будут досчитаны при перезапуске
+                print(f"Ошибка декодирования аудио: {e}")
+
+    # --- Последовательный режим: анализ в текущем процессе ---
+
+    if workers <= 1:
+        for shot_name, timing in pending_timings.items():
+            results = analyze_shot(video_path, shot_name, timing, audio_dir, display, annotated_dir, batch_size,
+                                   shot_video_results.get(shot_name), face_detector, profile, asr_backend, has_audio,
+                                   frame_cache_dir, frame_cache_width)
+            save_shot_results(*results, store_path, video_name)
+            print(f"{shot_name} analyzed")
+    else:
+        _analyze_shots_parallel(video_path, pending_timings, audio_dir, store_path, video_name, workers, batch_size,
+                                annotated_dir, shot_video_results, face_detector, profile, start_method, asr_backend,
+                                has_audio, frame_cache_dir, frame_cache_width)
+
+    # Выгружаем JSON файлы, только если в хранилище появились новые записи:
+    # иначе этапы кластеризации посчитали бы свои результаты устаревшими
+    if not (is_stage_up_to_date(json_output_audio_path, [store_path]) and
+            is_stage_up_to_date(json_output_video_path, [store_path])):
+        export_results(store_path, video_name, list(shot_timings), json_output_audio_path, json_output_video_path)
+
+
+def _analyze_shots_parallel(video_path, shot_timings, audio_dir, store_path, video_name, workers, batch_size,
+                            annotated_dir, shot_video_results, face_detector, profile, start_method="spawn",
+                            asr_backend=DEFAULT_ASR_BACKEND, has_audio=True, frame_cache_dir=None,
+                            frame_cache_width=None):
+    """
+    Параллельный анализ шотов в пуле процессов (см. analyze_shots).
+    Если какие-то шоты упали, остальные все равно сохраняются, а в конце выбрасывается исключение
+    со списком упавших шотов — при перезапуске будут досчитаны только они.
+    """
+
+    # --- Параллельный режим ---
+
+    if start_method not in WORKER_START_METHODS:
+        raise ValueError(f"Неизвестный способ запуска воркеров: {start_method}. Доступны: {', '.join(WORKER_START_METHODS)}")
+
+    # TensorFlow не переживает fork после инициализации, поэтому по умолчанию процессы запускаются через spawn.
+    # В режиме fork до запуска пула загружаются только модели, которые fork переживают
+    if start_method == "fork":
+        start_method = _preload_for_fork(profile, asr_backend)
+    context = multiprocessing.get_context(start_method)
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(threads_per_worker, dict(video.MODEL_PRECISION), profile,
+                                                                         asr_backend)) as executor:
+        # Отправляем все шоты в пул; окна в воркерах не показываются, аннотированное видео пишется по запросу
+        futures = {
+            shot_name: executor.submit(_analyze_shot_in_worker, video_path, shot_name, timing, audio_dir, False,
+                                       annotated_dir, batch_size, shot_video_results.get(shot_name), face_detector,
+                                       profile, asr_backend, has_audio, frame_cache_dir, frame_cache_width)
+            for shot_name, timing in shot_timings.items()
+        }
+
+        # Забираем результаты в порядке шотов и сохраняем их из основного процесса
+        failed_shots = []
+        worker_memory = {}  # Память каждого воркера: запись с наибольшей собственной памятью (USS)
+        for shot_name, future in futures.items():
+            try:
+                results, memory = future.result()
+            except Exception as e:
+                print(f"Ошибка при анализе {shot_name}: {e}")
+                failed_shots.append(shot_name)
+                continue
+            save_shot_results(*results, store_path, video_name)
+            print(f"{shot_name} analyzed")
+            if memory["uss"] >= worker_memory.get(memory["pid"], memory)["uss"]:
+                worker_memory[memory["pid"]] = memory
+
+    if start_method == "fork":
+        gc.unfreeze()
+    print_memory_report(process_memory(), list(worker_memory.values()))
+
+    if failed_shots:
+        raise RuntimeError(f"Не удалось проанализировать шоты: {', '.join(failed_shots)}. "
+                           f"Перезапустите конвейер — посчитанные шоты будут пропущены.")
@@ -10,11 +10,15 @@ from PIL import Image, ImageEnhance, ImageFilter  # Импортируем мо
 import glob  # Библиотека для поиска файлов по шаблону (например, найти все изображения .png в папке)
 import json  # Библиотека для работы с JSON файлами (чтение, запись, парсинг)
 
+# --- Модули проекта ---
+from frame_bus import ocr_sampler_consumer, run_frame_bus  # Однократное декодирование видео с раздачей кадров
+from frame_cache import run_cached_frame_bus  # Кадры из кэша на диске вместо декодирования
+
 
 # Путь к Tesseract на вашей системе
 # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
-def extract_frames(video_path, output_folder):
+def extract_frames(video_path, output_folder, frame_cache=None):
     """
     Извлекает кадры из видеофайла каждую секунду и сохраняет их в указанную папку.
 
@@ -23,57 +27,39 @@ def extract_frames(video_path, output_folder):
                  Пример: 'input_video.mp4'.
     output_folder — путь к папке, куда будут сохранены извлеченные кадры.
                     Пример: 'frames/'.
+    frame_cache — открытый кэш уменьшенных кадров (см. frame_cache.get_frame_cache) или None — видео декодируется.
+                  Для OCR кэш должен быть достаточно широким, иначе мелкий текст не распознается.
 
     Описание:
     - Функция извлекает один кадр из видео за каждую секунду, основываясь на FPS (кадрах в секунду).
-    - Кадры сохраняются в указанную папку `output_folder` с именами в формате 'frame_{номер_кадра}.jpg'.
+    - Кадры сохраняются в указанную папку `output_folder` с именами в формате 'frame_{номер_кадра}.jpg'
+      (папка создается, если ее нет).
     - Если видеофайл не удается открыть, выводится сообщение об ошибке.
     """
     
-    # --- Шаг 1: Создание выходной папки для сохранения кадров ---
-    
-    os.makedirs(output_folder, exist_ok=True)  # Создаем папку, если она не существует
+    if frame_cache is not None:
+        # Кадры берутся из кэша без декодирования видео
+        results = run_cached_frame_bus(frame_cache, [ocr_sampler_consumer(output_folder)])
+        print(f"Извлечено {results['ocr']} кадров.")
+        return
+
+    # --- Шаг 1: Проверка, что видеофайл открывается ---
 
-    # --- Шаг 2: Открытие видеофайла с помощью OpenCV ---
-    
     video = cv2.VideoCapture(video_path)  # Открытие видеофайла
+    opened = video.isOpened()
+    video.release()
 
     # Проверка, удалось ли открыть видео
-    if not video.isOpened():
+    if not opened:
         print(f"Не удалось открыть видеофайл {video_path}")  # Вывод сообщения об ошибке
         return  # Завершаем функцию, если видео не открыто
 
-    # --- Шаг 3: Извлечение кадровой частоты (FPS) ---
-    
-    fps = video.get(cv2.CAP_PROP_FPS)  # Получаем частоту кадров (FPS) видеофайла
-    frame_interval = int(fps)  # Определяем интервал кадров: 1 кадр в секунду (соответствует количеству кадров в 1 секунде)
-
-    # --- Шаг 4: Инициализация переменных для прохода по кадрам ---
-    
-    success, frame = video.read()  # Чтение первого кадра
-    count = 0  # Счетчик текущего кадра
-    saved_frame_count = 0  # Счетчик сохраненных кадров
+    # --- Шаг 2: Проход по видео через общую шину кадров ---
 
-    # --- Шаг 5: Проход по всем кадрам в видео ---
-    
-    while success:  # Пока удается прочитать следующий кадр
-        # --- Шаг 6: Сохранение кадра каждую секунду ---
-        
-        # Если текущий кадр соответствует интервалу (каждая секунда), то сохраняем его
-        if count % frame_interval == 0:
-            frame_path = f"{output_folder}/frame_{saved_frame_count}.jpg"  # Формируем путь для сохранения кадра
-            cv2.imwrite(frame_path, frame)  # Сохраняем кадр как изображение в формате .jpg
-            saved_frame_count += 1  # Увеличиваем счетчик сохраненных кадров
-
-        # --- Шаг 7: Переход к следующему кадру ---
-        
-        success, frame = video.read()  # Чтение следующего кадра
-        count += 1  # Увеличиваем счетчик кадров
-
-    # --- Шаг 8: Завершение работы с видео ---
-    
-    video.release()  # Освобождаем объект видеофайла
-    print(f"Извлечено {saved_frame_count} кадров.")  # Сообщение о количестве извлеченных кадров
+    # Кадры между сохраняемыми только проходят через декодер (grab) и не конвертируются в изображения.
+    # Тот же потребитель можно подключить к общему проходу конвейера (см. separating.detect_and_analyze_shots)
+    results = run_frame_bus(video_path, [ocr_sampler_consumer(output_folder)])
+    print(f"Извлечено {results['ocr']} кадров.")  # Сообщение о количестве извлеченных кадров
 
 def preprocess_image(image):
     """
@@ -0,0 +1,5 @@
+# --- Стандартные библиотеки Python ---
+import os  # Путь к папке ml с модулями конвейера
+import sys  # Модули конвейера импортируются по имени, как при запуске скриптов из папки ml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
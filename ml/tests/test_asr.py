@@ -0,0 +1,72 @@
+# --- Библиотеки для тестов ---
+import pytest  # Проверка исключений и пропуск тестов без numpy
+
+pytest.importorskip("numpy")  # Модуль asr работает с отсчетами аудио в массивах NumPy
+
+# --- Модули проекта ---
+from asr import _merge_window_segments, asr_windows  # Окна распознавания и склейка их сегментов
+
+
+def word(text, start, end):
+    """
+    Возвращает слово в формате распознавателя Vosk (время от начала окна).
+    """
+
+    return {"word": text, "start": start, "end": end}
+
+
+def test_short_audio_is_one_window():
+    assert asr_windows(10.0, 30.0, 2.0) == [(0.0, 10.0, 0.0, 10.0)]
+
+
+def test_windows_overlap_and_own_parts_tile_audio():
+    windows = asr_windows(70.0, 30.0, 2.0)
+    assert windows == [(0.0, 30.0, 0.0, 29.0), (28.0, 58.0, 29.0, 57.0), (56.0, 70.0, 57.0, 70.0)]
+
+    # Свои части окон идут встык и покрывают все аудио: каждое слово засчитывается ровно одному окну
+    assert windows[0][2] == 0.0 and windows[-1][3] == 70.0
+    assert all(previous[3] == current[2] for previous, current in zip(windows, windows[1:]))
+
+
+def test_overlap_must_be_shorter_than_window():
+    with pytest.raises(ValueError):
+        asr_windows(70.0, 2.0, 2.0)
+
+
+def test_words_in_overlap_are_not_repeated():
+    windows = asr_windows(70.0, 30.0, 2.0)
+    window_segments = [
+        [{"words": [word("раз", 27.0, 27.4), word("два", 28.5, 28.9), word("три", 29.2, 29.6)]}],
+        # То же место во втором окне: время от начала окна (28 с)
+        [{"words": [word("два", 0.5, 0.9), word("три", 1.2, 1.6), word("четыре", 3.0, 3.5)]}],
+        []
+    ]
+
+    merged = _merge_window_segments(windows, window_segments)
+
+    assert [segment["text"] for segment in merged] == ["раз два", "три четыре"]
+    assert (merged[0]["start"], merged[0]["end"]) == (27.0, 28.9)
+    assert (merged[1]["start"], merged[1]["end"]) == (29.2, 31.5)
+    assert all(segment["timestamp"] == segment["start"] for segment in merged)
+
+
+def test_segment_without_words_goes_to_window_of_its_middle():
+    windows = asr_windows(70.0, 30.0, 2.0)
+    # Распознаватель без времени слов (Google) отдает один сегмент на все окно
+    window_segments = [
+        [{"text": "первое окно", "start": 0.0, "end": 30.0}],
+        [{"text": "второе окно", "start": 0.0, "end": 30.0}],
+        [{"text": "перекрытие", "start": 0.0, "end": 1.5}]
+    ]
+
+    merged = _merge_window_segments(windows, window_segments)
+
+    assert [segment["text"] for segment in merged] == ["первое окно", "второе окно"]
+    assert (merged[1]["start"], merged[1]["end"]) == (28.0, 58.0)
+
+
+def test_segment_with_only_overlap_words_is_dropped():
+    windows = asr_windows(70.0, 30.0, 2.0)
+    window_segments = [[], [{"words": [word("два", 0.5, 0.9)]}], []]
+
+    assert _merge_window_segments(windows, window_segments) == []
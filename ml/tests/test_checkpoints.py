@@ -0,0 +1,97 @@
+# --- Модули проекта ---
+from checkpoints import (AUDIO_RESULT_KEYS, NO_AUDIO_STREAM, is_stage_up_to_date, is_valid_audio_result,
+                         is_valid_video_result, write_json_atomic)
+
+
+def make_audio_result(**overrides):
+    """
+    Возвращает полный результат аудиоанализа шота; overrides заменяют отдельные разделы.
+    """
+
+    entry = {key: [{"value": key}] for key in AUDIO_RESULT_KEYS}
+    entry.update(overrides)
+    return entry
+
+
+def make_frame(**overrides):
+    """
+    Возвращает полный результат анализа кадра; overrides заменяют отдельные поля (poi — целиком).
+    """
+
+    frame = {"frame": 1, "detections": [], "events": [], "poi": {"faces": [], "moving_objects": [], "salient_regions": []}}
+    frame.update(overrides)
+    return frame
+
+
+def test_audio_result_complete():
+    assert is_valid_audio_result(make_audio_result())
+
+
+def test_audio_result_missing_key():
+    entry = make_audio_result()
+    del entry["summary"]
+    assert not is_valid_audio_result(entry)
+
+
+def test_audio_result_empty_transcription():
+    assert not is_valid_audio_result(make_audio_result(transcriptions=[]))
+
+
+def test_audio_result_disabled_analyzer_is_null():
+    entry = make_audio_result(clap_analysis=None)
+    assert not is_valid_audio_result(entry)
+    assert is_valid_audio_result(entry, required_keys=("transcriptions",))
+
+
+def test_audio_result_none_is_recomputed():
+    assert not is_valid_audio_result(None)
+
+
+def test_no_audio_stream_is_final():
+    assert is_valid_audio_result(NO_AUDIO_STREAM)
+    assert is_valid_audio_result(dict(NO_AUDIO_STREAM))
+
+
+def test_video_result_complete():
+    assert is_valid_video_result([make_frame(), make_frame(frame=2)])
+
+
+def test_video_result_empty_list():
+    # У любого шота есть ключевой кадр: пустой список допустим, только если не нужно ни одного поля
+    assert not is_valid_video_result([])
+    assert is_valid_video_result([], required_fields=())
+
+
+def test_video_result_not_a_list():
+    assert not is_valid_video_result(None)
+    assert not is_valid_video_result({"frame": 1})
+
+
+def test_video_result_missing_poi_field():
+    frame = make_frame(poi={"faces": None, "moving_objects": [], "salient_regions": []})
+    assert not is_valid_video_result([frame])
+    assert is_valid_video_result([frame], required_fields=("detections", "events"))
+
+
+def test_video_result_missing_frame_key():
+    frame = make_frame()
+    del frame["events"]
+    assert not is_valid_video_result([frame])
+
+
+def test_stage_up_to_date(tmp_path):
+    input_file = tmp_path / "input.json"
+    output_file = tmp_path / "output.json"
+    write_json_atomic({}, str(input_file))
+
+    assert not is_stage_up_to_date(str(output_file), [str(input_file)])
+
+    write_json_atomic({"done": True}, str(output_file))
+    assert is_stage_up_to_date(str(output_file), [str(input_file)])
+    assert not is_stage_up_to_date(str(output_file), [str(tmp_path / "missing.json")])
+
+
+def test_stage_with_corrupt_output(tmp_path):
+    output_file = tmp_path / "output.json"
+    output_file.write_text("{\"done\": ", encoding="utf-8")
+    assert not is_stage_up_to_date(str(output_file), [])
@@ -0,0 +1,65 @@
+# --- Модули проекта ---
+from ffmpeg_utils import (REENCODE_AUDIO, REENCODE_VIDEO, _matched_encode_args, split_range_segments,
+                          stream_copy_compatible)  # Разбиение диапазонов сцены и проверка потоков
+
+
+def make_streams(video=None, audio=None):
+    """
+    Возвращает параметры потоков в формате probe_streams: по умолчанию совпадающие с параметрами перекодирования.
+    """
+
+    return {
+        "video": {**REENCODE_VIDEO, "level": 40, "time_base": "1/12800", **(video or {})},
+        "audio": {**REENCODE_AUDIO, "sample_rate": "48000", "channels": 2, **(audio or {})}
+    }
+
+
+def test_range_with_keyframes_inside():
+    # Края до первого и после последнего ключевого кадра перекодируются, середина копируется
+    assert split_range_segments([(1.0, 9.0)], [0.0, 2.0, 4.0, 6.0, 10.0]) == [
+        (1.0, 2.0, False), (2.0, 6.0, True), (6.0, 9.0, False)
+    ]
+
+
+def test_range_on_keyframe_boundaries():
+    # Границы на ключевых кадрах: перекодировать нечего
+    assert split_range_segments([(2.0, 6.0)], [0.0, 2.0, 4.0, 6.0]) == [(2.0, 6.0, True)]
+
+
+def test_tiny_edges_are_dropped():
+    assert split_range_segments([(1.995, 6.005)], [2.0, 6.0]) == [(2.0, 6.0, True)]
+
+
+def test_range_with_fewer_than_two_keyframes_is_reencoded():
+    assert split_range_segments([(1.0, 3.0)], [0.0, 2.0, 4.0]) == [(1.0, 3.0, False)]
+    assert split_range_segments([(1.0, 3.0)], []) == [(1.0, 3.0, False)]
+
+
+def test_ranges_keep_concat_order():
+    segments = split_range_segments([(5.0, 9.0), (1.0, 3.0)], [0.0, 2.0, 4.0, 6.0, 8.0])
+    assert segments == [(5.0, 6.0, False), (6.0, 8.0, True), (8.0, 9.0, False), (1.0, 3.0, False)]
+
+
+def test_stream_copy_compatible():
+    assert stream_copy_compatible(make_streams()) == (True, None)
+    assert stream_copy_compatible({**make_streams(), "audio": None}) == (True, None)
+
+
+def test_stream_copy_needs_probe():
+    assert not stream_copy_compatible(None)[0]
+    assert not stream_copy_compatible({"video": None, "audio": None})[0]
+
+
+def test_stream_copy_rejects_other_codecs():
+    assert not stream_copy_compatible(make_streams(video={"codec_name": "hevc"}))[0]
+    assert not stream_copy_compatible(make_streams(video={"pix_fmt": "yuv422p"}))[0]
+    assert not stream_copy_compatible(make_streams(audio={"codec_name": "opus"}))[0]
+
+
+def test_matched_encode_args():
+    assert _matched_encode_args(make_streams()) == [
+        "-level:v", "4.0", "-video_track_timescale", "12800", "-ar", "48000", "-ac", "2"
+    ]
+    assert _matched_encode_args({**make_streams(), "audio": None}) == [
+        "-level:v", "4.0", "-video_track_timescale", "12800"
+    ]
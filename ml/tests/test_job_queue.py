@@ -0,0 +1,134 @@
+# --- Стандартные библиотеки Python ---
+import os  # Проверка файлов заданий в папках состояний
+
+# --- Библиотеки для тестов ---
+import pytest  # Фикстуры и проверка исключений
+
+# --- Модули проекта ---
+import job_queue  # Очередь заданий воркера
+from checkpoints import load_json_safe  # Чтение файлов заданий
+
+
+def job_files(queue_dir, state):
+    """
+    Возвращает имена файлов заданий в состоянии state.
+    """
+
+    return sorted(os.listdir(job_queue.job_state_dir(str(queue_dir), state)))
+
+
+def test_submit_and_claim(tmp_path):
+    job = job_queue.submit_job("video.mp4", queue_dir=str(tmp_path))
+    assert job_files(tmp_path, "pending") == [f"{job['id']}.json"]
+    assert job["output_dir"] == os.path.abspath(os.path.join(str(tmp_path), "results", job["id"]))
+
+    claimed = job_queue.claim_job(str(tmp_path))
+    assert claimed["id"] == job["id"]
+    assert claimed["worker_pid"] == os.getpid()
+    assert job_files(tmp_path, "pending") == []
+    assert job_files(tmp_path, "running") == [f"{job['id']}.json"]
+
+    # Задание забирается ровно один раз
+    assert job_queue.claim_job(str(tmp_path)) is None
+
+
+def test_submit_unknown_profile(tmp_path):
+    with pytest.raises(ValueError):
+        job_queue.submit_job("video.mp4", profile="no_such_profile", queue_dir=str(tmp_path))
+    assert job_files(tmp_path, "pending") == []
+
+
+def test_claim_in_submission_order(tmp_path, monkeypatch):
+    # Задания одной секунды забираются в порядке постановки, а не в порядке случайной части идентификатора
+    submitted = iter([1_700_000_000_000_000_001, 1_700_000_000_000_000_002, 1_700_000_000_000_000_003])
+    monkeypatch.setattr(job_queue.time, "time_ns", lambda: next(submitted))
+    jobs = [job_queue.submit_job(f"video_{index}.mp4", queue_dir=str(tmp_path)) for index in range(3)]
+
+    assert [job_queue.claim_job(str(tmp_path))["id"] for _ in jobs] == [job["id"] for job in jobs]
+
+
+def test_finish_done_and_failed(tmp_path):
+    job_queue.submit_job("ok.mp4", queue_dir=str(tmp_path))
+    done = job_queue.finish_job(job_queue.claim_job(str(tmp_path)), str(tmp_path))
+    assert os.path.dirname(done) == job_queue.job_state_dir(str(tmp_path), "done")
+    assert load_json_safe(done)["error"] is None
+
+    job_queue.submit_job("broken.mp4", queue_dir=str(tmp_path))
+    failed = job_queue.finish_job(job_queue.claim_job(str(tmp_path)), str(tmp_path), error="boom")
+    assert os.path.dirname(failed) == job_queue.job_state_dir(str(tmp_path), "failed")
+    assert load_json_safe(failed)["error"] == "boom"
+    assert job_files(tmp_path, "running") == []
+
+
+def test_corrupt_job_is_failed(tmp_path):
+    pending_dir = job_queue.job_state_dir(str(tmp_path), "pending")
+    with open(os.path.join(pending_dir, "broken.json"), "w", encoding="utf-8") as f:
+        f.write("{\"id\": ")
+
+    assert job_queue.claim_job(str(tmp_path)) is None
+    assert job_files(tmp_path, "failed") == ["broken.json"]
+
+
+def test_requeue_job(tmp_path):
+    job_queue.submit_job("video.mp4", queue_dir=str(tmp_path))
+    job = job_queue.claim_job(str(tmp_path))
+
+    job_queue.requeue_job(job, str(tmp_path))
+    assert job_files(tmp_path, "running") == []
+    assert job_queue.claim_job(str(tmp_path))["id"] == job["id"]
+
+
+def test_requeue_orphaned_jobs(tmp_path, monkeypatch):
+    alive = job_queue.submit_job("alive.mp4", queue_dir=str(tmp_path))
+    job_queue.claim_job(str(tmp_path))
+    orphan = job_queue.submit_job("orphan.mp4", queue_dir=str(tmp_path))
+    job_queue.claim_job(str(tmp_path))
+
+    # Воркер первого задания работает, воркер второго — нет
+    live_pids = {os.getpid()}
+    orphan_path = os.path.join(job_queue.job_state_dir(str(tmp_path), "running"), f"{orphan['id']}.json")
+    job_queue.write_json_atomic(dict(load_json_safe(orphan_path), worker_pid=-1), orphan_path)
+    monkeypatch.setattr(job_queue, "_is_process_alive", lambda pid: pid in live_pids)
+
+    assert job_queue.requeue_orphaned_jobs(str(tmp_path)) == [orphan["id"]]
+    assert job_files(tmp_path, "running") == [f"{alive['id']}.json"]
+    assert job_files(tmp_path, "pending") == [f"{orphan['id']}.json"]
+
+
+def test_job_being_claimed_is_not_requeued(tmp_path, monkeypatch):
+    job = job_queue.submit_job("video.mp4", queue_dir=str(tmp_path))
+    pending_dir = job_queue.job_state_dir(str(tmp_path), "pending")
+    running_dir = job_queue.job_state_dir(str(tmp_path), "running")
+
+    # Первый воркер переименовал задание, но еще не записал в него свой PID; в этот момент стартует второй
+    claim_name = f"{job['id']}.json.{os.getpid()}{job_queue.CLAIM_SUFFIX}"
+    os.rename(os.path.join(pending_dir, f"{job['id']}.json"), os.path.join(running_dir, claim_name))
+    monkeypatch.setattr(job_queue, "_is_process_alive", lambda pid: pid == os.getpid())
+
+    assert job_queue.requeue_orphaned_jobs(str(tmp_path)) == []
+    assert job_files(tmp_path, "pending") == []
+    assert job_files(tmp_path, "running") == [claim_name]
+
+
+def test_claim_of_dead_worker_is_requeued(tmp_path, monkeypatch):
+    job = job_queue.submit_job("video.mp4", queue_dir=str(tmp_path))
+    pending_dir = job_queue.job_state_dir(str(tmp_path), "pending")
+    running_dir = job_queue.job_state_dir(str(tmp_path), "running")
+
+    # Воркер упал между переименованием задания и записью PID: PID остался только в имени файла
+    os.rename(os.path.join(pending_dir, f"{job['id']}.json"),
+              os.path.join(running_dir, f"{job['id']}.json.4242{job_queue.CLAIM_SUFFIX}"))
+    monkeypatch.setattr(job_queue, "_is_process_alive", lambda pid: False)
+
+    assert job_queue.requeue_orphaned_jobs(str(tmp_path)) == [job["id"]]
+    assert job_files(tmp_path, "running") == []
+    assert job_queue.claim_job(str(tmp_path))["id"] == job["id"]
+
+
+def test_claimed_job_has_pid_in_running(tmp_path):
+    job_queue.submit_job("video.mp4", queue_dir=str(tmp_path))
+    job = job_queue.claim_job(str(tmp_path))
+
+    running_dir = job_queue.job_state_dir(str(tmp_path), "running")
+    assert job_files(tmp_path, "running") == [f"{job['id']}.json"]
+    assert load_json_safe(os.path.join(running_dir, f"{job['id']}.json"))["worker_pid"] == os.getpid()
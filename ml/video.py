@@ -1,61 +1,420 @@
 import cv2  # Импортируем библиотеку OpenCV для обработки изображений и видео
 import numpy as np  # Импортируем библиотеку NumPy для работы с массивами и числовыми данными
-import tensorflow as tf  # Импортируем TensorFlow для работы с нейронными сетями и глубоким обучением
-from tensorflow.keras.preprocessing import image  # Импортируем модуль для предварительной обработки изображений
-from tensorflow.keras.applications.inception_v3 import preprocess_input, decode_predictions
-# Импортируем функции для работы с предобученной моделью InceptionV3:
-# - `preprocess_input` — для предварительной обработки изображения перед подачей в модель
-# - `decode_predictions` — для декодирования результатов предсказания модели
-
-from ultralytics import YOLO  # Импортируем пакет для использования предобученных моделей YOLO (например, YOLOv8) для детектирования объектов
 import os  # Импортируем стандартный модуль os для работы с файловой системой
+import sys  # Проверка, загружены ли уже PyTorch и TensorFlow (для распределения потоков)
 import json  # Импортируем модуль json для работы с JSON-файлами (чтение и запись)
 import argparse  # Импортируем модуль argparse для обработки аргументов командной строки
+from concurrent.futures import ThreadPoolExecutor  # Пул потоков для одновременного запуска анализаторов
+from functools import lru_cache, partial  # Пул потоков создается один раз на процесс; выбор детектора лиц для задачи
+from checkpoints import write_json_atomic  # Атомарная запись JSON (файл результатов служит чекпоинтом)
+from model_registry import register_model  # Реестр моделей: загрузка при первом использовании, одна на процесс
+from quantization import MODEL_PRECISIONS  # Точности вычислений моделей (исходная и INT8)
+from profiles import DEFAULT_PROFILE, VIDEO_ANALYZERS, load_profile  # Профиль анализа: какие анализаторы включены
+from frame_cache import cached_frames, get_frame_cache  # Кадры из кэша на диске вместо декодирования
+from frame_sampler import PREFETCH_QUEUE_SIZE, every_nth_frame_numbers, key_frame_numbers, prefetch_frames, sample_frames  # Чтение только нужных кадров
+from face_detectors import DEFAULT_FACE_DETECTOR, FACE_DETECTOR_TIERS, face_detector_for_budget, get_face_detector  # Выбираемые детекторы лиц (точный или быстрый)
+# TensorFlow (InceptionV3, FER), ultralytics (YOLO) и fer импортируются при первом использовании анализатора:
+# анализаторы, выключенные профилем анализа (см. profiles), не платят за импорт своих библиотек.
+# Модели создаются не при импорте модуля, а при первом обращении (см. model_registry)
 
-from fer import FER  # Импортируем класс FER из библиотеки `fer` для распознавания эмоций на лицах
 
+# Веса предобученной модели YOLOv8
+YOLO_WEIGHTS = 'yolov8n.pt'
 
-# Загрузка предобученной модели YOLOv8
-yolo_model = YOLO('yolov8n.pt')
+# Точность вычислений каждой модели: 'fp32' — исходная модель, 'int8' — квантованная (см. quantization).
+# Меняется через set_model_precision; по умолчанию все модели работают в исходной точности
+MODEL_PRECISION = {'yolo': 'fp32', 'inception': 'fp32', 'fer': 'fp32'}
 
-# Загрузка предобученной модели InceptionV3
-inception_model = tf.keras.applications.InceptionV3(weights='imagenet')
 
-def load_deeplab_model():
+def set_model_precision(precision):
     """
-    Загрузка предобученной модели сегментации.
+    Выбирает точность вычислений моделей анализа кадров.
+
+    Аргументы:
+    precision — словарь {модель: точность}, например {'yolo': 'int8'}. Модели — ключи MODEL_PRECISION,
+                точности — quantization.MODEL_PRECISIONS. Не указанные модели сохраняют текущую точность.
+
+    Возвращает:
+    Словарь с точностью всех моделей после изменения.
 
     Описание:
-    Эта функция загружает предобученную модель `DenseNet201` без верхних слоев (без полносвязного классификационного слоя).
-    Вместо DeepLabv3+ используется модель `DenseNet201` из библиотеки Keras с параметром `include_top=False`.
-    
+    Модели каждой точности загружаются один раз на процесс, поэтому переключение туда и обратно
+    (например, при сравнении точности в precision_check) не загружает их заново.
+    """
+
+    for model_name, model_precision in precision.items():
+        if model_name not in MODEL_PRECISION:
+            raise ValueError(f"Неизвестная модель: {model_name}. Доступны: {', '.join(MODEL_PRECISION)}")
+        if model_precision not in MODEL_PRECISIONS:
+            raise ValueError(f"Неизвестная точность: {model_precision}. Доступны: {', '.join(MODEL_PRECISIONS)}")
+
+    MODEL_PRECISION.update(precision)
+    return dict(MODEL_PRECISION)
+
+
+@register_model('yolo')
+def get_yolo_model(precision='fp32'):
+    """
+    Загрузка предобученной модели YOLOv8 для детектирования объектов.
+
     Аргументы:
-    Функция не принимает аргументов.
+    precision — 'fp32' (исходные веса PyTorch) или 'int8' (квантованная модель ONNX Runtime, см. quantization.quantize_yolo).
 
     Возвращает:
-    model — экземпляр предобученной модели `DenseNet201`, загруженной с весами `ImageNet`.
-    Модель будет использоваться для задач классификации или сегментации.
-    
-    Примечание:
-    Если требуется загрузить именно DeepLabv3+, модель должна быть импортирована из другой библиотеки, например, `tensorflow_models`.
+    Модель ultralytics.YOLO. Модель загружается один раз на процесс для каждой точности.
     """
-    
-    # --- Загрузка модели DenseNet201 без верхних слоев ---
-    
-    model = tf.keras.applications.DenseNet201(weights='imagenet', include_top=False)
-    
-    # `weights='imagenet'` — указываем, что загружаем модель с предобученными весами на базе данных ImageNet.
-    # `include_top=False` — исключаем верхние слои модели, так как они предназначены для классификации.
-    # Это позволяет использовать модель для других задач, таких как сегментация или извлечение признаков.
 
-    return model  # Возвращаем загруженную модель
+    from ultralytics import YOLO  # Импорт здесь: PyTorch и ultralytics нужны, только если детекция объектов включена
+
+    if precision == 'int8':
+        from quantization import quantize_yolo  # Импорт здесь: ONNX Runtime нужен только для INT8 пути
+
+        model = YOLO(quantize_yolo(YOLO_WEIGHTS), task='detect')
+    else:
+        model = YOLO(YOLO_WEIGHTS)
+
+    _apply_thread_budget()
+    return model
+
+
+def load_inception_model():
+    """
+    Загрузка предобученной модели InceptionV3 для анализа событий и сегментации кадра.
+
+    Возвращает:
+    Скомпилированную модель с пакетным входом и двумя выходами — вероятностями классов ImageNet
+    и картой признаков (см. keras_engine.get_inception_engine).
+    Модель загружается и прогревается один раз на процесс.
+
+    Описание:
+    Раньше сегментация считалась отдельным прямым проходом DenseNet201 на 512x512 только ради argmax
+    по каналам признаков. Теперь карта классов берется из промежуточного слоя той же InceptionV3,
+    так что на кадр приходится один прямой проход и одна модель в памяти.
+    """
+
+    from keras_engine import get_inception_engine  # Импорт здесь: TensorFlow нужен, только если события включены
+
+    _apply_thread_budget()
+    return get_inception_engine(MODEL_PRECISION['inception'])
+
+# Версия fer, под которую написан адаптер get_emotion_detector (закреплена в requirements.txt), и внутренние поля
+# fer.FER, которые он использует: в публичном API fer нет ни модели эмоций, ни пакетной классификации лиц
+FER_VERSION = '22.5.1'
+FER_INTERNALS = ('_FER__emotion_classifier', '_classify_emotions', '_get_labels', 'pad', 'tosquare')
+
+
+@register_model('fer')
+def get_emotion_detector():
+    """
+    Возвращает адаптер классификатора эмоций FER (загружается один раз на процесс при первом поиске лиц).
+
+    Возвращает:
+    Словарь, через который остальной код обращается к fer:
+    - 'model' — модель Keras классификатора эмоций (вход — лица EMOTION_INPUT_SIZE в одном канале);
+    - 'classify' — функция, которая принимает пакет лиц и возвращает вероятности эмоций;
+    - 'labels' — {индекс выхода модели: эмоция};
+    - 'pad' — добавляет к кадру в градациях серого рамку FER_PADDING;
+    - 'tosquare' — достраивает рамку лица [x, y, w, h] до квадрата.
+
+    Описание:
+    Только эта функция читает внутренние поля fer.FER (FER_INTERNALS). Если в установленной версии fer
+    их нет, выбрасывается RuntimeError с требуемой версией, а не AttributeError посреди анализа кадров.
+    Лица ищет выбранный детектор (см. face_detectors), поэтому здесь MTCNN не загружается:
+    он нужен только точному детектору и загружается при первом его использовании.
+    """
+
+    from importlib.metadata import version  # Версия установленного пакета fer
+    from fer import FER  # Импорт здесь: fer и TensorFlow нужны, только если поиск лиц включен
+
+    installed = version('fer')
+    detector = FER(mtcnn=False)
+    missing = [name for name in FER_INTERNALS if not hasattr(detector, name)]
+    if missing:
+        raise RuntimeError(f"В fer {installed} нет полей {', '.join(missing)}, нужных анализу эмоций: "
+                           f"установите fer=={FER_VERSION}")
+    if installed != FER_VERSION:
+        print(f"Установлен fer {installed}, адаптер эмоций проверен с fer {FER_VERSION}")
+
+    _apply_thread_budget()
+    return {
+        'model': detector._FER__emotion_classifier,
+        'classify': detector._classify_emotions,
+        'labels': detector._get_labels(),
+        'pad': detector.pad,
+        'tosquare': detector.tosquare
+    }
+
+
+# Подготовка лиц для классификатора эмоций — те же параметры, что у fer.FER (рамка вокруг кадра,
+# отступы вокруг лица и вход модели эмоций)
+FER_PADDING = 40
+FER_FACE_OFFSETS = (10, 10)
+EMOTION_INPUT_SIZE = (64, 64)
+
+
+@register_model('fer_classifier')
+def get_emotion_classifier(precision='fp32'):
+    """
+    Возвращает классификатор эмоций FER: функцию, которая принимает пакет лиц формы (N, 64, 64, 1)
+    и возвращает вероятности эмоций формы (N, число эмоций).
+
+    Аргументы:
+    precision — 'fp32' (модель Keras из fer) или 'int8' (квантованная модель TFLite, см. quantization.tflite_engine).
+    """
+
+    if precision == 'int8':
+        from quantization import tflite_engine  # Импорт здесь: TFLite нужен только для INT8 пути
+
+        # Вход модели Keras — лица EMOTION_INPUT_SIZE в одном канале
+        return tflite_engine(get_emotion_detector()['model'], EMOTION_INPUT_SIZE, 'fer_emotion', channels=1)
+
+    return get_emotion_detector()['classify']
+
+
+@register_model('background_subtractor')
+def get_background_subtractor():
+    """
+    Возвращает фоновый субтрактор MOG2 для поиска движущихся объектов (один на процесс: он накапливает
+    модель фона по кадрам в исходном порядке). Анализ шотов сбрасывает его перед каждым шотом
+    (см. shot_analysis.analyze_shot), чтобы последовательный и параллельный анализ давали одинаковый результат.
+    """
+
+    return cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=50, detectShadows=True)
+
+
+@register_model('saliency')
+def get_saliency_detector():
+    """
+    Возвращает детектор салентности (спектральный остаток) из модуля cv2.saliency.
+    """
+
+    return cv2.saliency.StaticSaliencySpectralResidual_create()
+
+
+def load_video_models(analyzers=tuple(VIDEO_ANALYZERS), fork_safe_only=False):
+    """
+    Заранее загружает модели включенных анализаторов кадров (например, в воркере до первого шота).
+
+    Аргументы:
+    analyzers — включенные анализаторы (по умолчанию все, см. profiles.VIDEO_ANALYZERS).
+    fork_safe_only — загрузить только модели, которые переживают fork (по умолчанию False).
+                     Это YOLO на PyTorch: TensorFlow (InceptionV3, FER) и ONNX Runtime (YOLO INT8) запускают
+                     пулы потоков уже при загрузке модели, а после fork этих потоков в дочернем процессе нет.
+    """
+
+    if 'objects' in analyzers and not (fork_safe_only and MODEL_PRECISION['yolo'] != 'fp32'):
+        get_yolo_model(MODEL_PRECISION['yolo'])
+    if fork_safe_only:
+        return
+    if 'events' in analyzers:
+        load_inception_model()
+    if 'faces' in analyzers:
+        get_emotion_classifier(MODEL_PRECISION['fer'])
+    if 'motion' in analyzers:
+        get_background_subtractor()
+    if 'saliency' in analyzers:
+        get_saliency_detector()
+
+# Сколько ключевых кадров подается в YOLO за один вызов (на CPU пакет из 8–16 кадров заметно быстрее покадровых вызовов)
+YOLO_BATCH_SIZE = 8
+
+# Сколько анализаторов пакета работают одновременно: YOLO, InceptionV3 (события и сегментация), лица, движение, салентность
+ANALYZER_WORKERS = 5
+
+# Каскадные условия запуска анализаторов: {анализатор: условие}. Анализатор запускается не на всем кадре,
+# а только в областях, где анализатор-источник нашел объекты нужных классов; если таких объектов нет,
+# анализатор на кадре не запускается вовсе. Условие содержит:
+# - 'source' — анализатор-источник детекций (в формате detections_from_result);
+# - 'classes' — классы объектов, вокруг которых работает анализатор;
+# - 'min_confidence' — минимальная уверенность детекции;
+# - 'expand' — на какую долю ширины и высоты объекта расширить область с каждой стороны.
+# MTCNN — один из самых медленных шагов, и на кадрах без людей (пейзажи, слайды, машины) он работает впустую.
+# Каскад меняет результаты (лица вне найденных людей не ищутся), поэтому по умолчанию выключен и включается профилем
+ANALYZER_GATES = {
+    'faces': {'source': 'objects', 'classes': ('person',), 'min_confidence': 0.5, 'expand': 0.1}
+}
+
+
+def gates_for_profile(profile):
+    """
+    Возвращает каскадные условия анализаторов для профиля анализа: ANALYZER_GATES, если в профиле включен
+    каскад (ключ 'cascade', см. profiles.load_profile), иначе None — все анализаторы работают на всем кадре.
+    """
+
+    return ANALYZER_GATES if profile.get('cascade') else None
+
+
+# Потоки библиотек, выделенные анализаторам (см. set_analyzer_thread_budget); None — еще не распределены
+analyzer_thread_budget = None
+
+
+def set_analyzer_thread_budget(total_threads=None):
+    """
+    Делит потоки процессора между библиотеками, ядра которых работают одновременно (см. run_analyzers).
+
+    Аргументы:
+    total_threads — сколько потоков доступно процессу (по умолчанию None — все ядра).
+                    В пуле процессов сюда передается доля одного воркера.
+
+    Возвращает:
+    Словарь {'torch': ..., 'tensorflow': ..., 'opencv': ...} с числом потоков каждой библиотеки.
+
+    Описание:
+    Без ограничения каждая из трех библиотек (PyTorch — YOLO, TensorFlow — InceptionV3 и FER,
+    OpenCV — движение и салентность) занимает все ядра, и одновременные анализаторы только мешают друг другу.
+    TensorFlow принимает число потоков только до инициализации; если он уже инициализирован,
+    действует значение из переменных окружения TF_NUM_INTRAOP_THREADS (см. shot_analysis._init_worker).
+    PyTorch и TensorFlow импортируются только включенными анализаторами, поэтому доля еще не загруженной
+    библиотеки применяется при загрузке ее модели (см. _apply_thread_budget).
+    """
+
+    global analyzer_thread_budget
+
+    total_threads = total_threads or os.cpu_count() or 1
+    per_library = max(1, total_threads // 3)
+    budget = {'torch': per_library, 'tensorflow': per_library, 'opencv': per_library}
+
+    cv2.setNumThreads(budget['opencv'])
+    analyzer_thread_budget = budget
+    _apply_thread_budget()
+    return budget
+
+
+def _apply_thread_budget():
+    """
+    Применяет распределение потоков (см. set_analyzer_thread_budget) к уже загруженным PyTorch и TensorFlow.
+    """
+
+    if analyzer_thread_budget is None:
+        return
+
+    if 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(analyzer_thread_budget['torch'])
+    if 'tensorflow' in sys.modules:
+        try:
+            sys.modules['tensorflow'].config.threading.set_intra_op_parallelism_threads(analyzer_thread_budget['tensorflow'])
+        except RuntimeError:
+            pass  # TensorFlow уже инициализирован
 
-# Инициализация моделей POI
-emotion_detector = FER(mtcnn=True)  # Используем MTCNN для детекции лиц
 
-# Инициализация фонового субтрактор и салентного детектора
-back_subtractor = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=50, detectShadows=True)
-saliency_detector = cv2.saliency.StaticSaliencySpectralResidual_create()
+@lru_cache(maxsize=None)
+def get_analyzer_pool():
+    """
+    Возвращает пул потоков для одновременного запуска анализаторов (создается один раз на процесс).
+    Если потоки библиотек еще не распределены, распределяет все ядра процесса (см. set_analyzer_thread_budget).
+    """
+
+    if analyzer_thread_budget is None:
+        set_analyzer_thread_budget()
+    return ThreadPoolExecutor(max_workers=ANALYZER_WORKERS, thread_name_prefix="analyzer")
+
+
+def map_frames(function, frames, *args, regions=None):
+    """
+    Применяет покадровый анализатор к кадрам по очереди и возвращает список результатов в порядке кадров.
+    Если переданы regions (список областей для каждого кадра, см. gate_regions), анализатор получает их
+    аргументом `regions`.
+    """
+
+    if regions is None:
+        return [function(frame, *args) for frame in frames]
+    return [function(frame, *args, regions=frame_regions) for frame, frame_regions in zip(frames, regions)]
+
+
+def gate_regions(detections, gate):
+    """
+    Выбирает области кадра, в которых должен работать анализатор с каскадным условием (см. ANALYZER_GATES).
+
+    Аргументы:
+    detections — детекции кадра (см. detections_from_result).
+    gate — условие: классы, минимальная уверенность и расширение областей.
+
+    Возвращает:
+    Список областей [xmin, ymin, xmax, ymax]. Пересекающиеся области объединяются,
+    чтобы один и тот же объект (например, лицо человека из группы) не обрабатывался дважды.
+    """
+
+    regions = []
+    for detection in detections:
+        if detection['class'] not in gate['classes'] or detection['confidence'] < gate['min_confidence']:
+            continue
+        xmin, ymin, xmax, ymax = detection['bbox']
+        dx, dy = (xmax - xmin) * gate['expand'], (ymax - ymin) * gate['expand']
+        regions.append([xmin - dx, ymin - dy, xmax + dx, ymax + dy])
+
+    # --- Объединение пересекающихся областей ---
+
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                a, b = regions[i], regions[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    regions[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del regions[j]
+                    merged = True
+                    break
+            if merged:
+                break
+
+    return regions
+
+
+def frame_detections(result):
+    """
+    Возвращает детекции кадра из результата анализатора-источника: пары (кадр, детекции),
+    как у detect_objects_batch, или сразу списка детекций.
+    """
+
+    return result[1] if isinstance(result, tuple) else result
+
+
+def run_analyzers(tasks, concurrent=True, gates=None):
+    """
+    Запускает анализаторы пакета кадров.
+
+    Аргументы:
+    tasks — словарь {имя анализатора: (функция, аргументы...)} или {имя: None}, если анализатор отключен.
+    concurrent — запускать ли анализаторы одновременно в пуле потоков (по умолчанию True).
+    gates — каскадные условия {имя анализатора: условие} (см. ANALYZER_GATES; по умолчанию None — без каскада).
+            Анализатор с условием ждет результат источника и получает аргумент `regions` — области
+            для каждого кадра пакета. Если источник отключен, анализатор работает на всем кадре.
+
+    Возвращает:
+    Словарь {имя анализатора: результат функции} (для отключенных — None).
+
+    Описание:
+    Ядра TensorFlow, PyTorch и OpenCV отпускают GIL, поэтому анализаторы в разных потоках действительно
+    работают параллельно. Каждый анализатор обрабатывает свои кадры по очереди в одном потоке:
+    у вычитателя фона, детектора салентности и FER есть общее состояние, которое нельзя делить между потоками.
+    """
+
+    gates = {
+        name: gate for name, gate in (gates or {}).items()
+        if tasks.get(name) is not None and tasks.get(gate['source']) is not None
+    }
+
+    def run_gated(task, gate, source_results):
+        regions = [gate_regions(frame_detections(result), gate) for result in source_results]
+        return task[0](*task[1:], regions=regions)
+
+    if not concurrent:
+        results = {name: None if task is None else task[0](*task[1:])
+                   for name, task in tasks.items() if name not in gates}
+        for name, gate in gates.items():
+            results[name] = run_gated(tasks[name], gate, results[gate['source']])
+        return {name: results[name] for name in tasks}
+
+    # Сначала отправляются независимые анализаторы, затем анализаторы с условием: они ждут своих источников
+    # в потоках пула, а источники к этому моменту уже в работе
+    pool = get_analyzer_pool()
+    futures = {name: None if task is None else pool.submit(*task) for name, task in tasks.items() if name not in gates}
+    for name, gate in gates.items():
+        futures[name] = pool.submit(lambda task=tasks[name], gate=gate, source=futures[gate['source']]:
+                                    run_gated(task, gate, source.result()))
+    return {name: None if futures[name] is None else futures[name].result() for name in tasks}
+
 
 def detect_objects(frame):
     """
@@ -67,30 +426,67 @@ def detect_objects(frame):
 
     Возвращает:
     - annotated_frame — изображение (кадр) с аннотациями (прямоугольниками и метками объектов).
-    - detections — список детекций, где каждая детекция представлена как словарь с полями:
+    - detections — список детекций (см. detections_from_result).
+    """
+
+    return detect_objects_batch([frame], annotate=True)[0]
+
+
+def detect_objects_batch(frames, annotate=False):
+    """
+    Выполняет детектирование объектов сразу на пакете кадров одним вызовом YOLO.
+
+    Аргументы:
+    frames — список изображений в формате NumPy массивов.
+    annotate — рисовать ли аннотированные кадры (по умолчанию False). Отрисовка `plot()` нужна только
+               для визуализации, поэтому без нее кадр не копируется и не разрисовывается впустую.
+
+    Возвращает:
+    Список кортежей (annotated_frame, detections) в порядке кадров, где:
+    - annotated_frame — изображение с аннотациями или None, если annotate=False.
+    - detections — список детекций кадра (см. detections_from_result).
+    """
+
+    if not frames:
+        return []
+
+    # --- Выполнение детектирования объектов на всем пакете кадров с помощью YOLO ---
+
+    results = get_yolo_model(MODEL_PRECISION['yolo'])(list(frames), verbose=False)  # Один вызов модели на весь пакет, результат — по элементу на кадр
+
+    # Каждый элемент `results` содержит данные для своего кадра:
+    # - `plot()` — функция для визуализации детекций на изображении (аннотирование кадра).
+    # - `boxes` — найденные объекты (координаты, уверенности и классы).
+
+    return [
+        (result.plot() if annotate else None, detections_from_result(result))
+        for result in results
+    ]
+
+
+def detections_from_result(result):
+    """
+    Преобразует результат YOLO для одного кадра в список детекций.
+
+    Аргументы:
+    result — элемент списка результатов модели YOLO для одного кадра.
+
+    Возвращает:
+    detections — список детекций, где каждая детекция представлена как словарь с полями:
         - 'class': название класса объекта (например, 'person', 'car').
         - 'confidence': уверенность модели в данном предсказании (от 0 до 1).
         - 'bbox': координаты ограничивающего прямоугольника (xmin, ymin, xmax, ymax).
         - 'area': площадь ограничивающего прямоугольника (в пикселях).
     """
 
-    # --- Выполнение детектирования объектов на кадре с помощью YOLO ---
-    
-    results = yolo_model(frame)  # Запускаем модель YOLO на входном кадре `frame`
+    # --- Извлечение данных детекций из результата модели ---
     
-    # `results` — это список результатов, и `results[0]` содержит данные для текущего кадра:
-    # - `plot()` — функция для визуализации детекций на изображении (аннотирование кадра).
     # - `boxes.xyxy` — координаты ограничивающих прямоугольников (формат: [xmin, ymin, xmax, ymax]).
     # - `boxes.conf` — уверенности предсказания для каждого прямоугольника.
     # - `boxes.cls` — идентификаторы предсказанных классов объектов (например, 0 — 'person', 1 — 'car').
-
-    annotated_frame = results[0].plot()  # Создаем аннотированное изображение с выделенными объектами
-
-    # --- Извлечение данных детекций из результата модели ---
-    
-    boxes = results[0].boxes.xyxy.numpy()  # Координаты ограничивающих прямоугольников (в формате NumPy массива)
-    confidences = results[0].boxes.conf.numpy()  # Уверенности для каждого объекта (NumPy массив)
-    class_ids = results[0].boxes.cls.numpy()  # Идентификаторы классов объектов (NumPy массив)
+    boxes = result.boxes.xyxy.cpu().numpy()  # Координаты ограничивающих прямоугольников (в формате NumPy массива)
+    confidences = result.boxes.conf.cpu().numpy()  # Уверенности для каждого объекта (NumPy массив)
+    class_ids = result.boxes.cls.cpu().numpy()  # Идентификаторы классов объектов (NumPy массив)
 
     # --- Создание списка для хранения детекций ---
     
@@ -106,8 +502,8 @@ def detect_objects(frame):
         confidence = confidences[i]
         cls = int(class_ids[i])  # Преобразуем идентификатор класса в целое число
 
-        # Извлекаем метку класса из модели YOLO
-        label = yolo_model.names[cls]  # Преобразуем идентификатор класса в название (например, 'person')
+        # Извлекаем метку класса из результата YOLO (имена классов те же при любой точности модели)
+        label = result.names[cls]  # Преобразуем идентификатор класса в название (например, 'person')
 
         # --- Рассчитываем дополнительные метрики для каждого объекта ---
         
@@ -127,9 +523,9 @@ def detect_objects(frame):
             'area': float(area)  # Площадь ограничивающего прямоугольника
         })
 
-    # --- Возвращение аннотированного кадра и списка детекций ---
+    # --- Возвращение списка детекций ---
     
-    return annotated_frame, detections
+    return detections
 
 def analyze_events(frame):
     """
@@ -150,87 +546,155 @@ def analyze_events(frame):
     [{'class_id': 'n02834778', 'name': 'bicycle', 'probability': 0.85}, ...]
     """
 
-    # --- Предобработка изображения перед передачей в модель InceptionV3 ---
+    return analyze_events_batch([frame])[0]
 
-    # Изменяем размер изображения до (299, 299), так как InceptionV3 ожидает этот размер на входе
-    img = cv2.resize(frame, (299, 299))
 
-    # Преобразуем изображение в формат массива, который ожидает Keras
-    img_array = image.img_to_array(img)  # Преобразуем изображение в массив (299, 299, 3)
-    
-    # Добавляем дополнительное измерение, чтобы форма массива соответствовала входу модели
-    img_array = np.expand_dims(img_array, axis=0)  # Новая форма: (1, 299, 299, 3)
+def resize_for_events(frame):
+    """
+    Уменьшает кадр до входного размера InceptionV3 (299x299).
+    """
+
+    return cv2.resize(frame, (299, 299))
+
+
+def analyze_events_batch(frames, resized_frames=None):
+    """
+    Выполняет анализ событий сразу на пакете кадров одним прямым проходом InceptionV3.
+
+    Аргументы:
+    frames — список изображений в формате NumPy массивов.
+    resized_frames — те же кадры, уже уменьшенные до 299x299 (см. resize_for_events), или None.
+                     Их готовит поток предвыборки кадров, пока модели заняты предыдущим пакетом.
+
+    Возвращает:
+    Список событий для каждого кадра в порядке кадров (формат как у analyze_events).
+    """
+
+    return analyze_scene_batch(frames, resized_frames)[0]
+
+
+def analyze_scene_batch(frames, resized_frames=None, segment=False):
+    """
+    Считает события и (по запросу) сегментацию пакета кадров одним прямым проходом InceptionV3.
+
+    Аргументы:
+    frames — список изображений в формате NumPy массивов.
+    resized_frames — те же кадры, уже уменьшенные до 299x299 (см. resize_for_events), или None.
+    segment — раскрашивать ли карту классов в сегментацию (по умолчанию False; нужна только для визуализации).
+
+    Возвращает:
+    Кортеж (events, segmented), где:
+    - events — список событий для каждого кадра (формат как у analyze_events);
+    - segmented — список цветных сегментированных изображений (формат как у segment_scenes)
+      или список None, если segment=False.
+    """
+
+    if not frames:
+        return [], []
+
+    from tensorflow.keras.preprocessing import image  # Импортируем модуль для предварительной обработки изображений
+    from tensorflow.keras.applications.inception_v3 import preprocess_input, decode_predictions
+    # Импортируем функции для работы с предобученной моделью InceptionV3 (здесь: TensorFlow нужен, только если события включены):
+    # - `preprocess_input` — для предварительной обработки изображения перед подачей в модель
+    # - `decode_predictions` — для декодирования результатов предсказания модели
+
+    # --- Предобработка изображений перед передачей в модель InceptionV3 ---
+
+    # Изменяем размер изображений до (299, 299), так как InceptionV3 ожидает этот размер на входе,
+    # и собираем их в один массив формы (N, 299, 299, 3)
+    if resized_frames is None:
+        resized_frames = [resize_for_events(frame) for frame in frames]
+    img_array = np.stack([image.img_to_array(resized) for resized in resized_frames])
 
     # Применяем предобработку, специфичную для модели InceptionV3 (например, нормализация)
     img_array = preprocess_input(img_array)  # Нормализация данных (используется метод из Keras)
 
     # --- Выполнение предсказания с использованием модели InceptionV3 ---
 
-    predictions = inception_model.predict(img_array)  # Получаем предсказания от модели InceptionV3
-    # `predictions` — массив вероятностей для всех классов ImageNet (например, [0.001, 0.005, ...])
+    predictions, feature_maps = load_inception_model()(img_array)  # Один прямой проход на оба выхода
+    # `predictions` — массив вероятностей для всех классов ImageNet (по строке на кадр)
+    # `feature_maps` — пространственная карта признаков промежуточного слоя (по карте на кадр)
 
     # Декодируем предсказания в понятные метки классов (например, ['bicycle', 'car'])
-    decoded_predictions = decode_predictions(predictions, top=3)[0]
-    # `decode_predictions` преобразует массив вероятностей в список кортежей (класс, метка, вероятность)
+    decoded_predictions = decode_predictions(predictions, top=3)
+    # `decode_predictions` преобразует массив вероятностей в списки кортежей (класс, метка, вероятность)
     # `top=3` — выбираем три наиболее вероятных предсказания
 
-    # --- Формирование списка предсказанных событий ---
+    # --- Формирование списка предсказанных событий для каждого кадра ---
 
-    # Создаем список словарей, где каждый словарь содержит информацию о предсказанном классе:
+    # Каждый словарь содержит информацию о предсказанном классе:
     # - 'class_id': идентификатор класса по базе данных WordNet (например, 'n02834778')
     # - 'name': название предсказанного класса (например, 'bicycle')
     # - 'probability': вероятность, с которой модель считает, что изображение принадлежит данному классу
     events = [
-        {'class_id': label, 'name': name, 'probability': float(prob)}
-        for label, name, prob in decoded_predictions
+        [{'class_id': label, 'name': name, 'probability': float(prob)} for label, name, prob in frame_predictions]
+        for frame_predictions in decoded_predictions
     ]
 
-    # --- Возвращение результатов анализа ---
-    
-    return events  # Возвращаем список событий с вероятностями
+    # --- Сегментация из той же карты признаков (только для визуализации) ---
 
-def segment_scenes(frame, model):
+    if not segment:
+        return events, [None] * len(frames)
+
+    segmented = [colorize_segmentation(feature_map, frame) for feature_map, frame in zip(feature_maps, frames)]
+    return events, segmented
+
+def segment_scenes(frame):
     """
-    Выполняет сегментацию сцены на изображении с использованием заданной модели сегментации.
+    Выполняет сегментацию сцены на изображении по карте признаков InceptionV3.
     
     Аргументы:
     frame — входное изображение в формате NumPy массива (например, кадр видео или изображение).
-    model — модель сегментации, обученная для разделения изображений на классы (например, DeepLabv3+).
 
     Возвращает:
     colored_segmentation — изображение, где каждому сегменту присвоен уникальный цвет (RGB).
     
     Описание:
     - Функция изменяет размер входного изображения, чтобы соответствовать ожиданиям модели.
-    - Выполняется предсказание сегментации и последующая обработка, чтобы преобразовать выход модели в цветное изображение.
+    - Выполняется прямой проход и последующая обработка, чтобы преобразовать карту признаков в цветное изображение.
     - Цвет каждого сегмента выбирается случайным образом из цветовой карты (RGB).
 
     Примечание:
     Функция полезна для визуализации результатов сегментации, так как каждому классу на изображении присваивается уникальный цвет.
     """
     
-    # --- Изменение размера изображения для соответствия модели ---
-    
-    # Изменяем размер входного изображения `frame` до (512, 512), чтобы соответствовать ожидаемым входным данным модели
-    img = cv2.resize(frame, (512, 512))  # Изменение размера изображения до (512, 512)
-    
-    # --- Предобработка изображения для подачи в модель ---
-    
-    # Добавляем дополнительное измерение, чтобы указать модель, что это единичный пример (1, 512, 512, 3)
-    img_array = np.expand_dims(img, axis=0)
-    
-    # Преобразуем изображение в тип данных `tf.uint8` (целочисленные значения от 0 до 255)
-    img_array = tf.image.convert_image_dtype(img_array, dtype=tf.uint8)
+    return segment_scenes_batch([frame])[0]
+
+
+def segment_scenes_batch(frames, resized_frames=None):
+    """
+    Выполняет сегментацию сразу на пакете кадров одним прямым проходом InceptionV3.
+    Если нужны и события, лучше вызвать analyze_scene_batch: он отдает оба результата за тот же проход.
+
+    Аргументы:
+    frames — список изображений в формате NumPy массивов.
+    resized_frames — те же кадры, уже уменьшенные до 299x299 (см. resize_for_events), или None.
+
+    Возвращает:
+    Список цветных сегментированных изображений в порядке кадров (формат как у segment_scenes).
+    """
+
+    return analyze_scene_batch(frames, resized_frames, segment=True)[1]
 
-    # --- Выполнение предсказания с использованием модели сегментации ---
-    
-    # Запускаем предсказание на модели, результат — массив предсказанных классов для каждого пикселя
-    predictions = model.predict(img_array)  # Модель возвращает предсказания для каждого пикселя в формате (1, 512, 512, num_classes)
+
+def colorize_segmentation(predictions, frame):
+    """
+    Преобразует выход модели сегментации для одного кадра в цветное изображение размера кадра.
+
+    Аргументы:
+    predictions — карта признаков кадра формы (высота, ширина, число каналов); канал с максимумом — класс пикселя.
+    frame — исходный кадр (нужен его размер).
+
+    Возвращает:
+    colored_segmentation — изображение, где каждому сегменту присвоен уникальный цвет (RGB).
+    """
+
+    import tensorflow as tf  # TensorFlow уже загружен моделью InceptionV3, карта которой раскрашивается
 
     # Находим индекс класса с максимальной вероятностью для каждого пикселя (например, [0, 1, 0, 2, ...])
-    segmented_image = tf.argmax(predictions[0], axis=-1)  # Получаем метки классов по оси последнего измерения (-1)
+    segmented_image = tf.argmax(predictions, axis=-1)  # Получаем метки классов по оси последнего измерения (-1)
     
-    # Преобразуем `segmented_image` в формат (512, 512, 1), чтобы сохранить структуру изображения
+    # Преобразуем `segmented_image` в формат (высота, ширина, 1), чтобы сохранить структуру изображения
     segmented_image = np.expand_dims(segmented_image, axis=-1)  # Добавляем измерение для согласованности формы массива
 
     # --- Изменение размера сегментированного изображения до исходного размера ---
@@ -329,24 +793,25 @@ def save_results_to_json(video_name, scene_data, json_output_file):
 
     # --- Шаг 3: Сохранение обновленных данных обратно в JSON файл ---
     
-    # Открываем выходной файл в режиме записи ('w') и сохраняем данные в формате JSON
-    with open(json_output_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-        # Параметры:
-        # - ensure_ascii=False: сохраняет символы юникода в их естественном представлении (например, кириллицу)
-        # - indent=4: форматирует JSON с отступом в 4 пробела, делая его читаемым
+    # Сохраняем данные в формате JSON атомарно: при падении процесса во время записи
+    # на диске останется прежняя целая версия файла (это чекпоинт для перезапуска конвейера)
+    write_json_atomic(data, json_output_file)
 
     # --- Шаг 4: Вывод сообщения об успешном сохранении ---
     
     print(f"Результаты для {video_name} успешно сохранены в {json_output_file}")
     # Выводим сообщение, подтверждающее успешное сохранение результатов в файл
 
-def detect_faces_and_emotions(frame):
+def detect_faces_and_emotions(frame, regions=None, detector=DEFAULT_FACE_DETECTOR):
     """
     Выполняет детекцию лиц на изображении и распознавание эмоций с использованием библиотеки FER.
 
     Аргументы:
     frame — изображение в формате NumPy массива, на котором нужно обнаружить лица и определить эмоции.
+    regions — области кадра [xmin, ymin, xmax, ymax], в которых искать лица (по умолчанию None — весь кадр).
+              Пустой список — лиц искать негде, FER не запускается (см. ANALYZER_GATES).
+              Координаты лиц в результате всегда даются относительно всего кадра.
+    detector — детектор лиц (см. face_detectors.FACE_DETECTOR_TIERS; по умолчанию DEFAULT_FACE_DETECTOR — MTCNN).
 
     Возвращает:
     - face_data — список словарей, содержащих информацию о каждом обнаруженном лице:
@@ -366,10 +831,160 @@ def detect_faces_and_emotions(frame):
     """
 
     # --- Детекция лиц и эмоций с использованием модели FER ---
-    
-    emotions = emotion_detector.detect_emotions(frame)  # Запускаем детекцию лиц и распознавание эмоций на кадре `frame`
-    # `emotions` — список, содержащий информацию обо всех обнаруженных лицах и их эмоциях
-    
+
+    return detect_faces_and_emotions_batch([frame], None if regions is None else [regions], detector)[0]
+
+
+def detect_faces_and_emotions_batch(frames, regions=None, detector=DEFAULT_FACE_DETECTOR):
+    """
+    Выполняет детекцию лиц и распознавание эмоций сразу на пакете кадров.
+
+    Аргументы:
+    frames — список изображений в формате NumPy массивов.
+    regions — список областей для каждого кадра (см. detect_faces_and_emotions) или None — ищем на всех кадрах целиком.
+    detector — детектор лиц (по умолчанию DEFAULT_FACE_DETECTOR).
+
+    Возвращает:
+    Список кортежей (face_data, bounding_boxes) в порядке кадров (формат как у detect_faces_and_emotions).
+
+    Описание:
+    Детекция лиц идет по кадрам, а классификатор эмоций получает лица всех кадров пакета
+    одним вызовом: на ток-шоу с 3–6 лицами в кадре покадровые вызовы классификатора занимали большую часть времени FER.
+    """
+
+    if regions is None:
+        regions = [None] * len(frames)
+
+    # --- Шаг 1: Детекция лиц на каждом кадре ---
+
+    face_boxes = [detect_faces(frame, frame_regions, detector) for frame, frame_regions in zip(frames, regions)]
+
+    # --- Шаг 2: Подготовка лиц всех кадров для классификатора ---
+
+    face_inputs = []  # Подготовленные изображения лиц всех кадров пакета
+    owners = []  # Для каждого лица: (номер кадра в пакете, рамка лица)
+    for frame_index, (frame, boxes) in enumerate(zip(frames, face_boxes)):
+        if not boxes:
+            continue
+        gray_image = emotion_gray_image(frame)
+        for box in boxes:
+            face_input = emotion_face_input(gray_image, box)
+            if face_input is not None:
+                face_inputs.append(face_input)
+                owners.append((frame_index, box))
+
+    # --- Шаг 3: Один вызов классификатора эмоций на все лица ---
+
+    emotions = [[] for _ in frames]  # Лица кадров в формате fer.FER.detect_emotions
+    for (frame_index, box), face_emotions in zip(owners, classify_emotions(face_inputs)):
+        emotions[frame_index].append({"box": box, "emotions": face_emotions})
+
+    return [face_data_from_emotions(frame_emotions) for frame_emotions in emotions]
+
+
+def detect_faces(frame, regions=None, detector=DEFAULT_FACE_DETECTOR):
+    """
+    Находит лица на кадре выбранным детектором без распознавания эмоций.
+
+    Аргументы:
+    frame — изображение в формате NumPy массива.
+    regions — области кадра [xmin, ymin, xmax, ymax], в которых искать лица (по умолчанию None — весь кадр).
+    detector — детектор лиц (см. face_detectors.FACE_DETECTOR_TIERS; по умолчанию DEFAULT_FACE_DETECTOR).
+
+    Возвращает:
+    Список рамок лиц [x, y, w, h] в координатах всего кадра.
+    """
+
+    find_faces = get_face_detector(detector)
+    if regions is None:
+        return find_faces(frame)
+
+    height, width = frame.shape[:2]
+    boxes = []
+
+    for xmin, ymin, xmax, ymax in regions:
+        xmin, ymin = max(0, int(xmin)), max(0, int(ymin))
+        xmax, ymax = min(width, int(xmax)), min(height, int(ymax))
+        if xmax <= xmin or ymax <= ymin:
+            continue
+
+        crop = np.ascontiguousarray(frame[ymin:ymax, xmin:xmax])
+        for x, y, w, h in find_faces(crop):
+            boxes.append([x + xmin, y + ymin, w, h])
+
+    return boxes
+
+
+def emotion_gray_image(frame):
+    """
+    Переводит кадр в градации серого и добавляет рамку FER_PADDING, как fer.FER перед вырезанием лиц
+    (вход emotion_face_input).
+    """
+
+    return get_emotion_detector()['pad'](cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+
+
+def emotion_face_input(gray_image, box):
+    """
+    Вырезает и готовит лицо для классификатора эмоций так же, как fer.FER.detect_emotions.
+
+    Аргументы:
+    gray_image — кадр в градациях серого с рамкой FER_PADDING (см. emotion_gray_image).
+    box — рамка лица [x, y, w, h] в координатах кадра без рамки.
+
+    Возвращает:
+    Изображение лица размера EMOTION_INPUT_SIZE со значениями от -1 до 1 или None, если лицо вырезать не удалось.
+    """
+
+    # Рамка достраивается до квадрата и расширяется на FER_FACE_OFFSETS с учетом рамки вокруг кадра
+    x, y, w, h = get_emotion_detector()['tosquare'](box)
+    x_offset, y_offset = FER_FACE_OFFSETS
+    x1, x2 = max(0, x - x_offset + FER_PADDING), x + w + x_offset + FER_PADDING
+    y1, y2 = max(0, y - y_offset + FER_PADDING), y + h + y_offset + FER_PADDING
+
+    face = gray_image[y1:y2, x1:x2]
+    if face.size == 0:
+        return None
+
+    face = cv2.resize(face, EMOTION_INPUT_SIZE).astype("float32") / 255.0
+    return (face - 0.5) * 2.0
+
+
+def classify_emotions(face_inputs):
+    """
+    Классифицирует эмоции сразу для всех переданных лиц одним вызовом модели FER.
+
+    Аргументы:
+    face_inputs — список подготовленных лиц (см. emotion_face_input).
+
+    Возвращает:
+    Список словарей {эмоция: вероятность} в порядке лиц (формат fer.FER.detect_emotions).
+    """
+
+    if not face_inputs:
+        return []
+
+    # Классификатор FER ожидает пакет формы (N, высота, ширина, 1)
+    classifier = get_emotion_classifier(MODEL_PRECISION['fer'])
+    predictions = np.asarray(classifier(np.stack(face_inputs)[..., np.newaxis]))
+    labels = get_emotion_detector()['labels']
+    return [
+        {labels[index]: round(float(score), 2) for index, score in enumerate(face_predictions)}
+        for face_predictions in predictions
+    ]
+
+
+def face_data_from_emotions(emotions):
+    """
+    Преобразует лица в формате fer.FER.detect_emotions в результаты detect_faces_and_emotions.
+
+    Аргументы:
+    emotions — список словарей с ключами 'box' (x, y, w, h) и 'emotions' ({эмоция: вероятность}).
+
+    Возвращает:
+    Кортеж (face_data, bounding_boxes) (см. detect_faces_and_emotions).
+    """
+
     face_data = []  # Пустой список для хранения информации обо всех обнаруженных лицах
 
     # --- Проход по каждому обнаруженному лицу и сбор данных ---
@@ -524,13 +1139,13 @@ def detect_salient_regions(frame):
     
     # --- Шаг 1: Вычисление карты салентности ---
     
-    # Используем объект `saliency_detector` для вычисления карты салентности кадра `frame`
+    # Используем детектор салентности (см. get_saliency_detector) для вычисления карты салентности кадра `frame`
     # `saliency_map` — карта салентности, значения которой варьируются от 0 до 1.
-    success, saliency_map = saliency_detector.computeSaliency(frame)
+    success, saliency_map = get_saliency_detector().computeSaliency(frame)
 
     # Проверка, удалось ли вычислить карту салентности
     if not success:
-        return []  # Возвращаем пустой список, если не удалось выполнить вычисление
+        return [], None  # Возвращаем пустой список, если не удалось выполнить вычисление
 
     # --- Шаг 2: Преобразование карты салентности в бинарное изображение ---
     
@@ -661,89 +1276,241 @@ def visualize_heatmap_zones(image, detections, faces, moving_objects, salient_re
     return image  # Возвращаем изображение с визуализированными зонами
 
 
-def process_video(video_path, json_output_path, scene_change_threshold=0.5, process_every_100_frames=False):
+def analyze_video(video_path, scene_change_threshold=0.5, process_every_100_frames=False,
+                  start_frame=None, end_frame=None, display=False, annotated_output_path=None, frame_numbers=None,
+                  batch_size=YOLO_BATCH_SIZE, frame_cache=None, prefetch=PREFETCH_QUEUE_SIZE, gates=None,
+                  face_detector=DEFAULT_FACE_DETECTOR, analyzers=tuple(VIDEO_ANALYZERS)):
     """
-    Выполняет обработку видео для выявления сцен, объектов, лиц, движущихся объектов и салентных зон.
-    Результаты сохраняются в JSON файл, а сегментированные сцены сохраняются в виде отдельных видеофайлов.
+    Выполняет анализ кадров видео (объекты, события, сегментация, лица, движущиеся объекты, салентные зоны)
+    и возвращает результаты, ничего не записывая в JSON.
 
     Аргументы:
     video_path — путь к входному видеофайлу.
-    json_output_path — путь к выходному JSON файлу, в который сохраняются результаты анализа.
     scene_change_threshold — порог для детекции смены сцены, основанный на разнице гистограмм (по умолчанию 0.5).
     process_every_100_frames — флаг, указывающий, обрабатывать ли только каждый 100-й кадр (по умолчанию False).
-    
-    Описание:
-    - Видеопоток анализируется на наличие смен сцен на основе сравнения гистограмм кадров.
-    - Обнаруживаются объекты, лица, движущиеся объекты и салентные зоны.
-    - Визуализированные результаты и сегментированные сцены сохраняются в выходные файлы.
+    start_frame — номер первого кадра анализируемого диапазона в исходном видео (по умолчанию None — с начала).
+    end_frame — номер кадра, на котором диапазон заканчивается, не включая его (по умолчанию None — до конца видео).
+    display — показывать ли аннотированные кадры в окне OpenCV (по умолчанию False).
+    annotated_output_path — путь к .mp4 файлу для аннотированного видео (по умолчанию None — видео не пишется).
+    Если не включено ни то, ни другое, анализ идет без визуализации: кадры не аннотируются,
+    сегментация не раскрашивается и окна не создаются — так работает конвейер на сервере без дисплея.
+    frame_numbers — набор номеров кадров (считая с 1 от начала диапазона), которые нужно проанализировать
+                    (по умолчанию None — кадры выбираются по `process_every_100_frames`).
+                    Используется, чтобы досчитать только кадры, которых нет в уже посчитанных результатах.
+    batch_size — сколько ключевых кадров подается в YOLO за один вызов (по умолчанию YOLO_BATCH_SIZE).
+    frame_cache — открытый кэш уменьшенных кадров (см. frame_cache.get_frame_cache) или None — кадры декодируются.
+                  С кэшем кадры берутся без декодирования, но в разрешении кэша: повторный анализ с другими
+                  порогами почти ничего не стоит, а результаты детекторов могут отличаться от анализа оригинала.
+    prefetch — размер очереди фонового чтения кадров (по умолчанию PREFETCH_QUEUE_SIZE; 0 — читать в текущем потоке).
+               Метрики глубины очереди печатаются в конце анализа (см. frame_sampler.prefetch_frames).
+    gates — каскадные условия запуска анализаторов (по умолчанию None — все анализаторы работают на всем кадре;
+            ANALYZER_GATES — лица ищутся только вокруг людей, найденных YOLO). Каскад включается профилем
+            анализа (см. gates_for_profile).
+    face_detector — детектор лиц (по умолчанию DEFAULT_FACE_DETECTOR — MTCNN). Для массовой обработки архива
+                    подходит быстрый детектор, например 'opencv_dnn' (см. face_detectors.FACE_DETECTOR_TIERS).
+    analyzers — включенные анализаторы (по умолчанию все, см. profiles.VIDEO_ANALYZERS). Модели выключенных
+                анализаторов не загружаются, а их поля в результатах кадров равны None.
+
+    Возвращает:
+    scene_data — список словарей с результатами анализа по каждому ключевому кадру.
     """
 
     # --- Шаг 1: Инициализация видео и моделей ---
     
     cap = cv2.VideoCapture(video_path)  # Открываем видеопоток
-    deeplab_model = load_deeplab_model()  # Загружаем модель DeepLab для сегментации
+
+    # Сегментация нужна только для визуализации; она считается тем же прямым проходом InceptionV3, что и события
+    render = display or annotated_output_path is not None
 
     scene_index = 0  # Индекс текущей сцены
-    scene_output_path = f'scenes/scene_{scene_index}.mp4'  # Путь для сохранения текущей сцены
 
-    # Инициализация объекта VideoWriter для записи видео (кодек mp4v)
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(scene_output_path, fourcc, 30.0, (int(cap.get(3)), int(cap.get(4))))
+    # Объект VideoWriter для аннотированного видео создается при первом кадре,
+    # когда известен размер кадра (аннотированный кадр и сегментация рядом — ширина вдвое больше исходной)
+    out = None
 
-    video_name = os.path.splitext(os.path.basename(video_path))[0]  # Имя видео для использования в выходных данных
     scene_data = []  # Список для хранения данных анализа по каждой сцене
 
-    frame_counter = 0  # Счетчик кадров
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))  # Общее количество кадров в видео
+    if frame_cache is not None:
+        total_frames = frame_cache["frame_count"]  # В кэше — фактическое число декодированных кадров
+
+    # --- Ограничение обработки диапазоном кадров (шот внутри исходного видео) ---
+
+    range_start = 0
+    if start_frame is not None or end_frame is not None:
+        range_start = start_frame or 0
+        end_frame = total_frames if end_frame is None else min(end_frame, total_frames)
+        # Дальше кадры считаются относительно начала диапазона — так же, как в отдельном файле шота
+        total_frames = end_frame - range_start
+
+    # --- Шаг 2: Выбор кадров для анализа ---
+
+    if frame_numbers is not None:
+        # Только запрошенные кадры в пределах диапазона
+        frame_numbers = [number for number in frame_numbers if 1 <= number <= total_frames]
+    elif process_every_100_frames:
+        frame_numbers = every_nth_frame_numbers(total_frames, 100)  # Каждый 100-й кадр
+    else:
+        frame_numbers = key_frame_numbers(total_frames)  # Первый, средний и последний кадры
+
+    # --- Шаг 3: Основной цикл обработки видео ---
+    
+    batch = []  # Ключевые кадры, ожидающие пакетного анализа: список пар (номер кадра, кадр)
+    events_inputs = []  # Те же кадры, уменьшенные для InceptionV3 потоком предвыборки
+    stop_requested = False  # Пользователь нажал 'q' в окне визуализации
+
+    # Читаем только выбранные кадры: остальные пропускаются без конвертации или перематываются
+    if frame_cache is not None:
+        frames = cached_frames(frame_cache, frame_numbers, range_start)
+    else:
+        frames = sample_frames(cap, frame_numbers, range_start)
+
+    # Кадры читаются и уменьшаются для модели в фоновом потоке, пока модели заняты предыдущим пакетом
+    if prefetch:
+        frames = prefetch_frames(frames, queue_size=prefetch,
+                                 transform=resize_for_events if 'events' in analyzers else None)
+    else:
+        frames = ((frame_counter, frame, None) for frame_counter, frame in frames)
+
+    try:
+        for frame_counter, frame, events_input in frames:
+            # --- Шаг 4: Накопление ключевых кадров в пакет ---
+
+            batch.append((frame_counter, frame))
+            events_inputs.append(events_input)
+            if len(batch) < batch_size:
+                continue
 
-    # --- Шаг 2: Основной цикл обработки видео ---
-    
-    while cap.isOpened():
-        ret, frame = cap.read()  # Чтение текущего кадра
-        if not ret:
-            break  # Если кадр не прочитан, выходим из цикла
+            rendered_frames = analyze_keyframes(batch, scene_index, render, scene_data,
+                                                events_inputs if prefetch else None, gates=gates,
+                                                face_detector=face_detector, analyzers=analyzers)
+            batch = []
+            events_inputs = []
 
-        frame_counter += 1
+            # --- Шаг 7: Запись и отображение аннотированных кадров (только если включены) ---
 
-        # --- Шаг 3: Пропуск кадров, если включен режим обработки только 100-х кадров ---
-        
-        if process_every_100_frames:
-            if frame_counter % 100 != 0:
-                continue  # Пропускаем кадры, если это не каждый 100-й кадр
-        else:
-            # Если режим обработки каждого 100-го кадра не включен, обрабатываем первый, последний и средний кадры
-            if frame_counter != 1 and frame_counter != total_frames and frame_counter != total_frames // 2:
-                continue
-        
-        print(f"Processing key frame: {frame_counter}")
+            out, stop_requested = show_rendered_frames(rendered_frames, display, annotated_output_path, out)
+            if stop_requested:
+                break
 
-        # --- Шаг 5: Детектирование объектов, событий, лиц и прочего ---
-        
-        object_detected_frame, detections = detect_objects(frame)  # Детектирование объектов
-        event_predictions = analyze_events(frame)  # Анализ событий на изображении
-        segmented_frame = segment_scenes(frame, deeplab_model)  # Сегментация изображения с помощью модели DeepLab
-        faces, face_boxes = detect_faces_and_emotions(frame)  # Детектирование лиц и эмоций
-        moving_objects, fg_mask = detect_moving_objects(frame, back_subtractor)  # Обнаружение движущихся объектов
-        salient_regions, saliency_map = detect_salient_regions(frame)  # Выявление салентных зон
-
-        # --- Шаг 6: Визуализация результатов ---
-        
-        annotated_frame = visualize_heatmap_zones(
-            object_detected_frame.copy(),
-            detections,
-            faces,
-            moving_objects,
-            salient_regions
-        )  # Визуализируем объекты, лица, движущиеся объекты и салентные зоны
+        frames.close()  # Останавливаем поток предвыборки: последний пакет уже прочитан
+
+        # Анализируем неполный последний пакет
+        if batch and not stop_requested:
+            rendered_frames = analyze_keyframes(batch, scene_index, render, scene_data,
+                                                events_inputs if prefetch else None, gates=gates,
+                                                face_detector=face_detector, analyzers=analyzers)
+            out, _ = show_rendered_frames(rendered_frames, display, annotated_output_path, out)
+    finally:
+        # --- Шаг 9: Завершение процесса ---
+
+        # Выполняется и при ошибке анализа: поток предвыборки останавливается до закрытия видеопотока,
+        # иначе он продолжил бы читать cap после выхода из функции
+        frames.close()
+        cap.release()  # Закрываем видеопоток
+        if out is not None:
+            out.release()  # Закрываем видеофайл с аннотациями
+        if display:
+            cv2.destroyAllWindows()  # Закрываем все окна OpenCV
 
-        # Записываем аннотированный кадр и сегментированный кадр в текущий файл сцены
-        out.write(cv2.hconcat([annotated_frame, segmented_frame]))
+    return scene_data
+
+
+def show_rendered_frames(rendered_frames, display, annotated_output_path, out):
+    """
+    Записывает аннотированные кадры в видеофайл и (или) показывает их в окне.
+
+    Аргументы:
+    rendered_frames — список аннотированных кадров (см. analyze_keyframes).
+    display — показывать ли кадры в окне OpenCV.
+    annotated_output_path — путь к .mp4 файлу для аннотированного видео или None.
+    out — уже открытый объект VideoWriter или None, если он еще не создан.
+
+    Возвращает:
+    Кортеж (out, stop_requested): объект VideoWriter (создается при первом кадре)
+    и True, если пользователь нажал 'q' в окне и анализ нужно остановить.
+    """
 
-        # --- Шаг 7: Сохранение данных по кадрам ---
+    for combined_display in rendered_frames:
+        if annotated_output_path is not None:
+            if out is None:
+                # Инициализация объекта VideoWriter для записи видео (кодек mp4v) по размеру первого кадра
+                height, width = combined_display.shape[:2]
+                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+                out = cv2.VideoWriter(annotated_output_path, fourcc, 30.0, (width, height))
+            out.write(combined_display)
+
+        # --- Шаг 8: Отображение результатов ---
+
+        if display:
+            cv2.imshow('Object Detection, Segmentation and POI', combined_display)
+
+            if cv2.waitKey(1) & 0xFF == ord('q'):  # Нажмите 'q', чтобы выйти
+                return out, True
+
+    return out, False
+
+
+def analyze_keyframes(batch, scene_index, visualize, scene_data, events_inputs=None, concurrent=True,
+                      gates=None, face_detector=DEFAULT_FACE_DETECTOR, analyzers=tuple(VIDEO_ANALYZERS)):
+    """
+    Анализирует пакет ключевых кадров и дописывает результаты в scene_data.
+
+    Аргументы:
+    batch — список пар (номер кадра, кадр) в порядке следования кадров.
+    scene_index — индекс сцены для записи в результаты.
+    visualize — аннотировать ли кадры и считать ли сегментацию (False, если визуализация отключена).
+    scene_data — список результатов, в который добавляются результаты кадров пакета.
+    events_inputs — кадры пакета, уже уменьшенные для InceptionV3 (по умолчанию None — уменьшаются здесь).
+    concurrent — запускать ли анализаторы одновременно в пуле потоков (по умолчанию True, см. run_analyzers).
+    gates — каскадные условия запуска анализаторов (по умолчанию None — все анализаторы на всем кадре, см. gates_for_profile).
+    face_detector — детектор лиц (по умолчанию DEFAULT_FACE_DETECTOR, см. face_detectors).
+    analyzers — включенные анализаторы (по умолчанию все, см. profiles.VIDEO_ANALYZERS). Выключенные не запускаются,
+                а их поля в результатах кадра равны None. Без 'objects' лица ищутся на всем кадре.
+
+    Возвращает:
+    Список аннотированных кадров (аннотации рядом с сегментацией) для записи и отображения.
+    Если визуализация отключена, список пустой, а кадры не аннотируются и не сегментируются.
+
+    Описание:
+    YOLO и InceptionV3 (события и сегментация за один проход) запускаются один раз на весь пакет. Остальные анализаторы работают по кадрам в исходном порядке:
+    вычитатель фона хранит состояние и должен получать кадры по очереди.
+    Анализаторы друг от друга не зависят, поэтому работают одновременно, и время пакета близко к времени
+    самого медленного из них, а не к сумме всех.
+    """
+
+    # --- Шаг 5: Независимые анализаторы на всем пакете ---
+
+    frames = [frame for _, frame in batch]
+
+    # YOLO и InceptionV3 обрабатывают весь пакет за один прямой проход (InceptionV3 отдает и события, и сегментацию),
+    # лица ищутся по кадрам, но эмоции всех лиц пакета классифицируются одним вызовом,
+    # движение и салентность — по кадрам в исходном порядке (вычитатель фона хранит состояние)
+    results = run_analyzers({
+        'objects': (detect_objects_batch, frames, visualize) if 'objects' in analyzers else None,
+        # События и сегментация (раскрашивается только для визуализации) из одного прямого прохода
+        'scene': (analyze_scene_batch, frames, events_inputs, visualize) if 'events' in analyzers else None,
+        'faces': (partial(detect_faces_and_emotions_batch, detector=face_detector), frames) if 'faces' in analyzers else None,
+        'motion': (map_frames, detect_moving_objects, frames, get_background_subtractor()) if 'motion' in analyzers else None,
+        'saliency': (map_frames, detect_salient_regions, frames) if 'saliency' in analyzers else None
+    }, concurrent, gates)
+
+    # Выключенные анализаторы дают None на каждый кадр: их поля в результатах кадра равны null
+    disabled = [(None, None)] * len(frames)
+    events_batch, segmented_batch = results['scene'] or ([None] * len(frames), [None] * len(frames))
+    rendered_frames = []
+
+    for ((frame_counter, frame), (object_detected_frame, detections), event_predictions, segmented_frame,
+         (faces, face_boxes), (moving_objects, fg_mask), (salient_regions, saliency_map)) in zip(
+            batch, results['objects'] or disabled, events_batch, segmented_batch,
+            results['faces'] or disabled, results['motion'] or disabled, results['saliency'] or disabled):
+        print(f"Processing key frame: {frame_counter}")
+
+        # --- Шаг 6: Сохранение данных по кадрам ---
         
         scene_data.append({
             'scene': scene_index,
-            'frame': int(cap.get(cv2.CAP_PROP_POS_FRAMES)),  # Номер текущего кадра
+            'frame': frame_counter,  # Номер текущего кадра (относительно начала диапазона)
             'detections': detections,  # Обнаруженные объекты
             'events': event_predictions,  # Прогнозируемые события
             'poi': {  # Points of Interest (ключевые объекты)
@@ -753,19 +1520,65 @@ def process_video(video_path, json_output_path, scene_change_threshold=0.5, proc
             }
         })
 
-        # --- Шаг 8: Отображение результатов ---
+        if not visualize:
+            continue
+
+        # --- Визуализация результатов ---
         
-        combined_display = cv2.hconcat([annotated_frame, segmented_frame])  # Комбинируем кадры для отображения
-        cv2.imshow('Object Detection, Segmentation and POI', combined_display)
+        annotated_frame = visualize_heatmap_zones(
+            frame.copy() if object_detected_frame is None else object_detected_frame,
+            detections or [],
+            faces or [],
+            moving_objects or [],
+            salient_regions or []
+        )  # Визуализируем объекты, лица, движущиеся объекты и салентные зоны (выключенные анализаторы не рисуются)
 
-        if cv2.waitKey(1) & 0xFF == ord('q'):  # Нажмите 'q', чтобы выйти
-            break
+        # Комбинируем аннотированный кадр и сегментированный кадр для записи и отображения
+        # (без анализа событий сегментации нет, и пишется только аннотированный кадр)
+        rendered_frames.append(annotated_frame if segmented_frame is None else cv2.hconcat([annotated_frame, segmented_frame]))
 
-    # --- Шаг 9: Завершение процесса ---
+    return rendered_frames
+
+
+def process_video(video_path, json_output_path, scene_change_threshold=0.5, process_every_100_frames=False,
+                  start_frame=None, end_frame=None, video_name=None, display=False, annotated_output_path=None,
+                  batch_size=YOLO_BATCH_SIZE, frame_cache=None, prefetch=PREFETCH_QUEUE_SIZE, gates=None,
+                  face_detector=DEFAULT_FACE_DETECTOR, analyzers=tuple(VIDEO_ANALYZERS)):
+    """
+    Выполняет обработку видео для выявления сцен, объектов, лиц, движущихся объектов и салентных зон.
+    Результаты сохраняются в JSON файл, а аннотированное видео с сегментацией — по запросу в отдельный видеофайл.
+
+    Аргументы:
+    video_path — путь к входному видеофайлу.
+    json_output_path — путь к выходному JSON файлу, в который сохраняются результаты анализа.
+    scene_change_threshold — порог для детекции смены сцены, основанный на разнице гистограмм (по умолчанию 0.5).
+    process_every_100_frames — флаг, указывающий, обрабатывать ли только каждый 100-й кадр (по умолчанию False).
+    start_frame — номер первого кадра анализируемого диапазона в исходном видео (по умолчанию None — с начала).
+    end_frame — номер кадра, на котором диапазон заканчивается, не включая его (по умолчанию None — до конца видео).
+    video_name — ключ для результатов в JSON (по умолчанию None — имя видеофайла без расширения).
+                 При анализе шота прямо по исходному видео сюда передается имя шота, например 'shot_1'.
+    display — показывать ли аннотированные кадры в окне OpenCV (по умолчанию False).
+    annotated_output_path — путь к .mp4 файлу для аннотированного видео (по умолчанию None — видео не пишется).
+    batch_size — сколько ключевых кадров подается в YOLO за один вызов (по умолчанию YOLO_BATCH_SIZE).
+    frame_cache — открытый кэш уменьшенных кадров (см. analyze_video; по умолчанию None — кадры декодируются).
+    prefetch — размер очереди фонового чтения кадров (см. analyze_video; 0 — без фонового потока).
+    gates — каскадные условия запуска анализаторов (см. analyze_video).
+    face_detector — детектор лиц (см. analyze_video).
+    analyzers — включенные анализаторы (см. analyze_video); поля выключенных записываются в JSON как null.
     
-    cap.release()  # Закрываем видеопоток
-    out.release()  # Закрываем последний видеофайл
-    cv2.destroyAllWindows()  # Закрываем все окна OpenCV
+    Описание:
+    - Видеопоток анализируется на наличие смен сцен на основе сравнения гистограмм кадров.
+    - Обнаруживаются объекты, лица, движущиеся объекты и салентные зоны.
+    - Визуализированные результаты и сегментация пишутся в видеофайл, только если указан `annotated_output_path`.
+    """
+
+    if video_name is None:
+        video_name = os.path.splitext(os.path.basename(video_path))[0]  # Имя видео для использования в выходных данных
+
+    scene_data = analyze_video(video_path, scene_change_threshold, process_every_100_frames,
+                               start_frame, end_frame, display, annotated_output_path, batch_size=batch_size,
+                               frame_cache=frame_cache, prefetch=prefetch, gates=gates, face_detector=face_detector,
+                               analyzers=analyzers)
 
     # Сохраняем все данные анализа в JSON файл
     save_results_to_json(video_name, scene_data, json_output_path)
@@ -783,18 +1596,71 @@ if __name__ == "__main__":
     parser.add_argument('video_path', type=str, help='Path to the input video file')
     # Аргумент 'json_output_path' — строка, представляющая путь к выходному JSON файлу
     parser.add_argument('json_output_path', type=str, help='Path to the output JSON file')
+    # Аргумент '--batch-size' — сколько ключевых кадров подается в YOLO за один вызов
+    parser.add_argument('--batch-size', type=int, default=YOLO_BATCH_SIZE, help='Number of key frames per YOLO call')
+    # Аргумент '--display' — показывать аннотированные кадры в окне (нужен дисплей)
+    parser.add_argument('--display', action='store_true', help='Show annotated key frames in a window')
+    # Аргумент '--annotated-video' — путь для аннотированного видео (по умолчанию видео не пишется)
+    parser.add_argument('--annotated-video', type=str, default=None, help='Path to the annotated output video')
+    # Аргумент '--frame-cache' — папка кэша уменьшенных кадров (кадры читаются из кэша без декодирования)
+    parser.add_argument('--frame-cache', type=str, default=None, help='Directory of the downscaled frame cache')
+    # Аргумент '--frame-cache-width' — ширина кадров в кэше
+    parser.add_argument('--frame-cache-width', type=int, default=640, help='Frame width in the frame cache')
+    # Аргумент '--prefetch' — размер очереди фонового чтения кадров (0 — без фонового потока)
+    parser.add_argument('--prefetch', type=int, default=PREFETCH_QUEUE_SIZE, help='Decoded frames queued ahead of analysis')
+    # Аргумент '--cascade' — искать лица только вокруг людей, найденных YOLO (так же включается ключом 'cascade' профиля)
+    parser.add_argument('--cascade', action='store_true',
+                        help='Run face detection only around people found by YOLO (also enabled by the profile)')
+    # Аргумент '--face-detector' — детектор лиц (точный MTCNN или быстрые OpenCV DNN / каскад Хаара)
+    parser.add_argument('--face-detector', choices=list(FACE_DETECTOR_TIERS), default=DEFAULT_FACE_DETECTOR,
+                        help='Face detection backend')
+    # Аргумент '--face-budget-ms' — бюджет времени на поиск лиц в кадре (выбирает детектор вместо --face-detector)
+    parser.add_argument('--face-budget-ms', type=float, default=None,
+                        help='Face detection time budget per frame in ms (picks the most accurate backend that fits)')
+    # Аргумент '--person-confidence' — минимальная уверенность YOLO в человеке для поиска лиц
+    parser.add_argument('--person-confidence', type=float, default=ANALYZER_GATES['faces']['min_confidence'],
+                        help='Minimum person confidence that triggers face detection')
+    # Аргумент '--profile' — профиль анализа: имя готового профиля или путь к JSON файлу со списком анализаторов
+    parser.add_argument('--profile', type=str, default=DEFAULT_PROFILE,
+                        help='Analyzer profile: a preset name (see profiles.PROFILE_PRESETS) or a JSON file path')
+    # Аргумент '--int8' — модели, которые работают в квантованной точности INT8 (проверка точности: precision_check.py)
+    parser.add_argument('--int8', nargs='+', choices=list(MODEL_PRECISION), default=[],
+                        help='Models to run with INT8 quantized weights')
     
     # --- Шаг 2: Получение аргументов ---
     
     args = parser.parse_args()  # Получаем аргументы командной строки
     
-    # --- Шаг 3: Проверка и создание папки для сохранения сцен ---
+    # --- Шаг 3: Проверка и создание папки для аннотированного видео ---
     
-    # Проверяем, существует ли папка 'scenes', где будут сохранены видео сцен
-    if not os.path.exists('scenes'):
-        os.makedirs('scenes')  # Создаем папку 'scenes', если она не существует
+    # Проверяем, существует ли папка, в которую будет сохранено аннотированное видео
+    if args.annotated_video and os.path.dirname(args.annotated_video):
+        os.makedirs(os.path.dirname(args.annotated_video), exist_ok=True)  # Создаем папку, если она не существует
 
     # --- Шаг 4: Запуск обработки видео ---
     
+    profile = load_profile(args.profile)
+
+    # Каскад (по флагу или по профилю): лица ищутся только вокруг людей, найденных YOLO с уверенностью не ниже заданной
+    gates = None
+    if args.cascade or gates_for_profile(profile):
+        gates = {**ANALYZER_GATES, 'faces': {**ANALYZER_GATES['faces'], 'min_confidence': args.person_confidence}}
+
+    # Детектор лиц: явно выбранный или самый точный из укладывающихся в бюджет времени на кадр
+    face_detector = args.face_detector
+    if args.face_budget_ms is not None:
+        face_detector = face_detector_for_budget(args.face_budget_ms)
+
+    # Квантованные модели создаются при первом использовании и сохраняются в quantization.QUANTIZED_MODEL_DIR
+    set_model_precision({model_name: 'int8' for model_name in args.int8})
+
+    # Кэш строится при первом запуске и переиспользуется при повторных (например, с другими порогами)
+    frame_cache = None
+    if args.frame_cache:
+        frame_cache = get_frame_cache(args.video_path, args.frame_cache, args.frame_cache_width)
+
     # Вызываем функцию `process_video`, передавая путь к видео и путь для сохранения JSON файла
-    process_video(args.video_path, args.json_output_path)
+    process_video(args.video_path, args.json_output_path, display=args.display,
+                  annotated_output_path=args.annotated_video, batch_size=args.batch_size, frame_cache=frame_cache,
+                  prefetch=args.prefetch, gates=gates, face_detector=face_detector,
+                  analyzers=profile['video'])
@@ -0,0 +1,171 @@
+# --- Стандартные библиотеки Python ---
+import argparse  # Модуль для обработки аргументов командной строки
+import os  # Подсчет файлов заданий в папках состояний
+import time  # Пауза между проверками пустой очереди и замер времени заданий
+import traceback  # Вывод ошибки упавшего задания без остановки воркера
+
+# --- Модули проекта ---
+from job_queue import (JOB_QUEUE_DIR, JOB_STATES, claim_job, finish_job, job_state_dir, requeue_job,
+                       requeue_orphaned_jobs, submit_job)  # Локальная очередь заданий в папке
+from model_registry import loaded_models, unload_models  # Модели процесса остаются загруженными между заданиями
+from asr import ASR_BACKENDS, DEFAULT_ASR_BACKEND  # Распознаватели речи
+from face_detectors import DEFAULT_FACE_DETECTOR, FACE_DETECTOR_TIERS, get_face_detector  # Детекторы лиц
+from profiles import DEFAULT_PROFILE, load_profile  # Профиль анализа: какие модели прогреваются
+import audio  # Аудиомодели для прогрева
+import video  # Модели анализа кадров для прогрева и выбор точности
+import separating  # Конвейер разметки, который выполняет каждое задание
+
+# Пауза между проверками пустой очереди, секунды
+POLL_INTERVAL = 2.0
+
+
+def warm_up(profile=DEFAULT_PROFILE, face_detector=DEFAULT_FACE_DETECTOR, int8=(), asr_backend=DEFAULT_ASR_BACKEND):
+    """
+    Загружает модели профиля в процесс воркера до первого задания.
+
+    Аргументы:
+    profile — профиль анализа, модели которого загружаются заранее (см. profiles.load_profile).
+    face_detector — детектор лиц, который загружается заранее (по умолчанию DEFAULT_FACE_DETECTOR).
+    int8 — модели, которые загружаются в квантованной точности INT8 (см. video.set_model_precision).
+    asr_backend — распознаватель речи, модель которого загружается заранее (см. asr.ASR_BACKENDS).
+
+    Описание:
+    Модели лежат в реестре процесса (см. model_registry) и переиспользуются всеми заданиями, поэтому
+    на коротких клипах задание тратит время на анализ, а не на загрузку весов. Модели, которых нет
+    в профиле прогрева, загрузятся при первом задании, которому они нужны, и дальше тоже останутся в памяти.
+    """
+
+    started = time.time()
+    profile = load_profile(profile)
+    video.set_model_precision({model_name: "int8" if model_name in int8 else "fp32"
+                               for model_name in video.MODEL_PRECISION})
+    video.set_analyzer_thread_budget()
+
+    video.load_video_models(profile["video"])
+    if "faces" in profile["video"]:
+        get_face_detector(face_detector)
+    audio.load_audio_models(profile["audio"], asr_backend)
+
+    print(f"Модели загружены за {time.time() - started:.1f} с: "
+          f"{', '.join(name for name, _ in loaded_models()) or 'нет'}")
+
+
+def run_job(job):
+    """
+    Выполняет задание очереди: конвейер separating.py по видео задания с его профилем анализа.
+    Результаты пишутся в папку задания (job['output_dir']) в тех же файлах, что и при запуске из командной строки.
+    """
+
+    args = separating.build_parser().parse_args(
+        [job["video_path"], "--profile", job["profile"], "--output-dir", job["output_dir"], *job["pipeline_args"]]
+    )
+
+    # Вычитатель фона накапливает модель фона по кадрам: новое видео начинается с пустой модели
+    unload_models("background_subtractor")
+    separating.run_pipeline(args)
+
+
+def serve(queue_dir=JOB_QUEUE_DIR, poll_interval=POLL_INTERVAL, once=False):
+    """
+    Выполняет задания очереди одно за другим в текущем процессе с уже загруженными моделями.
+
+    Аргументы:
+    queue_dir — папка очереди (по умолчанию JOB_QUEUE_DIR).
+    poll_interval — пауза между проверками пустой очереди, секунды (по умолчанию POLL_INTERVAL).
+    once — выйти, когда очередь опустеет (по умолчанию False — ждать новые задания).
+
+    Описание:
+    Упавшее задание переходит в 'failed' с текстом ошибки, а воркер берет следующее. Если воркер
+    остановлен посреди задания (Ctrl+C), задание возвращается в очередь и продолжится с чекпоинтов.
+    Несколько воркеров могут обслуживать одну папку очереди: каждое задание забирает ровно один из них.
+    """
+
+    for job_id in requeue_orphaned_jobs(queue_dir):
+        print(f"Задание {job_id} осталось от остановленного воркера и возвращено в очередь")
+
+    print(f"Воркер ждет задания в {queue_dir}")
+    while True:
+        job = claim_job(queue_dir)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+
+        print(f"Задание {job['id']}: {job['video_path']} (профиль {job['profile']})")
+        try:
+            run_job(job)
+        except KeyboardInterrupt:
+            requeue_job(job, queue_dir)
+            print(f"Воркер остановлен, задание {job['id']} возвращено в очередь")
+            raise
+        except (Exception, SystemExit) as e:  # SystemExit — ошибка в аргументах конвейера задания
+            traceback.print_exc()
+            finish_job(job, queue_dir, error=f"{type(e).__name__}: {e}")
+            print(f"Задание {job['id']} завершилось ошибкой")
+        else:
+            path = finish_job(job, queue_dir)
+            print(f"Задание {job['id']} выполнено, результаты в {job['output_dir']} (отчет: {path})")
+
+
+def queue_status(queue_dir=JOB_QUEUE_DIR):
+    """
+    Возвращает число заданий в каждом состоянии очереди: {состояние: число}.
+    """
+
+    return {
+        state: sum(name.endswith(".json") for name in os.listdir(job_state_dir(queue_dir, state)))
+        for state in JOB_STATES
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Долгоживущий воркер разметки видео с локальной очередью заданий.")
+    parser.add_argument("--queue", type=str, default=JOB_QUEUE_DIR, help="Папка очереди заданий.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser(
+        "serve", help="Загрузить модели один раз и выполнять задания очереди.",
+        description="Задания выполняются в этом процессе с уже загруженными моделями. Аргумент конвейера --workers "
+                    "больше 1 запускает новые процессы, которые загружают модели заново, поэтому для коротких "
+                    "клипов лучше запустить несколько воркеров на одну очередь."
+    )
+    serve_parser.add_argument("--warm-profile", type=str, default=DEFAULT_PROFILE,
+                              help="Профиль анализа, модели которого загружаются при старте (по умолчанию full).")
+    serve_parser.add_argument("--face-detector", choices=list(FACE_DETECTOR_TIERS), default=DEFAULT_FACE_DETECTOR,
+                              help="Детектор лиц, который загружается при старте.")
+    serve_parser.add_argument("--asr-backend", choices=list(ASR_BACKENDS), default=DEFAULT_ASR_BACKEND,
+                              help="Распознаватель речи, модель которого загружается при старте.")
+    serve_parser.add_argument("--int8", nargs="+", choices=list(video.MODEL_PRECISION), default=[],
+                              help="Модели, которые загружаются при старте в точности INT8.")
+    serve_parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL,
+                              help="Пауза между проверками пустой очереди, секунды.")
+    serve_parser.add_argument("--once", action="store_true", help="Выйти, когда очередь опустеет.")
+
+    submit_parser = commands.add_parser(
+        "submit", help="Поставить видео в очередь.",
+        description="Остальные аргументы передаются конвейеру separating.py, например --single-pass или --int8 yolo."
+    )
+    submit_parser.add_argument("video_path", type=str, help="Путь к видеофайлу.")
+    submit_parser.add_argument("--profile", type=str, default=DEFAULT_PROFILE,
+                               help="Профиль анализа: имя готового профиля или путь к JSON файлу.")
+    submit_parser.add_argument("--output-dir", type=str, default=None,
+                               help="Папка результатов задания (по умолчанию results/<id задания> в папке очереди).")
+
+    commands.add_parser("status", help="Показать число заданий в каждом состоянии.")
+
+    args, pipeline_args = parser.parse_known_args()
+
+    if args.command == "submit":
+        # Аргументы конвейера проверяются при постановке, чтобы ошибка была видна сразу
+        separating.build_parser().parse_args([args.video_path, *pipeline_args])
+        job = submit_job(args.video_path, args.profile, pipeline_args, args.queue, args.output_dir)
+        print(f"Задание {job['id']} поставлено в очередь, результаты будут в {job['output_dir']}")
+    elif pipeline_args:
+        parser.error(f"неизвестные аргументы: {' '.join(pipeline_args)}")
+    elif args.command == "serve":
+        warm_up(args.warm_profile, args.face_detector, args.int8, args.asr_backend)
+        serve(args.queue, args.poll_interval, args.once)
+    else:
+        for state, count in queue_status(args.queue).items():
+            print(f"{state}: {count}")